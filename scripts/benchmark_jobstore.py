@@ -0,0 +1,95 @@
+"""
+Compares the JSON jobstore with APScheduler's SQLAlchemyJobStore.
+
+For each job count, both stores are filled in a fresh SQLite file, opened with the application's
+engine settings (core.sqlite and core.pool in config.yaml), and timed on add_job, update_job,
+lookup_job, get_due_jobs (10% of the jobs due) and get_next_run_time.
+
+Usage (from the project root):
+    python scripts/benchmark_jobstore.py                  # 10k and 100k jobs
+    python scripts/benchmark_jobstore.py 10000 100000 1000000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from apscheduler.job import Job
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from core.database import create_app_engine
+from modules.scheduler.jobstore import JSONJobStore
+
+FUNC = "modules.scheduler.tasks.sample_tasks:print_current_time"
+SAMPLE = 1000
+
+def make_jobs(scheduler, count, base):
+    jobs = []
+    for i in range(count):
+        if i % 2:
+            trigger = IntervalTrigger(minutes=1 + i % 60, start_date=base, timezone=timezone.utc)
+        else:
+            trigger = CronTrigger(minute=str(i % 60), hour="*/2", timezone=timezone.utc)
+        jobs.append(Job(
+            scheduler, id=f"job-{i:07d}", func=FUNC, trigger=trigger, executor="default",
+            args=(), kwargs={"job_id": f"job-{i:07d}"}, name=f"job-{i}", misfire_grace_time=3600,
+            coalesce=False, max_instances=1, next_run_time=base + timedelta(seconds=i * 3600 * 24 / count),
+        ))
+    return jobs
+
+def timed(label, results, func, operations):
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    results[label] = (elapsed, operations / elapsed if elapsed else float('inf'))
+
+def run(store_name, store, scheduler, jobs, base):
+    store.start(scheduler, "default")
+    results = {}
+    timed("add_job", results, lambda: [store.add_job(job) for job in jobs], len(jobs))
+
+    sample = jobs[::max(1, len(jobs) // SAMPLE)]
+    def update():
+        for job in sample:
+            job.next_run_time = job.next_run_time + timedelta(days=1)
+            store.update_job(job)
+    timed("update_job", results, update, len(sample))
+    timed("lookup_job", results, lambda: [store.lookup_job(job.id) for job in sample], len(sample))
+
+    due_at = base + timedelta(hours=2.4)
+    due = []
+    timed("get_due_jobs", results, lambda: due.extend(store.get_due_jobs(due_at)), 1)
+    timed("get_due_jobs (repeat)", results, lambda: store.get_due_jobs(due_at), 1)
+    timed("get_next_run_time", results, lambda: [store.get_next_run_time() for _ in range(100)], 100)
+    store.shutdown()
+
+    print(f"  {store_name} ({len(due)} due jobs)")
+    for label, (elapsed, rate) in results.items():
+        print(f"    {label:<24} {elapsed:9.3f} s  {rate:12.1f} ops/s")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("counts", nargs="*", type=int, default=[10000, 100000], help="job counts to benchmark")
+    args = parser.parse_args()
+
+    base = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    scheduler = BackgroundScheduler(timezone="UTC")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.counts:
+            print(f"{count} jobs")
+            for name, factory in (
+                ("SQLAlchemyJobStore", lambda url: SQLAlchemyJobStore(engine=create_app_engine(url))),
+                ("JSONJobStore", lambda url: JSONJobStore(engine=create_app_engine(url))),
+            ):
+                url = f"sqlite:///{os.path.join(tmp, f'{name}-{count}.sqlite')}"
+                run(name, factory(url), scheduler, make_jobs(scheduler, count, base), base)
+
+if __name__ == "__main__":
+    main()
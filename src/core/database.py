@@ -1,12 +1,17 @@
-from typing import Generator
-from sqlalchemy import create_engine
+import threading
+import time
+from typing import Any, Dict, Generator, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
 from tenacity import retry, wait_fixed, stop_after_attempt, before_log, after_log, retry_if_exception_type
 
 import logging
 
 from core.config import settings
+from util.config_util import config
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +20,109 @@ Base = declarative_base()
 engine = None
 SessionLocal = None
 
+class PoolStats:
+    """Connection checkout counters of the application engine's pool."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.slow_checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait * 1000 >= config.pool_slow_checkout_ms:
+                self.slow_checkouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'slow_checkouts': self.slow_checkouts,
+                'mean_wait_ms': self.total_wait * 1000 / attempts if attempts else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each connection checkout waited."""
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.record(time.perf_counter() - started, timed_out=True)
+            raise
+        pool_stats.record(time.perf_counter() - started)
+        return connection
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        # auto_vacuum only takes effect on a database that has no tables yet.
+        cursor.execute(f"PRAGMA auto_vacuum = {config.sqlite_auto_vacuum}")
+        cursor.execute(f"PRAGMA journal_mode = {config.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous = {config.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(config.sqlite_busy_timeout_ms)}")
+    finally:
+        cursor.close()
+
+def create_app_engine(url: Optional[str] = None, **overrides):
+    """
+    Creates an engine configured for its dialect from the ``core`` section of config.yaml.
+    SQLite connections get the journal mode, synchronous and busy_timeout pragmas; file-based
+    databases of every dialect get a sized, pre-pinged and recycled InstrumentedQueuePool.
+    """
+    url = make_url(url or settings.DATABASE_URL)
+    options: Dict[str, Any] = {}
+    if url.get_backend_name() == 'sqlite':
+        options['connect_args'] = {'check_same_thread': False, 'timeout': config.sqlite_busy_timeout_ms / 1000}
+    if not _is_sqlite_memory(url):
+        options.update(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config.pool_size,
+            max_overflow=config.pool_max_overflow,
+            pool_timeout=config.pool_timeout_seconds,
+            pool_pre_ping=config.pool_pre_ping,
+            pool_recycle=config.pool_recycle_seconds,
+        )
+    options.update(overrides)
+    new_engine = create_engine(url, **options)
+    if url.get_backend_name() == 'sqlite' and not _is_sqlite_memory(url):
+        event.listen(new_engine, 'connect', _set_sqlite_pragmas)
+    return new_engine
+
+def get_pool_status() -> Dict[str, Any]:
+    """Current pool occupancy of the application engine plus the checkout counters."""
+    if engine is None:
+        init_db()
+    pool = engine.pool
+    status = {
+        'dialect': engine.dialect.name,
+        'pool_class': type(pool).__name__,
+        'size': None, 'checked_out': None, 'checked_in': None, 'overflow': None,
+    }
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), checked_in=pool.checkedin(), overflow=pool.overflow())
+    status.update(pool_stats.snapshot())
+    return status
+
 @retry(
     wait=wait_fixed(3),
     stop=stop_after_attempt(5),
@@ -25,7 +133,7 @@ SessionLocal = None
 )
 def _create_engine_with_retries():
     logger.info("Attempting to connect to the database...")
-    return create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+    return create_app_engine()
 
 def init_db():
     global engine, SessionLocal
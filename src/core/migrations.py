@@ -0,0 +1,103 @@
+"""
+A small, versioned schema migration runner.
+
+``Base.metadata.create_all`` only creates missing tables, so indexes and columns added to
+existing tables need an explicit upgrade step. Modules register their migrations with
+``register``; ``run_migrations`` applies every migration that is not yet recorded in the
+``schema_migrations`` table, in version order, each in its own transaction.
+Upgrade steps must be idempotent so that a database created by ``create_all`` (which
+already has the new schema) or two processes starting at once do not fail.
+"""
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, inspect, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.schema import CreateColumn
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', String, primary_key=True),
+    Column('description', String, nullable=True),
+    Column('applied_at', DateTime(timezone=True), nullable=False),
+)
+
+class Migration:
+    def __init__(self, version: str, description: str, upgrade: Callable[[Connection], None]):
+        self.version = version
+        self.description = description
+        self.upgrade = upgrade
+
+_registry: List[Migration] = []
+
+def register(version: str, description: str):
+    """Decorator registering an upgrade function under a unique, sortable version string."""
+    def decorator(upgrade: Callable[[Connection], None]):
+        if any(m.version == version for m in _registry):
+            raise ValueError(f"Duplicate migration version: {version}")
+        _registry.append(Migration(version, description, upgrade))
+        return upgrade
+    return decorator
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Applies all pending migrations and returns the versions that were applied.
+    """
+    _metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        applied = {row[0] for row in conn.execute(select(schema_migrations.c.version))}
+
+    newly_applied = []
+    for migration in sorted(_registry, key=lambda m: m.version):
+        if migration.version in applied:
+            continue
+        logger.info(f"Applying migration {migration.version}: {migration.description}")
+        try:
+            with engine.begin() as conn:
+                migration.upgrade(conn)
+                conn.execute(schema_migrations.insert().values(
+                    version=migration.version,
+                    description=migration.description,
+                    applied_at=datetime.now(timezone.utc),
+                ))
+        except DBAPIError:
+            # Another process applying the same migration makes our DDL fail (OperationalError
+            # on SQLite, ProgrammingError on PostgreSQL) or our insert (IntegrityError); either
+            # way it has been applied once that process recorded it.
+            if not _is_applied(engine, migration.version):
+                raise
+            logger.info(f"Migration {migration.version} was applied concurrently.")
+            continue
+        newly_applied.append(migration.version)
+    return newly_applied
+
+def _is_applied(engine: Engine, version: str) -> bool:
+    with engine.connect() as conn:
+        return conn.execute(select(schema_migrations.c.version).where(schema_migrations.c.version == version)).first() is not None
+
+# Tables that do not exist yet are skipped: create_all builds them with the current schema.
+
+def create_index(conn: Connection, index) -> None:
+    """Creates a SQLAlchemy Index unless it already exists."""
+    if inspect(conn).has_table(index.table.name):
+        index.create(conn, checkfirst=True)
+
+def add_column(conn: Connection, table_name: str, column) -> None:
+    """
+    Adds a column (taken from a mapped table) to an existing table unless it already exists.
+    """
+    inspector = inspect(conn)
+    if not inspector.has_table(table_name):
+        return
+    existing = {c['name'] for c in inspector.get_columns(table_name)}
+    if column.name in existing:
+        return
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f'ALTER TABLE {table_name} ADD COLUMN {ddl}'))
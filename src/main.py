@@ -1,11 +1,12 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from core import database
+from core import database, migrations
 from util import logger_util
 from util.config_util import config
 from modules.scheduler.router import router as scheduler_router
-from modules.scheduler import scheduler_instance, loader
+from modules.scheduler import scheduler_instance, loader, retention, service
+from modules.scheduler import migrations as scheduler_migrations  # registers the module's migrations
 
 logger_util.setup_logging(log_file_path="log/app.log")
 logger = logger_util.get_logger(__name__)
@@ -15,11 +16,30 @@ async def lifespan(app: FastAPI):
     logger.info("Application startup...")
     database.init_db()
     database.Base.metadata.create_all(bind=database.engine)
+    migrations.run_migrations(database.engine)
     loader.seed_db_from_yaml("jobs.yaml")
     scheduler_instance.start_scheduler()
     loader.sync_jobs_from_db()
+    scheduler_instance.job_index.rebuild()
+    scheduler_instance.retry_manager.load()
     watcher = loader.start_config_watcher(scheduler_instance.scheduler, "jobs.yaml")
-    scheduler_instance.scheduler.add_job(loader.sync_jobs_from_db, "interval", seconds=60, id="db_sync")
+    scheduler_instance.scheduler.add_job(
+        loader.poll_job_changes, "interval", seconds=config.scheduler_change_feed_interval_seconds,
+        id="job_change_feed", jobstore=scheduler_instance.INTERNAL_JOBSTORE, executor=scheduler_instance.INTERNAL_EXECUTOR,
+        replace_existing=True, max_instances=1, coalesce=True,
+    )
+    service.reconcile_dashboard_stats()
+    scheduler_instance.scheduler.add_job(
+        service.reconcile_dashboard_stats, "interval", minutes=config.dashboard_stats_reconcile_interval_minutes,
+        id="dashboard_stats_reconcile", jobstore=scheduler_instance.INTERNAL_JOBSTORE, executor=scheduler_instance.INTERNAL_EXECUTOR,
+        replace_existing=True, max_instances=1, coalesce=True,
+    )
+    if config.retention_enabled:
+        scheduler_instance.scheduler.add_job(
+            retention.purge_execution_logs, "interval", minutes=config.retention_interval_minutes,
+            id="execution_log_retention", jobstore=scheduler_instance.INTERNAL_JOBSTORE, executor=scheduler_instance.INTERNAL_EXECUTOR,
+            replace_existing=True, max_instances=1, coalesce=True,
+        )
     yield
     logger.info("Application shutdown...")
     watcher.stop()
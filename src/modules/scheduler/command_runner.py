@@ -0,0 +1,327 @@
+"""
+Runs external commands for ``command`` jobs.
+
+Command jobs do not occupy a worker thread while their process runs. They are submitted to a
+CommandExecutor, which hands them to the CommandSupervisor: one daemon thread running an asyncio
+event loop, shared by all command executors, where every command is an ``asyncio`` subprocess.
+A semaphore per executor bounds how many of its commands run at once; further runs wait for a
+free slot without holding a thread either. Start, success and error events are dispatched from a
+second supervisor thread, so that slow listeners (the execution log among them) never stall the
+loop that reads the output of every running command.
+
+stdout and stderr are read incrementally into bounded buffers that keep the beginning and the
+end of each stream (``scheduler.commands.max_output_bytes``) and count the bytes in between,
+so a chatty process cannot exhaust memory. A run that exits with a non-zero status raises
+CommandFailedError, which the scheduler reports as a job error; its result is kept on the
+exception so the execution log still gets the output and exit code.
+
+Commands run in a session of their own. When a run exceeds its timeout, or is cancelled, the
+whole process group is killed, so shell pipelines and children the command spawned go with it;
+a timed-out run raises CommandTimeoutError with the output read up to that point.
+"""
+import asyncio
+import concurrent.futures
+import os
+import shlex
+import signal
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+from apscheduler.executors.base import BaseExecutor, run_coroutine_job
+
+from modules.scheduler.events import dispatch_started, missed_events
+from modules.scheduler.resources import Lease, ResourceManager
+from modules.scheduler.timeouts import JobTimeoutError
+from util import logger_util
+from util.config_util import config
+
+logger = logger_util.get_logger(__name__)
+
+# The function every command job is scheduled with, as a JobConfig.func path and as APScheduler's func_ref.
+COMMAND_FUNC = 'modules.scheduler.command_runner.run_command'
+COMMAND_FUNC_REF = 'modules.scheduler.command_runner:run_command'
+
+class BoundedOutput:
+    """Keeps the first and last bytes of a stream, up to max_bytes in total, and counts the rest."""
+    def __init__(self, max_bytes: int):
+        self.head_limit = max_bytes // 2
+        self.tail_limit = max_bytes - self.head_limit
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        room = self.head_limit - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail += data
+            if len(self.tail) > self.tail_limit:
+                del self.tail[:len(self.tail) - self.tail_limit]
+
+    @property
+    def omitted(self) -> int:
+        return self.total - len(self.head) - len(self.tail)
+
+    def text(self) -> str:
+        if not self.omitted:
+            return (self.head + self.tail).decode('utf-8', errors='replace')
+        return (
+            self.head.decode('utf-8', errors='replace')
+            + f"\n... [{self.omitted} bytes omitted] ...\n"
+            + self.tail.decode('utf-8', errors='replace')
+        )
+
+class CommandResult:
+    def __init__(self, command: str, exit_code: int, stdout: BoundedOutput, stderr: BoundedOutput):
+        self.command = command
+        self.exit_code = exit_code
+        self.stdout = stdout.text()
+        self.stderr = stderr.text()
+        self.stdout_bytes = stdout.total
+        self.stderr_bytes = stderr.total
+        self.truncated = bool(stdout.omitted or stderr.omitted)
+
+    def __repr__(self):
+        return f"<CommandResult (command={self.command!r}, exit_code={self.exit_code})>"
+
+class CommandFailedError(Exception):
+    """Raised when a command exits with a non-zero status."""
+    def __init__(self, result: CommandResult):
+        super().__init__(f"Command {result.command!r} exited with status {result.exit_code}")
+        self.result = result
+
+class CommandTimeoutError(JobTimeoutError):
+    """Raised when a command is killed for exceeding its timeout."""
+    def __init__(self, result: CommandResult, job_id: Optional[str], timeout_seconds: float):
+        super().__init__(job_id or result.command, timeout_seconds)
+        self.result = result
+
+def describe_command(argv: Optional[List[str]] = None, shell: Optional[str] = None) -> str:
+    """The command line of a command job, for execution logs."""
+    return shell if shell is not None else shlex.join(argv or [])
+
+async def _drain(stream: asyncio.StreamReader, output: BoundedOutput) -> None:
+    while True:
+        chunk = await stream.read(config.command_read_chunk_bytes)
+        if not chunk:
+            return
+        output.write(chunk)
+
+def _kill(process: asyncio.subprocess.Process) -> None:
+    """Kills the process and, on POSIX, every process of its session's process group."""
+    if process.returncode is not None:
+        # Already reaped; its PID, and so its group ID, may belong to another process by now.
+        return
+    try:
+        if hasattr(os, 'killpg'):
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except ProcessLookupError:
+        pass
+
+async def run_command(
+    argv: Optional[List[str]] = None, shell: Optional[str] = None, cwd: Optional[str] = None,
+    env: Optional[Dict[str, str]] = None, job_id: Optional[str] = None, timeout_seconds: Optional[float] = None,
+) -> CommandResult:
+    """
+    Runs argv (without a shell) or a shell command line and returns its exit code and output.
+    env is added to the scheduler's environment. Raises CommandFailedError on a non-zero exit
+    and CommandTimeoutError when the command runs longer than timeout_seconds.
+    """
+    command = describe_command(argv, shell)
+    options = dict(
+        cwd=cwd, env={**os.environ, **env} if env else None, start_new_session=hasattr(os, 'killpg'),
+        stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+    )
+    if shell is not None:
+        process = await asyncio.create_subprocess_shell(shell, **options)
+    else:
+        process = await asyncio.create_subprocess_exec(*argv, **options)
+    stdout = BoundedOutput(config.command_max_output_bytes)
+    stderr = BoundedOutput(config.command_max_output_bytes)
+
+    async def communicate() -> int:
+        await asyncio.gather(_drain(process.stdout, stdout), _drain(process.stderr, stderr))
+        return await process.wait()
+
+    try:
+        exit_code = await asyncio.wait_for(communicate(), timeout_seconds)
+    except asyncio.TimeoutError:
+        _kill(process)
+        exit_code = await process.wait()
+        raise CommandTimeoutError(CommandResult(command, exit_code, stdout, stderr), job_id, timeout_seconds)
+    except asyncio.CancelledError:
+        _kill(process)
+        await process.wait()
+        raise
+    result = CommandResult(command, exit_code, stdout, stderr)
+    if exit_code != 0:
+        raise CommandFailedError(result)
+    return result
+
+def _attach_child_watcher(loop: asyncio.AbstractEventLoop) -> None:
+    """
+    Before Python 3.12, asyncio waits for every child process in a thread of its own
+    (ThreadedChildWatcher). Where pidfds are available, a PidfdChildWatcher attached to the
+    supervisor loop waits on the loop instead; Python 3.12+ does this by itself.
+    """
+    if sys.version_info >= (3, 12) or not hasattr(os, 'pidfd_open'):
+        return
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return
+    watcher = asyncio.PidfdChildWatcher()
+    watcher.attach_loop(loop)
+    asyncio.set_child_watcher(watcher)
+
+class CommandSupervisor:
+    """
+    Runs coroutines on a private event loop thread. Each submission names a group, and at most
+    the group's limit of its coroutines run at a time. Blocking work the coroutines trigger, such
+    as reporting their outcome, goes to a dispatcher thread that runs it in submission order.
+    """
+    def __init__(self, name: str = 'command-supervisor'):
+        self.name = name
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._dispatcher: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        # Semaphores belong to the loop they were first used on; they are dropped with it.
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        ready = threading.Event()
+        self._loop = asyncio.new_event_loop()
+        self._semaphores = {}
+        self._dispatcher = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix=f'{self.name}-dispatch')
+        self._thread = threading.Thread(target=self._run, args=(self._loop, ready), name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run(self, loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        _attach_child_watcher(loop)
+        ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _limited(self, coro, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            return await coro
+
+    def submit(self, coro, group: str = 'default', limit: int = 100) -> concurrent.futures.Future:
+        with self._lock:
+            self._ensure_started()
+            semaphore = self._semaphores.get(group)
+            if semaphore is None:
+                semaphore = self._semaphores[group] = asyncio.Semaphore(limit)
+            return asyncio.run_coroutine_threadsafe(self._limited(coro, semaphore), self._loop)
+
+    def dispatch(self, fn, *args) -> None:
+        """
+        Runs fn(*args) on the dispatcher thread, after everything dispatched before it; once the
+        supervisor is stopped, on the calling thread.
+        """
+        with self._lock:
+            dispatcher = self._dispatcher
+            if dispatcher is not None:
+                dispatcher.submit(fn, *args)
+                return
+        fn(*args)
+
+    def stop(self) -> None:
+        """
+        Stops the loop thread; coroutines still pending are abandoned. Work already dispatched
+        is finished first.
+        """
+        with self._lock:
+            thread, loop, dispatcher = self._thread, self._loop, self._dispatcher
+            self._thread = self._loop = self._dispatcher = None
+        if thread is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        dispatcher.shutdown(wait=True)
+
+# Shared by every command executor, so all command jobs run on one thread.
+supervisor = CommandSupervisor()
+
+class CommandExecutor(BaseExecutor):
+    """
+    APScheduler executor for command jobs; runs at most max_concurrent of them at once on the
+    supervisor. Runs of jobs that claim concurrency groups first wait for them.
+    """
+    def __init__(self, max_concurrent: int = 100, supervisor: CommandSupervisor = supervisor,
+                 resources: Optional[ResourceManager] = None):
+        super().__init__()
+        self.max_concurrent = max_concurrent
+        self.supervisor = supervisor
+        self.resources = resources
+        self._alias = None
+        # Run futures on the loop, by the future that completes once their outcome is reported.
+        self._futures: Dict[concurrent.futures.Future, concurrent.futures.Future] = {}
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._alias = alias
+
+    def shutdown(self, wait=True):
+        """Waits for running commands and their outcomes to be reported, or kills them without wait."""
+        with self._lock:
+            futures = dict(self._futures)
+        if not wait:
+            for future in futures.values():
+                future.cancel()
+        # Cancelled commands still kill and reap their processes.
+        concurrent.futures.wait(futures, None if wait else 5)
+
+    def _do_submit_job(self, job, run_times):
+        submitted_at = time.monotonic()
+        claims = self.resources.resources_for(job.id) if self.resources is not None else None
+        if claims:
+            self.resources.request(
+                job.id, claims, lambda lease: self._launch(job, run_times, submitted_at, lease),
+                lambda: self._run_job_success(job.id, missed_events(job, run_times)),
+            )
+        else:
+            self._launch(job, run_times, submitted_at, None)
+
+    def _launch(self, job, run_times, submitted_at: float, lease: Optional[Lease]) -> None:
+        reported = concurrent.futures.Future()
+
+        def report(future):
+            # On the dispatcher thread: listeners and lease waiters may block.
+            try:
+                if lease is not None:
+                    self.resources.release(lease)
+                try:
+                    events = future.result()
+                except BaseException:
+                    self._run_job_error(job.id, *sys.exc_info()[1:])
+                else:
+                    self._run_job_success(job.id, events)
+            finally:
+                with self._lock:
+                    self._futures.pop(reported, None)
+                reported.set_result(None)
+
+        async def run():
+            # Runs once the executor's semaphore has let the command through.
+            self.supervisor.dispatch(dispatch_started, self._scheduler, job, run_times, submitted_at, time.monotonic())
+            return await run_coroutine_job(job, job._jobstore_alias, run_times, self._logger.name)
+
+        future = self.supervisor.submit(run(), group=self._alias, limit=self.max_concurrent)
+        with self._lock:
+            self._futures[reported] = future
+        future.add_done_callback(lambda done: self.supervisor.dispatch(report, done))
@@ -0,0 +1,128 @@
+"""
+Priority dispatch of runs waiting for a worker slot.
+
+Runs submitted to a full thread or process pool wait in a DispatchQueue instead of in
+submission order. Whenever a slot frees up, the queue hands out the run with the highest
+effective priority and, among equals, the earliest scheduled time.
+
+* ``priority`` comes from the job definition (higher runs first, default 0).
+* Aging: every ``aging_seconds`` a run has waited raises its effective priority by one, so a
+  steady stream of important runs cannot hold back low-priority work forever.
+* Reserved capacity: the last ``reserved_workers`` slots of a pool only go to runs of jobs
+  whose own priority is at least ``reserved_priority``; aging does not make a run eligible.
+  A health check therefore finds a free worker even while a batch of reports fills the rest.
+
+Each queue counts, per job priority, the runs waiting and how long started runs waited for
+their slot, which GET /api/scheduler/queues reports for sizing pools.
+"""
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# priority of every job that has a non-default one, by job ID; maintained by the loader.
+_job_priorities: Dict[str, int] = {}
+
+def set_job_priority(job_id: str, priority: Optional[int]) -> None:
+    if not priority:
+        _job_priorities.pop(job_id, None)
+    else:
+        _job_priorities[job_id] = priority
+
+def job_priority(job_id: str) -> int:
+    return _job_priorities.get(job_id, 0)
+
+class _Entry:
+    __slots__ = ('item', 'priority', 'scheduled_time', 'queued_at', 'sequence')
+
+    def __init__(self, item: Any, priority: int, scheduled_time: datetime, queued_at: float, sequence: int):
+        self.item = item
+        self.priority = priority
+        self.scheduled_time = scheduled_time
+        self.queued_at = queued_at
+        self.sequence = sequence
+
+class _WaitStats:
+    __slots__ = ('started', 'total_wait', 'max_wait')
+
+    def __init__(self):
+        self.started = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+class DispatchQueue:
+    """
+    Runs waiting for a slot of one pool. Not thread-safe: the owning executor calls it under
+    its own lock.
+    """
+    def __init__(self, reserved_workers: int = 0, reserved_priority: int = 0, aging_seconds: Optional[float] = None):
+        if reserved_workers < 0:
+            raise ValueError("reserved_workers cannot be negative")
+        if aging_seconds is not None and aging_seconds <= 0:
+            raise ValueError("aging_seconds must be positive")
+        self.reserved_workers = reserved_workers
+        self.reserved_priority = reserved_priority
+        self.aging_seconds = aging_seconds
+        self._entries: List[_Entry] = []
+        self._sequence = itertools.count()
+        self._waits: Dict[int, _WaitStats] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def push(self, item: Any, priority: int, scheduled_time: datetime) -> None:
+        self._entries.append(_Entry(item, priority, scheduled_time, time.monotonic(), next(self._sequence)))
+
+    def pop(self, active: int, max_workers: int) -> Optional[Any]:
+        """Takes the next run to start in a pool with active of max_workers slots taken, if any may start."""
+        if active >= max_workers or not self._entries:
+            return None
+        # Only runs entitled to the reserved slots may take them.
+        reserved_only = active >= max_workers - self.reserved_workers
+        now = time.monotonic()
+        best, best_key = None, None
+        for index, entry in enumerate(self._entries):
+            if reserved_only and entry.priority < self.reserved_priority:
+                continue
+            key = (-self._effective_priority(entry, now), entry.scheduled_time, entry.sequence)
+            if best_key is None or key < best_key:
+                best, best_key = index, key
+        if best is None:
+            return None
+        entry = self._entries.pop(best)
+        stats = self._waits.get(entry.priority)
+        if stats is None:
+            stats = self._waits[entry.priority] = _WaitStats()
+        wait = now - entry.queued_at
+        stats.started += 1
+        stats.total_wait += wait
+        stats.max_wait = max(stats.max_wait, wait)
+        return entry.item
+
+    def clear(self) -> List[Any]:
+        """Removes and returns every waiting run."""
+        items = [entry.item for entry in self._entries]
+        self._entries.clear()
+        return items
+
+    def _effective_priority(self, entry: _Entry, now: float) -> int:
+        if self.aging_seconds is None:
+            return entry.priority
+        return entry.priority + int((now - entry.queued_at) // self.aging_seconds)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Queue depth and slot waits per job priority, highest priority first."""
+        now = time.monotonic()
+        queued: Dict[int, List[float]] = {}
+        for entry in self._entries:
+            queued.setdefault(entry.priority, []).append(now - entry.queued_at)
+        rows = []
+        for priority in sorted(set(queued) | set(self._waits), reverse=True):
+            waiting = queued.get(priority, [])
+            stats = self._waits.get(priority) or _WaitStats()
+            rows.append(dict(
+                priority=priority, queued=len(waiting), oldest_wait_seconds=max(waiting, default=0.0),
+                started=stats.started, mean_wait_seconds=stats.total_wait / stats.started if stats.started else 0.0,
+                max_wait_seconds=stats.max_wait,
+            ))
+        return rows
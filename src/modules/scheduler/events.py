@@ -0,0 +1,33 @@
+"""
+Scheduler events of this application, dispatched through APScheduler's listener mechanism.
+
+APScheduler reports a run as SUBMITTED once it is handed to an executor. The executors of this
+application may hold a submitted run back, waiting for concurrency group capacity or a free
+worker, and dispatch STARTED when it actually begins, with the time it waited. A run that is
+dropped while held back, because the executor or the concurrency groups shut down, is reported
+as MISSED.
+"""
+import time
+from typing import List, Optional
+
+from apscheduler.events import EVENT_JOB_MISSED, JobExecutionEvent, JobSubmissionEvent
+
+# Above APScheduler's own event codes, so that EVENT_ALL listeners do not receive it.
+EVENT_JOB_STARTED = 2 ** 20
+
+class JobStartedEvent(JobSubmissionEvent):
+    def __init__(self, job_id: str, jobstore: str, scheduled_run_times: List, wait_seconds: float):
+        super().__init__(EVENT_JOB_STARTED, job_id, jobstore, scheduled_run_times)
+        self.wait_seconds = wait_seconds
+
+def dispatch_started(scheduler, job, run_times: List, submitted_at: float, started_at: Optional[float] = None) -> None:
+    """
+    Dispatches STARTED for a run submitted at submitted_at and started at started_at (now if
+    not given), both time.monotonic() values.
+    """
+    started_at = time.monotonic() if started_at is None else started_at
+    scheduler._dispatch_event(JobStartedEvent(job.id, job._jobstore_alias, run_times, started_at - submitted_at))
+
+def missed_events(job, run_times: List) -> List[JobExecutionEvent]:
+    """The events an executor reports for a run it dropped before starting it."""
+    return [JobExecutionEvent(EVENT_JOB_MISSED, job.id, job._jobstore_alias, run_time) for run_time in run_times]
@@ -0,0 +1,95 @@
+"""
+Executor pools of the scheduler, built from ``scheduler.executors`` in config.yaml.
+
+Each entry names a pool and sizes it:
+
+* ``thread`` pools run jobs in threads of this process (I/O-bound jobs);
+* ``process`` pools run each job in a worker process of its own, outside the GIL (CPU-bound
+  jobs). The job and its return value must be picklable. ``start_method`` picks how workers
+  are started (forkserver by default, spawn where it is unavailable);
+* ``command`` pools run command jobs as asyncio subprocesses supervised by a single thread
+  (see command_runner); max_workers bounds the number of concurrent processes.
+
+A job picks its pool with the ``executor`` field of its definition; "default" means the
+'default' pool for Python jobs and the 'command' pool for command jobs. Jobs in different pools
+do not compete for workers, so a burst of slow jobs in one pool cannot delay jobs in another.
+Housekeeping jobs run in a separate pool of their own (INTERNAL_EXECUTOR).
+
+All pools enforce the jobs' timeout_seconds (see timeouts); max_workers counts the runs holding
+a slot, and a timed-out run gives its slot back at the deadline. Runs of jobs that claim
+concurrency groups (see resources) wait for them before they take a slot.
+
+Thread and process pools start waiting runs by job priority (see dispatch). Their entries may
+also set ``reserved_workers`` (slots kept for jobs of at least ``reserved_priority``) and
+``aging_seconds`` (null disables aging).
+"""
+import multiprocessing
+from typing import Any, Dict, Mapping, Optional
+
+from apscheduler.executors.pool import ThreadPoolExecutor
+
+from modules.scheduler.command_runner import CommandExecutor
+from modules.scheduler.resources import ResourceManager
+from modules.scheduler.timeouts import TimeoutProcessPoolExecutor, TimeoutThreadPoolExecutor
+
+DEFAULT_EXECUTOR = "default"
+COMMAND_EXECUTOR = "command"
+INTERNAL_EXECUTOR = "internal"
+INTERNAL_EXECUTOR_WORKERS = 2
+DEFAULT_AGING_SECONDS = 60
+DISPATCH_OPTIONS = ('reserved_workers', 'reserved_priority', 'aging_seconds')
+
+EXECUTOR_TYPES = {
+    'thread': TimeoutThreadPoolExecutor,
+    'process': TimeoutProcessPoolExecutor,
+    'command': CommandExecutor,
+}
+
+def is_command_executor(executor) -> bool:
+    return isinstance(executor, CommandExecutor)
+
+def create_executors(definitions: Mapping[str, Mapping[str, Any]], resources: Optional[ResourceManager] = None) -> Dict[str, Any]:
+    """
+    Builds the executors for the scheduler from {name: {type, max_workers, ...}}. A 'default' thread
+    pool and a 'command' pool are added when not configured; the internal pool is always added.
+    Job pools enforce the concurrency group claims kept by resources.
+    """
+    if INTERNAL_EXECUTOR in definitions:
+        raise ValueError(f"Executor name '{INTERNAL_EXECUTOR}' is reserved for housekeeping jobs")
+    executors = {}
+    for name, options in definitions.items():
+        options = options or {}
+        kind = options.get('type', 'thread')
+        if kind not in EXECUTOR_TYPES:
+            raise ValueError(f"Executor '{name}' has unknown type '{kind}'; expected one of {', '.join(EXECUTOR_TYPES)}")
+        max_workers = int(options.get('max_workers', 10))
+        if max_workers < 1:
+            raise ValueError(f"Executor '{name}' needs at least one worker")
+        if kind == 'command':
+            if any(option in options for option in DISPATCH_OPTIONS):
+                raise ValueError(f"Executor '{name}' is a command pool; priority dispatch options apply to thread and process pools")
+            executors[name] = CommandExecutor(max_workers, resources=resources)
+            continue
+        aging_seconds = options.get('aging_seconds', DEFAULT_AGING_SECONDS)
+        extra = {}
+        if 'start_method' in options:
+            if kind != 'process':
+                raise ValueError(f"Executor '{name}' is a {kind} pool; start_method applies to process pools")
+            if options['start_method'] not in multiprocessing.get_all_start_methods():
+                raise ValueError(
+                    f"Executor '{name}' has unknown start_method '{options['start_method']}'; "
+                    f"expected one of {', '.join(multiprocessing.get_all_start_methods())}"
+                )
+            extra['start_method'] = options['start_method']
+        try:
+            executors[name] = EXECUTOR_TYPES[kind](
+                max_workers, resources=resources, reserved_workers=int(options.get('reserved_workers', 0)),
+                reserved_priority=int(options.get('reserved_priority', 0)),
+                aging_seconds=None if aging_seconds is None else float(aging_seconds), **extra,
+            )
+        except ValueError as e:
+            raise ValueError(f"Executor '{name}': {e}") from e
+    executors.setdefault(DEFAULT_EXECUTOR, TimeoutThreadPoolExecutor(10, resources=resources, aging_seconds=DEFAULT_AGING_SECONDS))
+    executors.setdefault(COMMAND_EXECUTOR, CommandExecutor(100, resources=resources))
+    executors[INTERNAL_EXECUTOR] = ThreadPoolExecutor(INTERNAL_EXECUTOR_WORKERS)
+    return executors
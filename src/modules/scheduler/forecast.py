@@ -0,0 +1,277 @@
+"""
+Forecast of upcoming fire times.
+
+Occurrences are derived from the triggers of the scheduled jobs, starting at each job's
+next_run_time:
+
+* interval triggers are expanded arithmetically (next_run_time + k * interval);
+* cron triggers are expanded once per trigger fingerprint (its repr, which covers fields,
+  start/end date, timezone and jitter) and the expansion is cached, so thousands of jobs sharing
+  a schedule cost a single expansion;
+* date triggers fire once.
+
+The per-minute histogram is built in bulk: interval series whose step is a whole number of
+minutes are added with one strided prefix sum per distinct step, and jobs sharing a cron
+expansion from the same position are added once with a weight. Jitter is ignored.
+
+Job state is cached as well and refreshed through the job change journal, so a forecast only
+loads the jobs that changed since the previous one.
+
+analyze_spreading works from job definitions instead, comparing their fire times with and
+without the spreading of their triggers (see spreading).
+"""
+import bisect
+import copy
+import math
+import random
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+
+from modules.scheduler import schemas, spreading
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+# Upper bound on occurrences expanded for one trigger, whatever the horizon.
+MAX_EXPANSION = 100000
+
+def trigger_fingerprint(trigger) -> str:
+    """Identifies the schedule of a trigger; equal fingerprints expand to equal fire times."""
+    return repr(trigger)
+
+def _timestamp(moment: datetime) -> float:
+    return moment.timestamp()
+
+def expand_trigger(trigger, start: float, end: float, tz) -> List[float]:
+    """Fire times of trigger in [start, end) as timestamps, by repeated get_next_fire_time."""
+    if getattr(trigger, 'jitter', None):
+        trigger = copy.copy(trigger)
+        trigger.jitter = None
+    times: List[float] = []
+    fire = trigger.get_next_fire_time(None, datetime.fromtimestamp(start, tz))
+    while fire is not None and len(times) < MAX_EXPANSION:
+        fire_ts = _timestamp(fire)
+        if fire_ts >= end:
+            break
+        times.append(fire_ts)
+        fire = trigger.get_next_fire_time(fire, fire)
+    return times
+
+class _JobEntry:
+    __slots__ = ('trigger', 'fingerprint', 'next_run')
+
+    def __init__(self, job):
+        self.trigger = job.trigger
+        self.fingerprint = trigger_fingerprint(job.trigger)
+        self.next_run = _timestamp(job.next_run_time) if job.next_run_time else None
+
+class ForecastEngine:
+    def __init__(self, scheduler, journal, jobstore: Optional[str] = None, max_cached_expansions: int = 10000):
+        self.scheduler = scheduler
+        self.journal = journal
+        self.jobstore = jobstore
+        self.max_cached_expansions = max_cached_expansions
+        self._jobs: Dict[str, _JobEntry] = {}
+        self._position: Optional[Tuple[str, int]] = None
+        # fingerprint -> (start, end, timestamps); least recently used first.
+        self._expansions: "OrderedDict[str, Tuple[float, float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refresh_jobs(self) -> None:
+        epoch, seq = self.journal.epoch, self.journal.seq
+        changed = self.journal.changes_since(*self._position) if self._position else None
+        if changed is None or None in changed:
+            self._jobs = {job.id: _JobEntry(job) for job in self.scheduler.get_jobs(jobstore=self.jobstore)}
+        else:
+            for job_id in changed:
+                job = self.scheduler.get_job(job_id, self.jobstore)
+                if job is None:
+                    self._jobs.pop(job_id, None)
+                else:
+                    self._jobs[job_id] = _JobEntry(job)
+        self._position = (epoch, seq)
+
+    def _cron_times(self, entry: _JobEntry, start: float, end: float) -> List[float]:
+        cached = self._expansions.get(entry.fingerprint)
+        if cached is not None and cached[0] <= start and cached[1] >= end:
+            self._expansions.move_to_end(entry.fingerprint)
+            return cached[2]
+        # Expand twice the requested span so that the next forecasts reuse the expansion.
+        expanded_end = end + (end - start)
+        times = expand_trigger(entry.trigger, start, expanded_end, entry.trigger.timezone)
+        # An expansion cut short at MAX_EXPANSION only covers up to its last fire time.
+        covered_end = times[-1] if len(times) >= MAX_EXPANSION else expanded_end
+        self._expansions[entry.fingerprint] = (start, covered_end, times)
+        while len(self._expansions) > self.max_cached_expansions:
+            self._expansions.popitem(last=False)
+        return times
+
+    def _interval_series(self, entry: _JobEntry, start: float, end: float) -> Tuple[float, float, int]:
+        """(first, step, count) of the arithmetic series of fire times in [start, end)."""
+        step = entry.trigger.interval_length
+        first = entry.next_run
+        if first < start:
+            first += math.ceil((start - first) / step) * step
+        if entry.trigger.end_date is not None:
+            end = min(end, _timestamp(entry.trigger.end_date) + 1e-6)
+        count = max(0, math.ceil((end - first) / step)) if first < end else 0
+        return first, step, min(count, MAX_EXPANSION)
+
+    def forecast(
+        self, start: datetime, end: datetime, job_ids: Optional[List[str]] = None,
+        include_fire_times: bool = True, max_fire_times: int = 500,
+    ) -> schemas.Forecast:
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=timezone.utc)
+        origin = math.floor(_timestamp(start) / 60) * 60
+        start_ts, end_ts = _timestamp(start), _timestamp(end)
+        minutes = max(1, math.ceil((end_ts - origin) / 60))
+        histogram = [0] * minutes
+
+        # Interval series with whole-minute steps: step in minutes -> start/stop markers per minute.
+        starts: Dict[int, List[int]] = {}
+        stops: Dict[int, List[int]] = {}
+        # Occurrence lists shared by several jobs: (id of list, first index) -> weight.
+        shared: Counter = Counter()
+        shared_lists: Dict[int, List[float]] = {}
+        loose: List[float] = []
+        results: List[schemas.JobForecast] = []
+
+        with self._lock:
+            self._refresh_jobs()
+            wanted = set(job_ids) if job_ids else None
+            for job_id, entry in self._jobs.items():
+                if entry.next_run is None or (wanted is not None and job_id not in wanted):
+                    continue
+                trigger = entry.trigger
+                from_ts = max(start_ts, entry.next_run)
+                fire_times: List[float] = []
+                if isinstance(trigger, IntervalTrigger):
+                    first, step, count = self._interval_series(entry, start_ts, end_ts)
+                    if count:
+                        if step % 60 == 0:
+                            step_minutes = int(step // 60)
+                            first_index = int((first - origin) // 60)
+                            markers = starts.setdefault(step_minutes, [0] * (minutes + step_minutes))
+                            markers[first_index] += 1
+                            stop_index = first_index + count * step_minutes
+                            if stop_index < minutes:
+                                stops.setdefault(step_minutes, [0] * (minutes + step_minutes))[stop_index] += 1
+                        else:
+                            loose.extend(first + k * step for k in range(count))
+                        if include_fire_times:
+                            fire_times = [first + k * step for k in range(min(count, max_fire_times))]
+                elif isinstance(trigger, CronTrigger):
+                    times = self._cron_times(entry, start_ts, end_ts)
+                    lo = bisect.bisect_left(times, from_ts)
+                    hi = bisect.bisect_left(times, end_ts, lo)
+                    count = hi - lo
+                    shared_lists[id(times)] = times
+                    shared[(id(times), lo, hi)] += 1
+                    if include_fire_times:
+                        fire_times = times[lo:min(hi, lo + max_fire_times)]
+                elif isinstance(trigger, DateTrigger):
+                    fire_times = [entry.next_run] if start_ts <= entry.next_run < end_ts else []
+                    count = len(fire_times)
+                    loose.extend(fire_times)
+                else:
+                    fire_times = expand_trigger(trigger, from_ts, end_ts, timezone.utc)
+                    count = len(fire_times)
+                    loose.extend(fire_times)
+                    fire_times = fire_times[:max_fire_times]
+                if count:
+                    results.append(schemas.JobForecast(
+                        job_id=job_id, count=count, truncated=include_fire_times and count > len(fire_times),
+                        fire_times=[datetime.fromtimestamp(ts, timezone.utc) for ts in fire_times] if include_fire_times else [],
+                    ))
+
+        for step_minutes, markers in starts.items():
+            stop_markers = stops.get(step_minutes)
+            running = [0] * step_minutes
+            for index in range(minutes):
+                phase = index % step_minutes
+                running[phase] += markers[index] - (stop_markers[index] if stop_markers else 0)
+                histogram[index] += running[phase]
+        for (list_id, lo, hi), weight in shared.items():
+            for ts in shared_lists[list_id][lo:hi]:
+                histogram[int((ts - origin) // 60)] += weight
+        for ts in loose:
+            histogram[int((ts - origin) // 60)] += 1
+
+        origin_time = datetime.fromtimestamp(origin, timezone.utc)
+        results.sort(key=lambda item: item.job_id)
+        return schemas.Forecast(
+            start=start, end=end, jobs=results,
+            histogram=[
+                schemas.ForecastBucket(minute=origin_time + timedelta(minutes=index), fires=fires)
+                for index, fires in enumerate(histogram) if fires
+            ],
+            peak_fires_per_minute=max(histogram),
+        )
+
+    def invalidate(self) -> None:
+        """Drops all cached job state and expansions."""
+        with self._lock:
+            self._jobs.clear()
+            self._position = None
+            self._expansions.clear()
+
+def _definition_fire_times(cfg: schemas.JobConfig, spread: bool, start: datetime, end: datetime) -> List[float]:
+    trigger_type, arguments = spreading.trigger_arguments(cfg.id, cfg.trigger, spread)
+    if trigger_type == 'cron':
+        trigger = CronTrigger(**arguments)
+    else:
+        # As when the scheduler starts, interval jobs without a spread phase begin counting together.
+        arguments.setdefault('start_date', start)
+        trigger = IntervalTrigger(**arguments)
+    times = expand_trigger(trigger, _timestamp(start), _timestamp(end), trigger.timezone)
+    if arguments.get('jitter'):
+        # A sample of the random delays, seeded by the job ID so that the analysis is repeatable.
+        rng = random.Random(spreading.job_hash(cfg.id, 'jitter'))
+        times = [ts + rng.uniform(0, arguments['jitter']) for ts in times]
+    return times
+
+def _minute_histogram(times: Iterable[float], start: datetime) -> List[schemas.ForecastBucket]:
+    origin = math.floor(_timestamp(start) / 60) * 60
+    counts = Counter(int((ts - origin) // 60) for ts in times)
+    origin_time = datetime.fromtimestamp(origin, timezone.utc)
+    return [
+        schemas.ForecastBucket(minute=origin_time + timedelta(minutes=index), fires=fires)
+        for index, fires in sorted(counts.items())
+    ]
+
+def analyze_spreading(configs: Iterable[schemas.JobConfig], start: datetime, end: datetime) -> schemas.SpreadAnalysis:
+    """
+    Per-minute histograms of the fire times of job definitions in [start, end), with H taking the
+    lowest value of its range and without spread_seconds and jitter (before), and as scheduled (after).
+    """
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
+    before: List[float] = []
+    after: List[float] = []
+    spread_jobs = []
+    for cfg in configs:
+        unspread = _definition_fire_times(cfg, False, start, end)
+        before.extend(unspread)
+        if spreading.is_spread(cfg.trigger):
+            spread_jobs.append(cfg.id)
+            # Jitter may push the last fires past the end.
+            after.extend(ts for ts in _definition_fire_times(cfg, True, start, end) if ts < _timestamp(end))
+        else:
+            after.extend(unspread)
+    before_histogram, after_histogram = _minute_histogram(before, start), _minute_histogram(after, start)
+    return schemas.SpreadAnalysis(
+        start=start, end=end, spread_jobs=sorted(spread_jobs), before=before_histogram, after=after_histogram,
+        peak_before=max((bucket.fires for bucket in before_histogram), default=0),
+        peak_after=max((bucket.fires for bucket in after_histogram), default=0),
+    )
@@ -0,0 +1,272 @@
+"""
+In-memory index of the scheduled jobs.
+
+Read endpoints serve job listings from this index instead of scheduler.get_jobs(), which with
+the SQLAlchemy jobstore selects and unpickles every job on each call. The index holds a
+pre-rendered JobInfo per job plus secondary indexes by state, trigger type, next run time and ID,
+and is kept current by scheduler job events:
+
+* added/modified (which covers pause, resume and reschedule) reload the one job;
+* submitted/max-instances recompute next_run_time from the trigger the way the scheduler does,
+  so that regular runs do not cost a jobstore read;
+* removed drops the job.
+
+``rebuild`` loads everything once at startup, when jobs already in the persistent jobstore
+have not produced any events.
+"""
+import bisect
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED, EVENT_JOB_ADDED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+)
+from apscheduler.util import datetime_to_utc_timestamp
+
+from modules.scheduler import dispatch, schemas, timeouts
+from modules.scheduler.command_runner import COMMAND_FUNC_REF
+from modules.scheduler.resources import ResourceManager
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+INDEX_EVENTS = (
+    EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED | EVENT_JOB_SUBMITTED | EVENT_JOB_MAX_INSTANCES
+    | EVENT_ALL_JOBS_REMOVED
+)
+
+JOB_STATES = ('scheduled', 'paused')
+SORT_KEYS = ('id', 'next_run_time', '-next_run_time')
+
+def trigger_type(trigger) -> str:
+    name = trigger.__class__.__name__.lower()
+    for known in ('cron', 'interval', 'date'):
+        if known in name:
+            return known
+    return 'unknown'
+
+def render_trigger(trigger) -> Dict:
+    """Describes an APScheduler trigger in the shape of the trigger schemas."""
+    trigger_dict = {"type": trigger_type(trigger)}
+    if trigger_dict["type"] == "cron":
+        for field in trigger.fields:
+            trigger_dict[field.name] = str(field)
+    elif trigger_dict["type"] == "interval":
+        td = trigger.interval
+        trigger_dict['weeks'] = td.days // 7
+        trigger_dict['days'] = td.days % 7
+        trigger_dict['hours'] = td.seconds // 3600
+        trigger_dict['minutes'] = (td.seconds // 60) % 60
+        trigger_dict['seconds'] = td.seconds % 60
+    if getattr(trigger, 'jitter', None):
+        trigger_dict['jitter'] = trigger.jitter
+    return trigger_dict
+
+def render_job_info(job, resources: Optional[ResourceManager] = None) -> schemas.JobInfo:
+    if job.func_ref == COMMAND_FUNC_REF:
+        command = {key: value for key, value in job.kwargs.items() if key not in ('job_id', 'timeout_seconds')}
+        job_fields = dict(job_type='command', command=command)
+    else:
+        job_fields = dict(func=job.func_ref, args=list(job.args), kwargs=job.kwargs)
+    return schemas.JobInfo(
+        id=job.id, trigger=render_trigger(job.trigger), max_instances=job.max_instances,
+        coalesce=job.coalesce, misfire_grace_time=job.misfire_grace_time, executor=job.executor,
+        timeout_seconds=timeouts.job_timeout(job.id),
+        resources=resources.resources_for(job.id) if resources is not None else None, priority=dispatch.job_priority(job.id),
+        next_run_time=job.next_run_time, **job_fields
+    )
+
+class _Entry:
+    __slots__ = ('info', 'trigger', 'state', 'trigger_type', 'next_run')
+
+    def __init__(self, info: schemas.JobInfo, trigger):
+        self.info = info
+        self.trigger = trigger
+        self.trigger_type = trigger_type(trigger)
+        self.set_next_run(info.next_run_time)
+
+    def set_next_run(self, next_run_time: Optional[datetime]) -> None:
+        self.next_run = datetime_to_utc_timestamp(next_run_time) if next_run_time else None
+        self.state = 'scheduled' if next_run_time else 'paused'
+
+class JobIndex:
+    def __init__(self, scheduler, jobstore: Optional[str] = None, resources: Optional[ResourceManager] = None):
+        self.scheduler = scheduler
+        self.jobstore = jobstore
+        # Concurrency group claims are not part of the APScheduler job; they are looked up here.
+        self.resources = resources
+        self._lock = threading.RLock()
+        self._entries: Dict[str, _Entry] = {}
+        self._by_state: Dict[str, Set[str]] = {state: set() for state in JOB_STATES}
+        self._by_trigger: Dict[str, Set[str]] = {}
+        self._next_runs: List[Tuple[float, str]] = []
+        self._ids: List[str] = []
+        # Event sequence per job, so that a rebuild does not overwrite newer event updates.
+        self._seq = 0
+        self._touched: Dict[str, int] = {}
+
+    # --- maintenance ---
+
+    def __call__(self, event) -> None:
+        try:
+            if event.code == EVENT_ALL_JOBS_REMOVED:
+                if event.alias is None or event.alias == self.jobstore:
+                    with self._lock:
+                        for job_id in list(self._entries):
+                            self._touch(job_id)
+                            self._remove(job_id)
+                return
+            if self.jobstore is not None and event.jobstore != self.jobstore:
+                return
+            if event.code == EVENT_JOB_REMOVED:
+                with self._lock:
+                    self._touch(event.job_id)
+                    self._remove(event.job_id)
+            elif event.code in (EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES):
+                self._advance(event.job_id, event.scheduled_run_times)
+            else:
+                self._reload(event.job_id)
+        except Exception as e:
+            logger.error(f"Failed to update job index for event {event.code}: {e}", exc_info=True)
+
+    def rebuild(self) -> int:
+        """Reloads every job from the jobstore. Returns the number of jobs indexed."""
+        with self._lock:
+            started = self._seq
+        # Loaded without holding the index lock: the scheduler thread dispatches events while
+        # holding the jobstore lock, and the listener needs the index lock.
+        jobs = self.scheduler.get_jobs(jobstore=self.jobstore)
+        with self._lock:
+            loaded = {job.id for job in jobs}
+            for job in jobs:
+                if self._touched.get(job.id, 0) <= started:
+                    self._put(job.id, _Entry(render_job_info(job, self.resources), job.trigger))
+            for job_id in list(self._entries):
+                if job_id not in loaded and self._touched.get(job_id, 0) <= started:
+                    self._remove(job_id)
+            return len(self._entries)
+
+    def _touch(self, job_id: str) -> None:
+        self._seq += 1
+        self._touched[job_id] = self._seq
+
+    def _reload(self, job_id: str) -> None:
+        job = self.scheduler.get_job(job_id, self.jobstore)
+        with self._lock:
+            self._touch(job_id)
+            if job is None:
+                self._remove(job_id)
+            else:
+                self._put(job_id, _Entry(render_job_info(job, self.resources), job.trigger))
+
+    def _advance(self, job_id: str, run_times: List[datetime]) -> None:
+        with self._lock:
+            entry = self._entries.get(job_id)
+            if entry is None or not run_times or getattr(entry.trigger, 'jitter', None):
+                # Jittered triggers cannot be predicted; read the stored next run time instead.
+                self._reload(job_id)
+                return
+            self._touch(job_id)
+            now = datetime.now(run_times[-1].tzinfo)
+            next_run_time = entry.trigger.get_next_fire_time(run_times[-1], now)
+            if next_run_time is None:
+                # The scheduler removes finished jobs and dispatches EVENT_JOB_REMOVED.
+                return
+            self._unindex_next_run(job_id, entry)
+            entry.info = entry.info.model_copy(update={'next_run_time': next_run_time})
+            self._by_state[entry.state].discard(job_id)
+            entry.set_next_run(next_run_time)
+            self._by_state[entry.state].add(job_id)
+            if entry.next_run is not None:
+                bisect.insort(self._next_runs, (entry.next_run, job_id))
+
+    def _put(self, job_id: str, entry: _Entry) -> None:
+        if job_id in self._entries:
+            self._remove(job_id)
+        self._entries[job_id] = entry
+        self._by_state[entry.state].add(job_id)
+        self._by_trigger.setdefault(entry.trigger_type, set()).add(job_id)
+        if entry.next_run is not None:
+            bisect.insort(self._next_runs, (entry.next_run, job_id))
+        bisect.insort(self._ids, job_id)
+
+    def _remove(self, job_id: str) -> None:
+        entry = self._entries.pop(job_id, None)
+        if entry is None:
+            return
+        self._by_state[entry.state].discard(job_id)
+        self._by_trigger.get(entry.trigger_type, set()).discard(job_id)
+        self._unindex_next_run(job_id, entry)
+        position = bisect.bisect_left(self._ids, job_id)
+        if position < len(self._ids) and self._ids[position] == job_id:
+            del self._ids[position]
+
+    def _unindex_next_run(self, job_id: str, entry: _Entry) -> None:
+        if entry.next_run is None:
+            return
+        position = bisect.bisect_left(self._next_runs, (entry.next_run, job_id))
+        if position < len(self._next_runs) and self._next_runs[position] == (entry.next_run, job_id):
+            del self._next_runs[position]
+
+    # --- reads ---
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, job_id: str) -> Optional[schemas.JobInfo]:
+        entry = self._entries.get(job_id)
+        return entry.info if entry is not None else None
+
+    def job_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._ids)
+
+    def scheduled_between(self, start: datetime, end: datetime) -> List[schemas.JobInfo]:
+        """Jobs whose next run time is in [start, end), soonest first."""
+        with self._lock:
+            lo = bisect.bisect_left(self._next_runs, (datetime_to_utc_timestamp(start), ''))
+            hi = bisect.bisect_left(self._next_runs, (datetime_to_utc_timestamp(end), ''))
+            return [self._entries[job_id].info for _, job_id in self._next_runs[lo:hi]]
+
+    def query(
+        self, state: Optional[str] = None, trigger: Optional[str] = None, job_ids: Optional[Iterable[str]] = None,
+        sort: str = 'id', skip: int = 0, limit: Optional[int] = None,
+    ) -> Tuple[int, List[schemas.JobInfo]]:
+        """
+        Filters by state ('scheduled' or 'paused'), trigger type and job IDs, sorts by 'id',
+        'next_run_time' or '-next_run_time' (paused jobs last) and returns the total number of
+        matches together with the requested page.
+        """
+        if sort not in SORT_KEYS:
+            raise ValueError(f"sort must be one of {', '.join(SORT_KEYS)}")
+        if state is not None and state not in JOB_STATES:
+            raise ValueError(f"state must be one of {', '.join(JOB_STATES)}")
+        with self._lock:
+            candidates: Optional[Set[str]] = None
+            filters = []
+            if state is not None:
+                filters.append(self._by_state[state])
+            if trigger is not None:
+                filters.append(self._by_trigger.get(trigger, set()))
+            if job_ids is not None:
+                filters.append(set(job_ids))
+            if filters:
+                filters.sort(key=len)
+                candidates = set(filters[0]).intersection(*filters[1:])
+
+            if sort == 'id':
+                ordered = self._ids
+            else:
+                ordered = [job_id for _, job_id in self._next_runs]
+                if sort == '-next_run_time':
+                    ordered.reverse()
+                if state != 'scheduled':
+                    ordered.extend(job_id for job_id in self._ids if self._entries[job_id].next_run is None)
+            if candidates is not None:
+                if not candidates:
+                    return 0, []
+                ordered = [job_id for job_id in ordered if job_id in candidates]
+            end = None if limit is None else skip + limit
+            return len(ordered), [self._entries[job_id].info for job_id in ordered[skip:end]]
@@ -0,0 +1,234 @@
+"""
+A jobstore that keeps jobs as compact JSON instead of pickled blobs.
+
+Jobs in this application reference their callable by dotted path and carry JSON-compatible
+args/kwargs (they come from JobDefinition rows), so a job serializes to a small JSON document:
+the job fields plus a description of its trigger. Jobs whose trigger or arguments cannot be
+expressed that way fall back to a pickled state, so the store accepts anything the
+SQLAlchemyJobStore does.
+
+Due jobs are found with an indexed range scan on next_run_time that reads only job IDs; the
+parsed job states are kept in a write-through cache, so reads only touch the database for jobs
+this process has not seen yet. The store uses the application's engine (core.database.engine)
+and its connection pool unless an engine is passed explicitly. Like the other APScheduler
+jobstores, a table must be used by a single scheduler only, since the cache is not shared.
+"""
+import base64
+import json
+import pickle
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.date import DateTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+from sqlalchemy import Column, Float, MetaData, String, Table, Text, delete, insert, null, select, update
+from sqlalchemy.exc import IntegrityError
+
+from core import database
+
+# Upper bound on IDs per IN (...) clause, well below SQLite's bound parameter limit.
+_CHUNK_SIZE = 500
+
+def _dt(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def _parse_dt(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+def _pickled(value: Any) -> str:
+    return base64.b64encode(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)).decode('ascii')
+
+def _unpickled(value: str) -> Any:
+    return pickle.loads(base64.b64decode(value))
+
+def trigger_to_dict(trigger) -> Dict[str, Any]:
+    """Describes a cron, interval or date trigger as JSON-compatible values."""
+    if type(trigger) is CronTrigger:
+        return {
+            'type': 'cron', 'fields': {field.name: str(field) for field in trigger.fields if not field.is_default},
+            'timezone': str(trigger.timezone), 'start_date': _dt(trigger.start_date),
+            'end_date': _dt(trigger.end_date), 'jitter': trigger.jitter,
+        }
+    if type(trigger) is IntervalTrigger:
+        return {
+            'type': 'interval', 'seconds': trigger.interval_length,
+            'timezone': str(trigger.timezone), 'start_date': _dt(trigger.start_date),
+            'end_date': _dt(trigger.end_date), 'jitter': trigger.jitter,
+        }
+    if type(trigger) is DateTrigger:
+        return {'type': 'date', 'run_date': _dt(trigger.run_date)}
+    return {'type': 'pickle', 'data': _pickled(trigger)}
+
+def trigger_from_dict(data: Dict[str, Any]):
+    kind = data['type']
+    if kind == 'cron':
+        return CronTrigger(
+            timezone=data['timezone'], start_date=_parse_dt(data['start_date']),
+            end_date=_parse_dt(data['end_date']), jitter=data['jitter'], **data['fields'],
+        )
+    if kind == 'interval':
+        return IntervalTrigger(
+            seconds=data['seconds'], timezone=data['timezone'], start_date=_parse_dt(data['start_date']),
+            end_date=_parse_dt(data['end_date']), jitter=data['jitter'],
+        )
+    if kind == 'date':
+        run_date = _parse_dt(data['run_date'])
+        return DateTrigger(run_date=run_date, timezone=run_date.tzinfo)
+    return _unpickled(data['data'])
+
+def serialize_job_state(state: Dict[str, Any]) -> str:
+    """Serializes a Job.__getstate__() dict to JSON, pickling it whole if it is not JSON-compatible."""
+    document = dict(state, trigger=trigger_to_dict(state['trigger']), args=list(state['args']),
+                    next_run_time=_dt(state['next_run_time']))
+    if isinstance(document['misfire_grace_time'], timedelta):
+        document['misfire_grace_time'] = document['misfire_grace_time'].total_seconds()
+    try:
+        return json.dumps(document, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return json.dumps({'pickle': _pickled(state)}, separators=(',', ':'))
+
+def deserialize_job_state(raw: str) -> Dict[str, Any]:
+    document = json.loads(raw)
+    if 'pickle' in document:
+        return _unpickled(document['pickle'])
+    document['trigger'] = trigger_from_dict(document['trigger'])
+    document['args'] = tuple(document['args'])
+    document['next_run_time'] = _parse_dt(document['next_run_time'])
+    return document
+
+class JSONJobStore(BaseJobStore):
+    def __init__(self, engine=None, tablename: str = 'apscheduler_json_jobs', metadata: Optional[MetaData] = None):
+        super().__init__()
+        self.engine = engine
+        self.jobs_t = Table(
+            tablename, metadata or MetaData(),
+            Column('id', String(191), primary_key=True),
+            Column('next_run_time', Float(25), index=True),
+            Column('job_state', Text, nullable=False),
+        )
+        # job ID -> parsed job state (trigger included); Job objects are built from it per read
+        # so that the scheduler's in-place modifications never leak into the cache.
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        if self.engine is None:
+            database.init_db()
+            self.engine = database.engine
+        self.jobs_t.create(self.engine, checkfirst=True)
+
+    def shutdown(self):
+        # The engine is the application's; it is not disposed here.
+        with self._lock:
+            self._states.clear()
+
+    # --- cache ---
+
+    def _job(self, state: Dict[str, Any]) -> Job:
+        job = Job.__new__(Job)
+        job.__setstate__(dict(state, kwargs=dict(state['kwargs'])))
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _load_states(self, connection, job_ids: Iterable[str]) -> None:
+        """Loads the states of the given jobs into the cache, dropping rows that cannot be restored."""
+        missing = [job_id for job_id in job_ids if job_id not in self._states]
+        failed = []
+        for i in range(0, len(missing), _CHUNK_SIZE):
+            chunk = missing[i:i + _CHUNK_SIZE]
+            rows = connection.execute(select(self.jobs_t.c.id, self.jobs_t.c.job_state).where(self.jobs_t.c.id.in_(chunk)))
+            for job_id, raw in rows:
+                try:
+                    self._states[job_id] = deserialize_job_state(raw)
+                except Exception:
+                    self._logger.exception(f'Unable to restore job "{job_id}" -- removing it')
+                    failed.append(job_id)
+        if failed:
+            connection.execute(delete(self.jobs_t).where(self.jobs_t.c.id.in_(failed)))
+
+    def _jobs_where(self, *conditions) -> List[Job]:
+        query = select(self.jobs_t.c.id).order_by(self.jobs_t.c.next_run_time)
+        if conditions:
+            query = query.where(*conditions)
+        with self._lock, self.engine.begin() as connection:
+            job_ids = list(connection.execute(query).scalars())
+            self._load_states(connection, job_ids)
+            return [self._job(self._states[job_id]) for job_id in job_ids if job_id in self._states]
+
+    # --- BaseJobStore ---
+
+    def lookup_job(self, job_id):
+        with self._lock:
+            state = self._states.get(job_id)
+            if state is None:
+                with self.engine.begin() as connection:
+                    self._load_states(connection, [job_id])
+                state = self._states.get(job_id)
+            return self._job(state) if state is not None else None
+
+    def get_due_jobs(self, now):
+        return self._jobs_where(self.jobs_t.c.next_run_time <= datetime_to_utc_timestamp(now))
+
+    def get_next_run_time(self):
+        query = (
+            select(self.jobs_t.c.next_run_time).where(self.jobs_t.c.next_run_time != null())
+            .order_by(self.jobs_t.c.next_run_time).limit(1)
+        )
+        with self.engine.begin() as connection:
+            return utc_timestamp_to_datetime(connection.execute(query).scalar())
+
+    def get_all_jobs(self):
+        jobs = self._jobs_where()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        state = job.__getstate__()
+        raw = serialize_job_state(state)
+        with self._lock:
+            try:
+                with self.engine.begin() as connection:
+                    connection.execute(insert(self.jobs_t).values(
+                        id=job.id, next_run_time=datetime_to_utc_timestamp(job.next_run_time), job_state=raw,
+                    ))
+            except IntegrityError:
+                raise ConflictingIdError(job.id)
+            self._states[job.id] = state
+
+    def update_job(self, job):
+        state = job.__getstate__()
+        raw = serialize_job_state(state)
+        with self._lock:
+            with self.engine.begin() as connection:
+                result = connection.execute(
+                    update(self.jobs_t).where(self.jobs_t.c.id == job.id)
+                    .values(next_run_time=datetime_to_utc_timestamp(job.next_run_time), job_state=raw)
+                )
+            if result.rowcount == 0:
+                self._states.pop(job.id, None)
+                raise JobLookupError(job.id)
+            self._states[job.id] = state
+
+    def remove_job(self, job_id):
+        with self._lock:
+            self._states.pop(job_id, None)
+            with self.engine.begin() as connection:
+                result = connection.execute(delete(self.jobs_t).where(self.jobs_t.c.id == job_id))
+            if result.rowcount == 0:
+                raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self._lock:
+            self._states.clear()
+            with self.engine.begin() as connection:
+                connection.execute(delete(self.jobs_t))
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (table={self.jobs_t.name})>"
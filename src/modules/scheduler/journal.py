@@ -0,0 +1,74 @@
+"""
+In-memory journal of scheduled job changes.
+
+Every event that can change a job's place on the timeline (added, modified, paused/resumed,
+removed, or submitted, after which next_run_time has moved on) appends the job ID under an
+increasing sequence number. Timeline delta requests ask which jobs changed since the sequence
+number in their cursor and only look those up. The journal is bounded and lives only as long as
+the process: a cursor from an older process or older than the oldest entry yields None, and
+the client has to reload. Changes the journal does not track, such as runs purged by retention,
+invalidate every cursor the same way.
+"""
+import threading
+import uuid
+from collections import deque
+from typing import Iterable, Optional, Set
+
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED, EVENT_JOB_ADDED, EVENT_JOB_MISSED, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED,
+)
+
+JOURNAL_EVENTS = (
+    EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED | EVENT_JOB_SUBMITTED | EVENT_JOB_MISSED
+    | EVENT_ALL_JOBS_REMOVED
+)
+
+# Journal entry meaning "every job may have changed".
+ALL_JOBS = None
+
+class JobChangeJournal:
+    def __init__(self, max_entries: int = 10000, ignored_jobstores: Iterable[str] = ()):
+        self.ignored_jobstores = set(ignored_jobstores)
+        # Distinguishes this process's sequence numbers from those of a previous run.
+        self.epoch = uuid.uuid4().hex[:12]
+        self._entries: deque = deque(maxlen=max_entries)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    def __call__(self, event) -> None:
+        if event.code == EVENT_ALL_JOBS_REMOVED:
+            if event.alias is not None and event.alias in self.ignored_jobstores:
+                return
+            self.append(ALL_JOBS)
+        elif event.jobstore not in self.ignored_jobstores:
+            self.append(event.job_id)
+
+    def invalidate(self) -> None:
+        """Starts a new epoch, so that every cursor issued so far yields None."""
+        with self._lock:
+            self.epoch = uuid.uuid4().hex[:12]
+            self._entries.clear()
+
+    def append(self, job_id: Optional[str]) -> None:
+        with self._lock:
+            self._seq += 1
+            self._entries.append((self._seq, job_id))
+
+    def changes_since(self, epoch: str, seq: int) -> Optional[Set[Optional[str]]]:
+        """
+        Returns the IDs of jobs changed after seq (ALL_JOBS among them if every job may have
+        changed), or None if the journal no longer covers that position.
+        """
+        with self._lock:
+            if epoch != self.epoch or seq > self._seq:
+                return None
+            if seq == self._seq:
+                return set()
+            if not self._entries or self._entries[0][0] > seq + 1:
+                return None
+            return {job_id for entry_seq, job_id in self._entries if entry_seq > seq}
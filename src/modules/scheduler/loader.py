@@ -1,16 +1,24 @@
+import hashlib
+import json
+import time
 import yaml
+from functools import lru_cache
+from apscheduler.jobstores.base import JobLookupError
 from pydantic import ValidationError
 from watchdog.observers import Observer
 from watchdog.events import PatternMatchingEventHandler
 from importlib import import_module
-from typing import List
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
 
 from core import database
-from modules.scheduler import models, schemas, scheduler_instance
+from modules.scheduler import dispatch, models, schemas, scheduler_instance, service, spreading, timeouts
 from util import logger_util
 
 logger = logger_util.get_logger(__name__)
 
+CHANGE_FEED_GAP_TIMEOUT_SECONDS = 30
+
 def load_and_validate_jobs(config_path: str) -> List[schemas.JobConfig]:
     try:
         with open(config_path, 'r') as f:
@@ -20,35 +28,141 @@ def load_and_validate_jobs(config_path: str) -> List[schemas.JobConfig]:
         logger.error(f"Error loading jobs from {config_path}: {e}")
         return []
 
+@lru_cache(maxsize=None)
 def _resolve_func_path(func_path: str):
     module_path, func_name = func_path.rsplit('.', 1)
     module = import_module(module_path)
     return getattr(module, func_name)
 
-def apply_job_config(scheduler, job_configs):
+# Fingerprint and enabled flag of every job applied to the scheduler, keyed by job ID.
+_applied_jobs: Dict[str, Tuple[str, bool]] = {}
+
+def job_fingerprint(cfg: schemas.JobConfig) -> str:
+    """
+    Returns a stable hash of everything that shapes the scheduled job, except its enabled flag.
+    """
+    payload = {
+        'job_type': cfg.job_type,
+        'func': cfg.func,
+        'command': cfg.command.model_dump() if cfg.command else None,
+        'trigger': cfg.trigger.dict(),
+        'args': cfg.args or [],
+        'kwargs': cfg.kwargs or {},
+        'max_instances': cfg.max_instances,
+        'coalesce': cfg.coalesce,
+        'misfire_grace_time': cfg.misfire_grace_time,
+        'executor': cfg.executor,
+        'retry': cfg.retry.model_dump() if cfg.retry else None,
+        'timeout_seconds': cfg.timeout_seconds,
+        'resources': cfg.resources,
+        'priority': cfg.priority,
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+def reset_applied_state():
+    """Forgets every applied fingerprint so that the next sync re-applies all jobs."""
+    _applied_jobs.clear()
+    _feed.revision = None
+    _feed.clear_gap()
+
+def _add_job(scheduler, cfg: schemas.JobConfig):
+    executor = scheduler_instance.check_job_executor(cfg.executor, cfg.job_type)
+    scheduler_instance.check_job_resources(cfg.resources)
+    # H fields, spread_seconds and jitter become plain APScheduler trigger arguments.
+    trigger_type, trigger_dict = spreading.trigger_arguments(cfg.id, cfg.trigger)
+    if cfg.job_type == 'command':
+        final_kwargs = cfg.command.model_dump(exclude_none=True)
+        if cfg.timeout_seconds is not None:
+            final_kwargs['timeout_seconds'] = cfg.timeout_seconds
+    else:
+        final_kwargs = cfg.kwargs.copy()
+    final_kwargs['job_id'] = cfg.id
+    extra = {} if cfg.is_enabled else {'next_run_time': None}
+    # Set before the job is added, since it may run (and be rendered by the job index) right away.
+    timeouts.set_job_timeout(cfg.id, cfg.timeout_seconds)
+    dispatch.set_job_priority(cfg.id, cfg.priority)
+    scheduler_instance.resource_manager.set_job_resources(cfg.id, cfg.resources)
+    scheduler.add_job(
+        func=_resolve_func_path(cfg.func),
+        trigger=trigger_type,
+        args=cfg.args, kwargs=final_kwargs, id=cfg.id,
+        replace_existing=True, max_instances=cfg.max_instances,
+        coalesce=cfg.coalesce, misfire_grace_time=cfg.misfire_grace_time,
+        executor=executor, **extra, **trigger_dict
+    )
+    scheduler_instance.retry_manager.set_policy(cfg.id, cfg.retry)
+
+def _new_counts() -> Dict[str, int]:
+    return dict.fromkeys(('added', 'replaced', 'paused', 'resumed', 'removed', 'unchanged', 'failed'), 0)
+
+def _remove_job(scheduler, job_id: str, counts: Dict[str, int]):
+    try:
+        scheduler.remove_job(job_id)
+        logger.info(f"Removed job: {job_id}")
+        counts['removed'] += 1
+    except JobLookupError:
+        pass
+    timeouts.set_job_timeout(job_id, None)
+    dispatch.set_job_priority(job_id, None)
+    scheduler_instance.resource_manager.set_job_resources(job_id, None)
+    _applied_jobs.pop(job_id, None)
+
+def _apply_one(scheduler, cfg: schemas.JobConfig, existing_ids, counts: Dict[str, int]):
+    try:
+        fingerprint = job_fingerprint(cfg)
+        applied = _applied_jobs.get(cfg.id)
+        if applied is None or applied[0] != fingerprint:
+            _add_job(scheduler, cfg)
+            counts['replaced' if cfg.id in existing_ids else 'added'] += 1
+        elif applied[1] != cfg.is_enabled:
+            if cfg.is_enabled:
+                scheduler.resume_job(cfg.id)
+                counts['resumed'] += 1
+            else:
+                scheduler.pause_job(cfg.id)
+                counts['paused'] += 1
+        else:
+            counts['unchanged'] += 1
+            return
+        _applied_jobs[cfg.id] = (fingerprint, cfg.is_enabled)
+    except Exception as e:
+        _applied_jobs.pop(cfg.id, None)
+        counts['failed'] += 1
+        logger.error(f"Error applying job {cfg.id}: {e}")
+
+def apply_job_config(scheduler, job_configs) -> Dict[str, int]:
+    """
+    Brings the scheduler in line with job_configs, touching only jobs whose fingerprint
+    or enabled flag changed since the last apply. Returns the number of jobs per action.
+    """
+    counts = _new_counts()
+    if _applied_jobs:
+        existing_ids = set(_applied_jobs)
+    else:
+        # Nothing applied yet in this process: the jobstore may still hold jobs from a previous run.
+        existing_ids = {job.id for job in scheduler.get_jobs(jobstore=scheduler_instance.DEFAULT_JOBSTORE)}
+
     new_ids = {job.id for job in job_configs}
-    for job in scheduler.get_jobs():
-        if job.id not in new_ids:
-            scheduler.remove_job(job.id)
-            logger.info(f"Removed job: {job.id}")
+    for job_id in existing_ids - new_ids:
+        _remove_job(scheduler, job_id, counts)
     for cfg in job_configs:
-        try:
-            trigger_dict = cfg.trigger.dict()
-            trigger_type = trigger_dict.pop('type')
-            final_kwargs = cfg.kwargs.copy()
-            final_kwargs['job_id'] = cfg.id
-            scheduler.add_job(
-                func=_resolve_func_path(cfg.func),
-                trigger=trigger_type,
-                args=cfg.args, kwargs=final_kwargs, id=cfg.id,
-                replace_existing=True, max_instances=cfg.max_instances,
-                coalesce=cfg.coalesce, misfire_grace_time=cfg.misfire_grace_time,
-                **trigger_dict
-            )
-            if not cfg.is_enabled:
-                scheduler.pause_job(cfg.id)
-        except Exception as e:
-            logger.error(f"Error applying job {cfg.id}: {e}")
+        _apply_one(scheduler, cfg, existing_ids, counts)
+
+    logger.info(f"Applied job config: {counts}")
+    return counts
+
+def apply_job_delta(scheduler, job_configs, removed_ids) -> Dict[str, int]:
+    """
+    Applies only the given definitions and removals, leaving every other scheduled job untouched.
+    """
+    counts = _new_counts()
+    for job_id in removed_ids:
+        _remove_job(scheduler, job_id, counts)
+    existing_ids = set(_applied_jobs)
+    for cfg in job_configs:
+        _apply_one(scheduler, cfg, existing_ids, counts)
+    return counts
 
 class ConfigChangeHandler(PatternMatchingEventHandler):
     def __init__(self, scheduler, path):
@@ -66,12 +180,88 @@ def start_config_watcher(scheduler, path):
     observer.start()
     return observer
 
+def _latest_revision(db) -> int:
+    return db.query(func.max(models.JobDefinitionChange.revision)).scalar() or 0
+
+def sync_job_ids_from_db(db, job_ids) -> Dict[str, int]:
+    """
+    Applies the current definitions of the given job IDs only; IDs without a definition are removed.
+    """
+    job_ids = list(job_ids)
+    rows = []
+    for i in range(0, len(job_ids), service.BULK_CHUNK_SIZE):
+        chunk = job_ids[i:i + service.BULK_CHUNK_SIZE]
+        rows.extend(db.query(models.JobDefinition).filter(models.JobDefinition.id.in_(chunk)).all())
+    configs = [schemas.JobConfig.model_validate(j) for j in rows]
+    removed_ids = set(job_ids) - {cfg.id for cfg in configs}
+    return apply_job_delta(scheduler_instance.scheduler, configs, removed_ids)
+
+class ChangeFeedState:
+    """Tracks how far this process has consumed the job definition change feed."""
+    def __init__(self):
+        self.revision: Optional[int] = None
+        # The revision after which the oldest open gap lies, and since when it has been open.
+        self.gap_at: Optional[int] = None
+        self.gap_since: Optional[float] = None
+
+    def clear_gap(self) -> None:
+        self.gap_at = self.gap_since = None
+
+_feed = ChangeFeedState()
+
 def sync_jobs_from_db():
     logger.info("Syncing jobs from database...")
     db = next(database.get_db())
     try:
+        # Read the revision first so that changes committed during the load are consumed again.
+        revision = _latest_revision(db)
         jobs_in_db = db.query(models.JobDefinition).all()
-        apply_job_config(scheduler_instance.scheduler, [schemas.JobConfig.model_validate(j) for j in jobs_in_db])
+        counts = apply_job_config(scheduler_instance.scheduler, [schemas.JobConfig.model_validate(j) for j in jobs_in_db])
+        _feed.revision = max(revision, _feed.revision or 0)
+        _feed.clear_gap()
+        return counts
+    finally:
+        db.close()
+
+def poll_job_changes():
+    """
+    Applies definitions changed since the last consumed revision.
+    The common case of no new changes costs a single primary key lookup.
+    """
+    if _feed.revision is None:
+        return sync_jobs_from_db()
+    db = next(database.get_db())
+    try:
+        latest = _latest_revision(db)
+        if latest <= _feed.revision:
+            return None
+        changes = db.query(models.JobDefinitionChange.revision, models.JobDefinitionChange.job_id).filter(
+            models.JobDefinitionChange.revision > _feed.revision,
+            models.JobDefinitionChange.revision <= latest,
+        ).order_by(models.JobDefinitionChange.revision).all()
+        counts = sync_job_ids_from_db(db, {change.job_id for change in changes})
+
+        # Revisions are allocated before commit, so on databases with concurrent writers a
+        # lower revision can become visible after a higher one. Only advance past a gap once
+        # it has been open long enough to belong to a rolled back transaction; each gap gets
+        # its own timer, started when consumption first stops in front of it.
+        visible = {change.revision for change in changes}
+        contiguous = _feed.revision
+        while contiguous < latest:
+            if contiguous + 1 not in visible:
+                if _feed.gap_at != contiguous or time.monotonic() - _feed.gap_since <= CHANGE_FEED_GAP_TIMEOUT_SECONDS:
+                    break
+                _feed.clear_gap()
+            contiguous += 1
+        _feed.revision = contiguous
+        if contiguous == latest:
+            _feed.clear_gap()
+        elif _feed.gap_at != contiguous:
+            _feed.gap_at, _feed.gap_since = contiguous, time.monotonic()
+        logger.info(f"Applied job definition changes up to revision {_feed.revision}: {counts}")
+        return counts
+    except Exception as e:
+        logger.error(f"Error applying job definition changes: {e}", exc_info=True)
     finally:
         db.close()
 
@@ -81,15 +271,9 @@ def seed_db_from_yaml(yaml_path: str):
     db = next(database.get_db())
     try:
         for cfg in configs:
-            trigger_dict = cfg.trigger.dict()
-            job_def = models.JobDefinition(
-                id=cfg.id, func=cfg.func, description=cfg.description,
-                is_enabled=cfg.is_enabled, trigger_type=trigger_dict.pop('type'),
-                trigger_config=trigger_dict, args=cfg.args, kwargs=cfg.kwargs,
-                max_instances=cfg.max_instances, coalesce=cfg.coalesce,
-                misfire_grace_time=cfg.misfire_grace_time
-            )
+            job_def = models.JobDefinition(**service.job_definition_service.config_to_values(cfg))
             db.merge(job_def)
+        service.record_job_changes(db, [cfg.id for cfg in configs], 'upsert')
         db.commit()
     except Exception as e:
         db.rollback()
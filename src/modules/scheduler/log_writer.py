@@ -0,0 +1,210 @@
+"""
+Write-behind writer for execution log records.
+
+Jobs hand start and finish records to a queue instead of committing on their own session.
+A background thread drains the queue and writes everything it collected within
+``flush_interval`` seconds (or ``batch_size`` records) as one multi-row INSERT plus one
+bulk UPDATE in a single transaction. A start and finish for the same run that land in the
+same batch are coalesced into a single inserted row.
+
+Every written row is stamped with the batch's ``updated_at``, which is taken before the batch
+commits; ``committed_as_of`` tells readers of that column up to when the stamps are final.
+"""
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import insert, update
+
+from core import database
+from modules.scheduler import models, output_store
+from util import logger_util
+from util.config_util import config
+
+logger = logger_util.get_logger(__name__)
+
+_OUTPUT_FIELDS = ('stdout', 'stderr')
+
+class _Flush:
+    """Queue marker that is acknowledged once everything queued before it has been written."""
+    def __init__(self):
+        self.done = threading.Event()
+
+_STOP = object()
+
+class ExecutionLogWriter:
+    def __init__(self, batch_size: int = 500, flush_interval: float = 0.5, max_queue_size: int = 100000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # updated_at stamps of batches being written, until their transaction ends.
+        self._pending_stamps: List[datetime] = []
+
+    def record_start(self, log_id: str, job_id: str, command: str, start_time: Optional[datetime] = None,
+                     status: str = 'RUNNING', **fields: Any) -> None:
+        """Queues the insert of a new execution log row."""
+        values = dict(fields, id=log_id, job_id=job_id, command=command, status=status,
+                      start_time=start_time or datetime.now(timezone.utc))
+        self._put(('start', log_id, values))
+
+    def record_finish(self, log_id: str, status: str, end_time: Optional[datetime] = None, **fields: Any) -> None:
+        """Queues the completion of a run; stdout/stderr are moved to the output store on write."""
+        values = dict(fields, status=status, end_time=end_time or datetime.now(timezone.utc))
+        self._put(('update', log_id, values))
+
+    def record_update(self, log_id: str, **fields: Any) -> None:
+        """Queues an update of arbitrary columns of an execution log row."""
+        self._put(('update', log_id, fields))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every record queued so far has been written. Returns False on timeout."""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def committed_as_of(self) -> datetime:
+        """
+        A time before which every updated_at this writer stamps is committed: rows of batches still
+        being written can carry earlier stamps, so it is the oldest of those, or now.
+        """
+        with self._lock:
+            return min(self._pending_stamps, default=datetime.now(timezone.utc))
+
+    def stop(self, timeout: Optional[float] = 30) -> None:
+        """Writes all queued records and stops the background thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        if thread.is_alive():
+            logger.error("Execution log writer did not stop in time; queued records may be lost.")
+
+    def _put(self, item) -> None:
+        self._ensure_started()
+        # Blocks when the queue is full, slowing producers down instead of dropping records.
+        self._queue.put(item)
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="execution-log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            items = [first]
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            records = []
+            markers = []
+            for item in items:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    records.append(item)
+            try:
+                if records:
+                    self._write(records)
+            except Exception as e:
+                logger.error(f"Dropping {len(records)} execution log records: {e}", exc_info=True)
+            finally:
+                # Released whatever happened to the batch, so flush() never waits on a lost write.
+                for marker in markers:
+                    marker.done.set()
+        # Drain anything queued concurrently with stop().
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, _Flush):
+                item.done.set()
+            elif item is not _STOP:
+                leftover.append(item)
+        if leftover:
+            try:
+                self._write(leftover)
+            except Exception as e:
+                logger.error(f"Dropping {len(leftover)} execution log records: {e}", exc_info=True)
+
+    @staticmethod
+    def _coalesce(records) -> List[Dict[str, Any]]:
+        ops: Dict[str, Dict[str, Any]] = {}
+        for kind, log_id, values in records:
+            op = ops.get(log_id)
+            if op is None:
+                op = ops[log_id] = {'insert': kind == 'start', 'values': {}}
+            elif kind == 'start':
+                op['insert'] = True
+            op['values'].update(values)
+        return [dict(op, id=log_id) for log_id, op in ops.items()]
+
+    def _write(self, records) -> None:
+        ops = self._coalesce(records)
+        if database.SessionLocal is None:
+            database.init_db()
+        with self._lock:
+            updated_at = datetime.now(timezone.utc)
+            self._pending_stamps.append(updated_at)
+        db = database.SessionLocal()
+        try:
+            self._write_ops(db, ops, updated_at)
+            db.commit()
+        except Exception as e:
+            # Database errors and output store I/O errors alike; only the failing rows are dropped.
+            db.rollback()
+            logger.warning(f"Batched write of {len(ops)} execution log records failed ({e}); retrying one by one.")
+            for op in ops:
+                try:
+                    self._write_ops(db, [op], updated_at)
+                    db.commit()
+                except Exception as row_error:
+                    db.rollback()
+                    logger.error(f"Dropping execution log record {op['id']}: {row_error}")
+        finally:
+            db.close()
+            with self._lock:
+                self._pending_stamps.remove(updated_at)
+
+    @staticmethod
+    def _write_ops(db, ops, updated_at: datetime) -> None:
+        inserts, updates = [], []
+        for op in ops:
+            values = dict(op['values'])
+            outputs = {field: values.pop(field) for field in _OUTPUT_FIELDS if field in values}
+            if outputs:
+                values.update(output_store.output_values(db, op['id'], **outputs))
+            values['id'] = op['id']
+            values['updated_at'] = updated_at
+            (inserts if op['insert'] else updates).append(values)
+        if inserts:
+            db.execute(insert(models.ProcessExecutionLog), inserts)
+        if updates:
+            db.execute(update(models.ProcessExecutionLog), updates)
+
+log_writer = ExecutionLogWriter(
+    batch_size=config.log_writer_batch_size,
+    flush_interval=config.log_writer_flush_interval_seconds,
+    max_queue_size=config.log_writer_max_queue_size,
+)
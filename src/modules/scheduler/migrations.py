@@ -0,0 +1,73 @@
+# Schema migrations for the Scheduler module, applied by core.migrations.run_migrations
+from core.migrations import add_column, create_index, register
+from modules.scheduler import models
+
+@register('scheduler_0001', 'Add execution log indexes for history, listing, timeline and status queries')
+def add_execution_log_indexes(conn):
+    names = (
+        'ix_process_execution_logs_job_id_start_time',
+        'ix_process_execution_logs_start_time',
+        'ix_process_execution_logs_status_start_time',
+    )
+    for index in models.ProcessExecutionLog.__table__.indexes:
+        if index.name in names:
+            create_index(conn, index)
+
+@register('scheduler_0002', 'Add output store references and sizes to execution logs')
+def add_execution_log_output_columns(conn):
+    table = models.ProcessExecutionLog.__table__
+    for name in ('stdout_ref', 'stderr_ref', 'stdout_size', 'stderr_size'):
+        add_column(conn, table.name, table.c[name])
+
+@register('scheduler_0003', 'Add scheduled run time to execution logs')
+def add_execution_log_scheduled_time(conn):
+    table = models.ProcessExecutionLog.__table__
+    add_column(conn, table.name, table.c.scheduled_time)
+
+@register('scheduler_0004', 'Add execution log last-modified time for timeline deltas')
+def add_execution_log_updated_at(conn):
+    table = models.ProcessExecutionLog.__table__
+    add_column(conn, table.name, table.c.updated_at)
+    create_index(conn, next(index for index in table.indexes if index.name == 'ix_process_execution_logs_updated_at'))
+
+@register('scheduler_0005', 'Add executor selection to job definitions')
+def add_job_definition_executor(conn):
+    table = models.JobDefinition.__table__
+    add_column(conn, table.name, table.c.executor)
+
+@register('scheduler_0006', 'Add command job type to job definitions')
+def add_job_definition_command(conn):
+    table = models.JobDefinition.__table__
+    for name in ('job_type', 'command'):
+        add_column(conn, table.name, table.c[name])
+
+@register('scheduler_0007', 'Add retry policies to job definitions and attempt links to execution logs')
+def add_retry_columns(conn):
+    add_column(conn, models.JobDefinition.__table__.name, models.JobDefinition.__table__.c.retry_policy)
+    table = models.ProcessExecutionLog.__table__
+    for name in ('attempt', 'retry_of'):
+        add_column(conn, table.name, table.c[name])
+    create_index(conn, next(index for index in table.indexes if index.name == 'ix_process_execution_logs_retry_of'))
+
+@register('scheduler_0008', 'Add execution timeouts to job definitions')
+def add_job_definition_timeout(conn):
+    table = models.JobDefinition.__table__
+    add_column(conn, table.name, table.c.timeout_seconds)
+
+@register('scheduler_0009', 'Add concurrency group claims to job definitions and wait times to execution logs')
+def add_resource_columns(conn):
+    add_column(conn, models.JobDefinition.__table__.name, models.JobDefinition.__table__.c.resources)
+    table = models.ProcessExecutionLog.__table__
+    add_column(conn, table.name, table.c.wait_seconds)
+
+@register('scheduler_0010', 'Add dispatch priorities to job definitions')
+def add_job_definition_priority(conn):
+    table = models.JobDefinition.__table__
+    add_column(conn, table.name, table.c.priority)
+
+@register('scheduler_0011', 'Add execution log output reference indexes')
+def add_execution_log_output_ref_indexes(conn):
+    names = ('ix_process_execution_logs_stdout_ref', 'ix_process_execution_logs_stderr_ref')
+    for index in models.ProcessExecutionLog.__table__.indexes:
+        if index.name in names:
+            create_index(conn, index)
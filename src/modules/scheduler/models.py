@@ -1,5 +1,6 @@
 # SQLAlchemy models for the Scheduler module
-from sqlalchemy import Boolean, Column, Integer, JSON, String, DateTime, Text, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Boolean, Column, Float, Index, Integer, JSON, LargeBinary, String, DateTime, Text, ForeignKey
 from sqlalchemy.sql import func
 
 from core.database import Base
@@ -18,6 +19,14 @@ class JobDefinition(Base):
     max_instances = Column(Integer, default=1, nullable=False)
     coalesce = Column(Boolean, default=False, nullable=False)
     misfire_grace_time = Column(Integer, nullable=True, default=3600)
+    executor = Column(String, nullable=False, default='default', server_default='default')
+    job_type = Column(String, nullable=False, default='python', server_default='python')
+    command = Column(JSON, nullable=True)
+    retry_policy = Column(JSON, nullable=True)
+    timeout_seconds = Column(Float, nullable=True)
+    # Units of named concurrency groups each run holds, e.g. {"warehouse_db": 1}.
+    resources = Column(JSON, nullable=True)
+    priority = Column(Integer, nullable=False, default=0, server_default='0')
 
 class WorkflowDefinition(Base):
     __tablename__ = 'workflow_definitions'
@@ -40,16 +49,90 @@ class WorkflowRun(Base):
     end_time = Column(DateTime(timezone=True), nullable=True)
     last_error = Column(Text, nullable=True)
 
+# Statuses of runs that did not succeed, kept longer by retention and counted as failures.
+FAILURE_STATUSES = ('FAILED', 'TIMEOUT')
+
 class ProcessExecutionLog(Base):
     __tablename__ = 'process_execution_logs'
+    __table_args__ = (
+        Index('ix_process_execution_logs_job_id_start_time', 'job_id', 'start_time'),
+        Index('ix_process_execution_logs_start_time', 'start_time'),
+        Index('ix_process_execution_logs_status_start_time', 'status', 'start_time'),
+        Index('ix_process_execution_logs_updated_at', 'updated_at'),
+        Index('ix_process_execution_logs_retry_of', 'retry_of'),
+        # Lookups of the runs referring to a stored output, made before the output is removed.
+        Index('ix_process_execution_logs_stdout_ref', 'stdout_ref'),
+        Index('ix_process_execution_logs_stderr_ref', 'stderr_ref'),
+    )
 
     id = Column(String, primary_key=True, index=True)
     job_id = Column(String, ForeignKey('job_definitions.id'), nullable=False)
     workflow_run_id = Column(String, ForeignKey('workflow_runs.id'), nullable=True)
     command = Column(String, nullable=False)
     exit_code = Column(Integer, nullable=True)
+    # Short previews; the full output is kept by the output store under *_ref.
     stdout = Column(Text, nullable=True)
     stderr = Column(Text, nullable=True)
+    stdout_ref = Column(String, nullable=True)
+    stderr_ref = Column(String, nullable=True)
+    stdout_size = Column(Integer, nullable=True)
+    stderr_size = Column(Integer, nullable=True)
+    scheduled_time = Column(DateTime(timezone=True), nullable=True)
     start_time = Column(DateTime(timezone=True), server_default=func.now())
     end_time = Column(DateTime(timezone=True), nullable=True)
     status = Column(String, nullable=False)
+    # Last write of the row; timeline deltas select rows changed since a cursor.
+    updated_at = Column(DateTime(timezone=True), nullable=True, default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+    # Attempt number of the run; retries point at the log ID of the run that first failed.
+    attempt = Column(Integer, nullable=False, default=1, server_default='1')
+    retry_of = Column(String, nullable=True)
+    # Seconds between submission and the actual start, spent waiting for concurrency group capacity and a worker.
+    wait_seconds = Column(Float, nullable=True)
+
+class JobDefinitionChange(Base):
+    __tablename__ = 'job_definition_changes'
+    # Revisions must never be reused, even after old entries have been pruned.
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    revision = Column(Integer, primary_key=True, autoincrement=True)
+    job_id = Column(String, nullable=False, index=True)
+    operation = Column(String, nullable=False)
+    changed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class ExecutionOutputChunk(Base):
+    __tablename__ = 'execution_output_chunks'
+
+    ref = Column(String, primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+    data = Column(LargeBinary, nullable=False)
+
+class JobRetry(Base):
+    """A pending retry, persisted so that it survives a restart. Keyed by the chain's first run."""
+    __tablename__ = 'job_retries'
+
+    retry_of = Column(String, primary_key=True)
+    job_id = Column(String, nullable=False, index=True)
+    attempt = Column(Integer, nullable=False)
+    due_time = Column(DateTime(timezone=True), nullable=False)
+
+class ResourceGroup(Base):
+    """A named concurrency group; its row is locked by every grant pass that involves it."""
+    __tablename__ = 'resource_groups'
+
+    name = Column(String, primary_key=True)
+    capacity = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=True)
+
+class ResourceLease(Base):
+    """Units of a concurrency group held by a run, until released or expired."""
+    __tablename__ = 'resource_leases'
+
+    id = Column(String, primary_key=True)
+    resource = Column(String, nullable=False, index=True)
+    units = Column(Integer, nullable=False)
+    # The scheduler process holding the lease, which renews it until the run ends.
+    holder = Column(String, nullable=False, index=True)
+    job_id = Column(String, nullable=False)
+    acquired_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,302 @@
+"""
+Out-of-line storage for job stdout/stderr.
+
+Execution log rows keep only a reference, the output size in bytes and a short preview in
+their ``stdout``/``stderr`` columns; the full output lives in an OutputStore. Output is split
+into fixed-size chunks of uncompressed bytes and every chunk is zlib-compressed on its own,
+so a range read only decompresses the chunks it overlaps.
+
+A reference records the backend and chunk size the output was written with
+(``database+65536://<key>``), so changing either setting leaves stored output readable.
+"""
+import abc
+import hashlib
+import os
+import re
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+
+from modules.scheduler import models
+from util import logger_util
+from util.config_util import config
+
+logger = logger_util.get_logger(__name__)
+
+STREAMS = ('stdout', 'stderr')
+
+_REF_PATTERN = re.compile(r'^(database|filesystem)\+(\d+)://(.+)$')
+
+def _chunks(data: bytes, chunk_size: int) -> List[bytes]:
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)] or [b'']
+
+def _chunk_span(offset: int, length: int, chunk_size: int) -> Tuple[int, int]:
+    return offset // chunk_size, (offset + length - 1) // chunk_size
+
+def format_ref(backend: str, chunk_size: int, key: str) -> str:
+    return f"{backend}+{chunk_size}://{key}"
+
+def parse_ref(ref: str) -> Tuple[str, int, str]:
+    """(backend, chunk size, key) of a reference."""
+    match = _REF_PATTERN.match(ref)
+    if match is None:
+        raise ValueError(f"Invalid output reference: {ref!r}")
+    return match.group(1), int(match.group(2)), match.group(3)
+
+class OutputStore(abc.ABC):
+    """Persists compressed chunks of output under a key; references add the backend and chunk size."""
+    backend: str
+
+    def __init__(self, chunk_size: int = 65536):
+        self.chunk_size = chunk_size
+
+    def write(self, db: Session, log_id: str, stream: str, data: bytes) -> str:
+        """Stores data and returns its reference."""
+        return format_ref(self.backend, self.chunk_size, self._write(db, log_id, stream, data))
+
+    @abc.abstractmethod
+    def _write(self, db: Session, log_id: str, stream: str, data: bytes) -> str:
+        """Stores data in chunks of self.chunk_size and returns its key."""
+
+    @abc.abstractmethod
+    def _read_chunks(self, db: Session, key: str, first: int, last: int) -> List[bytes]:
+        """Compressed chunks first to last (inclusive) of the output stored under key."""
+
+    @abc.abstractmethod
+    def delete(self, db: Session, refs: Dict[str, str]) -> None:
+        """Deletes the output of purged execution logs, given as {reference: key}."""
+
+    def sweep(self, db: Session) -> int:
+        """Removes stored output no execution log refers to. Returns how many outputs were removed."""
+        return 0
+
+    def read(self, db: Session, key: str, offset: int, length: int, chunk_size: Optional[int] = None) -> bytes:
+        """
+        Returns ``length`` bytes starting at ``offset``, decompressing only the chunks involved.
+        chunk_size is the one the output was written with.
+        """
+        if length <= 0:
+            return b''
+        chunk_size = chunk_size or self.chunk_size
+        first, last = _chunk_span(offset, length, chunk_size)
+        data = b''.join(zlib.decompress(chunk) for chunk in self._read_chunks(db, key, first, last))
+        start = offset - first * chunk_size
+        return data[start:start + length]
+
+class DatabaseOutputStore(OutputStore):
+    """Keeps compressed chunks in the execution_output_chunks table, keyed by log ID and stream."""
+    backend = 'database'
+
+    def _write(self, db: Session, log_id: str, stream: str, data: bytes) -> str:
+        key = f"{log_id}:{stream}"
+        db.query(models.ExecutionOutputChunk).filter(models.ExecutionOutputChunk.ref == key).delete(synchronize_session=False)
+        db.add_all([
+            models.ExecutionOutputChunk(ref=key, chunk_index=index, data=zlib.compress(chunk))
+            for index, chunk in enumerate(_chunks(data, self.chunk_size))
+        ])
+        return key
+
+    def _read_chunks(self, db: Session, key: str, first: int, last: int) -> List[bytes]:
+        chunk = models.ExecutionOutputChunk
+        rows = db.query(chunk.data).filter(
+            chunk.ref == key, chunk.chunk_index >= first, chunk.chunk_index <= last
+        ).order_by(chunk.chunk_index).all()
+        return [row.data for row in rows]
+
+    def delete(self, db: Session, refs: Dict[str, str]) -> None:
+        # Chunks are written in the transaction of their row, so they are never shared or orphaned.
+        keys = list(refs.values())
+        if keys:
+            db.query(models.ExecutionOutputChunk).filter(models.ExecutionOutputChunk.ref.in_(keys)).delete(synchronize_session=False)
+
+class FileOutputStore(OutputStore):
+    """
+    Keeps compressed chunks in a content-addressed directory tree, so identical outputs are
+    stored once. The key is the SHA-256 of the uncompressed output and the chunk size.
+
+    Content is written before the row referring to it is committed, possibly by another
+    process, so it cannot be told apart from content whose row was purged or never committed
+    until some time has passed. Content is therefore only removed once it has gone unused for
+    ``grace_seconds``: every write touches the directory it stores into, and removal moves the
+    directory aside first and puts it back if a write touched it in the meantime.
+    """
+    backend = 'filesystem'
+
+    def __init__(self, root: str, chunk_size: int = 65536, grace_seconds: float = 3600):
+        super().__init__(chunk_size)
+        self.root = Path(root)
+        self.grace_seconds = grace_seconds
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _write(self, db: Session, log_id: str, stream: str, data: bytes) -> str:
+        key = f"{hashlib.sha256(data).hexdigest()}-{self.chunk_size}"
+        target = self._dir(key)
+        try:
+            os.utime(target)
+            return key
+        except FileNotFoundError:
+            pass
+        tmp = target.with_name(f"{key}.tmp-{os.getpid()}")
+        tmp.mkdir(parents=True, exist_ok=True)
+        for index, chunk in enumerate(_chunks(data, self.chunk_size)):
+            (tmp / f"{index:08d}.z").write_bytes(zlib.compress(chunk))
+        try:
+            tmp.rename(target)
+        except OSError:
+            # Another writer stored the same content first.
+            _remove_dir(tmp)
+            os.utime(target)
+        return key
+
+    def _read_chunks(self, db: Session, key: str, first: int, last: int) -> List[bytes]:
+        directory = self._dir(key)
+        chunks = []
+        for index in range(first, last + 1):
+            path = directory / f"{index:08d}.z"
+            if not path.exists():
+                break
+            chunks.append(path.read_bytes())
+        return chunks
+
+    def _referenced(self, db: Session, ref: str) -> bool:
+        log = models.ProcessExecutionLog
+        return db.query(log.id).filter(or_(log.stdout_ref == ref, log.stderr_ref == ref)).first() is not None
+
+    def _remove_if_unused(self, db: Session, directory: Path, ref: str) -> bool:
+        try:
+            if time.time() - directory.stat().st_mtime < self.grace_seconds:
+                return False
+        except FileNotFoundError:
+            return False
+        # Content is shared between runs with identical output; keep it while still referenced.
+        if self._referenced(db, ref):
+            return False
+        trash = directory.with_name(f"{directory.name}.trash-{os.getpid()}")
+        try:
+            directory.rename(trash)
+        except OSError:
+            return False
+        if time.time() - trash.stat().st_mtime < self.grace_seconds:
+            # A write reused the content after the check above; its row will refer to it.
+            try:
+                trash.rename(directory)
+                return False
+            except OSError:
+                # The writer has stored the content anew in the meantime.
+                pass
+        _remove_dir(trash)
+        return True
+
+    def delete(self, db: Session, refs: Dict[str, str]) -> None:
+        for ref, key in refs.items():
+            self._remove_if_unused(db, self._dir(key), ref)
+
+    def sweep(self, db: Session) -> int:
+        removed = 0
+        if not self.root.exists():
+            return removed
+        for directory in self.root.glob('*/*'):
+            name = directory.name
+            if '.tmp-' in name or '.trash-' in name:
+                # Left behind by a writer or a removal that crashed.
+                if time.time() - directory.stat().st_mtime >= self.grace_seconds:
+                    _remove_dir(directory)
+                continue
+            # Keys end in the chunk size their content was written with.
+            ref = format_ref(self.backend, int(name.rsplit('-', 1)[1]), name)
+            if self._remove_if_unused(db, directory, ref):
+                removed += 1
+        return removed
+
+def _remove_dir(directory: Path) -> None:
+    for path in directory.iterdir():
+        path.unlink()
+    directory.rmdir()
+
+# The store new output is written to; output of other backends is read through store_for().
+_store: Optional[OutputStore] = None
+_other_stores: Dict[str, OutputStore] = {}
+
+def _create_store(backend: str) -> OutputStore:
+    if backend == 'filesystem':
+        return FileOutputStore(
+            config.output_store_path, chunk_size=config.output_store_chunk_size,
+            grace_seconds=config.output_store_orphan_grace_seconds,
+        )
+    return DatabaseOutputStore(chunk_size=config.output_store_chunk_size)
+
+def get_output_store() -> OutputStore:
+    """Returns the output store configured under execution_logs.output_store in config.yaml."""
+    global _store
+    if _store is None:
+        _store = _create_store(config.output_store_backend)
+    return _store
+
+def store_for(backend: str) -> OutputStore:
+    """Returns the store of a backend, which need not be the configured one."""
+    store = get_output_store()
+    if store.backend == backend:
+        return store
+    if backend not in _other_stores:
+        _other_stores[backend] = _create_store(backend)
+    return _other_stores[backend]
+
+def output_values(db: Session, log_id: str, stdout: Optional[str] = None, stderr: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Stores stdout/stderr out of line and returns the reference, byte size and preview column
+    values for the execution log row. With the database backend the chunks are written in db's
+    transaction, so the caller commits them together with the row.
+    """
+    store = get_output_store()
+    values: Dict[str, Any] = {}
+    for stream, text in (('stdout', stdout), ('stderr', stderr)):
+        if text is None:
+            continue
+        data = text.encode('utf-8')
+        values[f'{stream}_ref'] = store.write(db, log_id, stream, data)
+        values[f'{stream}_size'] = len(data)
+        values[stream] = text[:config.output_preview_chars]
+    return values
+
+def attach_output(db: Session, log_entry: models.ProcessExecutionLog, stdout: Optional[str] = None, stderr: Optional[str] = None) -> None:
+    """
+    Stores stdout/stderr out of line and sets the reference, byte size and preview on log_entry.
+    """
+    for field, value in output_values(db, log_entry.id, stdout=stdout, stderr=stderr).items():
+        setattr(log_entry, field, value)
+
+def read_output(db: Session, log_entry: models.ProcessExecutionLog, stream: str, offset: int = 0, length: Optional[int] = None) -> Tuple[bytes, int]:
+    """
+    Returns a byte range of one output stream and the stream's total size in bytes.
+    Rows written before out-of-line storage fall back to their inline column.
+    """
+    ref = getattr(log_entry, f'{stream}_ref')
+    if ref is None:
+        data = (getattr(log_entry, stream) or '').encode('utf-8')
+        end = len(data) if length is None else offset + length
+        return data[offset:end], len(data)
+    total = getattr(log_entry, f'{stream}_size') or 0
+    if length is None or offset + length > total:
+        length = max(total - offset, 0)
+    backend, chunk_size, key = parse_ref(ref)
+    return store_for(backend).read(db, key, offset, length, chunk_size), total
+
+def delete_outputs(db: Session, refs: Iterable[str]) -> None:
+    """Deletes stored output for refs that belonged to purged execution logs."""
+    by_backend: Dict[str, Dict[str, str]] = {}
+    for ref in refs:
+        if ref:
+            backend, _, key = parse_ref(ref)
+            by_backend.setdefault(backend, {})[ref] = key
+    for backend, backend_refs in by_backend.items():
+        store_for(backend).delete(db, backend_refs)
+
+def sweep_outputs(db: Session) -> int:
+    """Removes stored output of the configured backend that no execution log refers to."""
+    return get_output_store().sweep(db)
@@ -0,0 +1,166 @@
+"""
+Central execution recording driven by APScheduler job events.
+
+Every run of a persisted job gets a ProcessExecutionLog row without the job function having
+to open a session: SUBMITTED inserts a RUNNING row, EXECUTED/ERROR/MISSED complete it. Rows
+go through the batched log_writer, so recording adds only a queue put per event.
+
+APScheduler dispatches SUBMITTED after handing the job to the executor, so a fast job can
+report EXECUTED before its SUBMITTED event arrives; such early outcomes are held until the
+start is seen and then written as one completed row. Runs stopped for exceeding their
+timeout_seconds are recorded as TIMEOUT.
+
+STARTED (see events) gives the time a run waited between submission and getting to run, for
+concurrency groups or a free worker; it usually arrives before SUBMITTED and is then written
+with the start.
+"""
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED,
+    EVENT_JOB_SUBMITTED, EVENT_ALL_JOBS_REMOVED,
+)
+
+from modules.scheduler.command_runner import (
+    COMMAND_FUNC_REF, CommandFailedError, CommandResult, CommandTimeoutError, describe_command,
+)
+from modules.scheduler.events import EVENT_JOB_STARTED
+from modules.scheduler.log_writer import log_writer
+from modules.scheduler.timeouts import JobTimeoutError
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+RECORDED_EVENTS = (
+    EVENT_JOB_SUBMITTED | EVENT_JOB_STARTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
+    | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED | EVENT_ALL_JOBS_REMOVED
+)
+
+def execution_log_id(job_id: str, scheduled_run_time: datetime) -> str:
+    """Deterministic log ID of one scheduled run of a job."""
+    return f"{job_id}-{scheduled_run_time.isoformat()}"
+
+def _output_text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return value if isinstance(value, str) else str(value)
+
+def _command_output(result: CommandResult) -> Dict[str, Any]:
+    return dict(exit_code=result.exit_code, stdout=result.stdout, stderr=result.stderr)
+
+class ExecutionRecorder:
+    def __init__(self, scheduler, writer=log_writer, stats=None, ignored_jobstores: Set[str] = frozenset()):
+        self.scheduler = scheduler
+        self.writer = writer
+        self.stats = stats
+        self.ignored_jobstores = set(ignored_jobstores)
+        self._lock = threading.Lock()
+        self._started: Dict[str, datetime] = {}
+        self._early: Dict[str, Dict[str, Any]] = {}
+        # wait_seconds of runs that started before their submission was recorded.
+        self._waits: Dict[str, float] = {}
+        self._commands: Dict[str, str] = {}
+
+    def __call__(self, event) -> None:
+        try:
+            if event.code in (EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED):
+                self._commands.pop(event.job_id, None)
+            elif event.code == EVENT_ALL_JOBS_REMOVED:
+                self._commands.clear()
+            elif event.jobstore in self.ignored_jobstores:
+                return
+            elif event.code == EVENT_JOB_SUBMITTED:
+                self._on_submitted(event)
+            elif event.code == EVENT_JOB_STARTED:
+                self._on_started(event)
+            else:
+                self._on_finished(event)
+        except Exception as e:
+            logger.error(f"Failed to record event {event.code} for job {getattr(event, 'job_id', None)}: {e}", exc_info=True)
+
+    def _command(self, job_id: str, jobstore: str) -> str:
+        command = self._commands.get(job_id)
+        if command is None:
+            job = self.scheduler.get_job(job_id, jobstore)
+            if job is None:
+                command = job_id
+            elif job.func_ref == COMMAND_FUNC_REF:
+                command = describe_command(job.kwargs.get('argv'), job.kwargs.get('shell'))
+            else:
+                command = job.func_ref
+            self._commands[job_id] = command
+        return command
+
+    def _on_submitted(self, event) -> None:
+        for run_time in event.scheduled_run_times:
+            self.record_submission(event.job_id, event.jobstore, run_time)
+
+    def record_submission(self, job_id: str, jobstore: str, run_time: datetime, **fields: Any) -> None:
+        """
+        Records the start of one run handed to an executor. Called for scheduler submissions and
+        by subsystems that submit runs themselves (retries), with extra log columns in fields.
+        """
+        now = datetime.now(timezone.utc)
+        log_id = execution_log_id(job_id, run_time)
+        values = dict(fields, job_id=job_id, command=self._command(job_id, jobstore), start_time=now, scheduled_time=run_time)
+        # Records are queued under the lock, so a run's finish can never be queued ahead of its start.
+        with self._lock:
+            wait_seconds = self._waits.pop(log_id, None)
+            if wait_seconds is not None:
+                values['wait_seconds'] = wait_seconds
+            outcome = self._early.pop(log_id, None)
+            if outcome is None:
+                self._started[log_id] = now
+                self.writer.record_start(log_id, **values)
+            else:
+                self.writer.record_start(log_id, **values, **outcome)
+        if self.stats is None:
+            return
+        if outcome is None:
+            self.stats.run_started(job_id)
+        else:
+            self.stats.run_finished(job_id, outcome['status'], now, was_running=False)
+
+    def _on_started(self, event) -> None:
+        with self._lock:
+            for run_time in event.scheduled_run_times:
+                log_id = execution_log_id(event.job_id, run_time)
+                if log_id in self._started:
+                    self.writer.record_update(log_id, wait_seconds=event.wait_seconds)
+                else:
+                    self._waits[log_id] = event.wait_seconds
+
+    def _on_finished(self, event) -> None:
+        now = datetime.now(timezone.utc)
+        log_id = execution_log_id(event.job_id, event.scheduled_run_time)
+        if event.code == EVENT_JOB_MISSED:
+            outcome = dict(status='MISSED', end_time=now)
+        elif event.code == EVENT_JOB_ERROR:
+            if isinstance(event.exception, CommandTimeoutError):
+                outcome = dict(status='TIMEOUT', end_time=now, **_command_output(event.exception.result))
+            elif isinstance(event.exception, JobTimeoutError):
+                outcome = dict(status='TIMEOUT', end_time=now, stderr=str(event.exception))
+            elif isinstance(event.exception, CommandFailedError):
+                outcome = dict(status='FAILED', end_time=now, **_command_output(event.exception.result))
+            else:
+                outcome = dict(status='FAILED', end_time=now, stderr=event.traceback or repr(event.exception))
+        elif isinstance(event.retval, CommandResult):
+            outcome = dict(status='COMPLETED', end_time=now, **_command_output(event.retval))
+        else:
+            outcome = dict(status='COMPLETED', end_time=now)
+            stdout = _output_text(event.retval)
+            if stdout is not None:
+                outcome['stdout'] = stdout
+
+        with self._lock:
+            start_time = self._started.pop(log_id, None)
+            if start_time is None:
+                self._early[log_id] = outcome
+                return
+            self.writer.record_finish(log_id, **outcome)
+        if self.stats is not None:
+            self.stats.run_finished(event.job_id, outcome['status'], start_time)
@@ -0,0 +1,288 @@
+"""
+Named concurrency groups ("resources") shared by jobs.
+
+``scheduler.resources`` in config.yaml declares groups and their capacity, e.g.
+``warehouse_db: 4``, and a job claims units of them with ``resources: {warehouse_db: 1}``.
+A run of such a job waits, without holding a worker, until every group it names has room,
+and holds its units until it finishes (or times out).
+
+Capacity is accounted in the database, so every scheduler process using it shares the same
+limits: each granted claim is a row in resource_leases, owned by the process that holds it.
+Grants are made by one thread per process in a single transaction per pass, which first
+updates the resource_groups rows involved; that write serializes grant passes across
+processes. Waiting runs are served first come, first served per group. Holders renew their
+leases every third of ``resource_leases.ttl_seconds``; leases of a process that stopped
+renewing them (because it crashed) expire after the TTL and their units return to the pool.
+Capacity freed by another process is noticed within ``resource_leases.poll_interval_seconds``.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from core import database
+from modules.scheduler import models
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+class Lease:
+    """Units of concurrency groups held by one run."""
+    __slots__ = ('job_id', 'resources', 'lease_ids')
+
+    def __init__(self, job_id: str, resources: Dict[str, int], lease_ids: List[str]):
+        self.job_id = job_id
+        self.resources = resources
+        self.lease_ids = lease_ids
+
+class _Request:
+    __slots__ = ('job_id', 'resources', 'callback', 'cancel_callback')
+
+    def __init__(self, job_id: str, resources: Dict[str, int], callback: Callable[[Lease], None],
+                 cancel_callback: Optional[Callable[[], None]]):
+        self.job_id = job_id
+        self.resources = resources
+        self.callback = callback
+        self.cancel_callback = cancel_callback
+
+class ResourceManager:
+    def __init__(self, capacities: Mapping[str, int], lease_ttl_seconds: float = 60, poll_interval_seconds: float = 1,
+                 holder: Optional[str] = None):
+        for name, capacity in capacities.items():
+            if int(capacity) < 1:
+                raise ValueError(f"Resource '{name}' needs a capacity of at least 1")
+        self.capacities = {name: int(capacity) for name, capacity in capacities.items()}
+        self.lease_ttl_seconds = lease_ttl_seconds
+        self.poll_interval_seconds = poll_interval_seconds
+        # Identifies this process's leases; unique per manager, even across restarts.
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._job_resources: Dict[str, Dict[str, int]] = {}
+        # Waiting runs in arrival order.
+        self._waiting: List[_Request] = []
+        self._held: Set[str] = set()
+        # IDs of released leases, deleted by the next grant pass.
+        self._released: List[str] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._changed = False
+
+    # --- job claims ---
+
+    def check(self, resources: Optional[Mapping[str, int]]) -> None:
+        """Raises ValueError unless every claimed group is configured and can ever grant the claim."""
+        for name, units in (resources or {}).items():
+            if name not in self.capacities:
+                configured = ', '.join(sorted(self.capacities)) or 'none'
+                raise ValueError(f"Unknown resource '{name}'; configured resources: {configured}")
+            if units > self.capacities[name]:
+                raise ValueError(f"Resource '{name}' has a capacity of {self.capacities[name]}, less than the {units} claimed")
+
+    def set_job_resources(self, job_id: str, resources: Optional[Mapping[str, int]]) -> None:
+        with self._condition:
+            if resources:
+                self._job_resources[job_id] = dict(resources)
+            else:
+                self._job_resources.pop(job_id, None)
+
+    def resources_for(self, job_id: str) -> Optional[Dict[str, int]]:
+        return self._job_resources.get(job_id)
+
+    # --- requests ---
+
+    def request(self, job_id: str, resources: Dict[str, int], callback: Callable[[Lease], None],
+                cancel_callback: Optional[Callable[[], None]] = None) -> None:
+        """
+        Queues a claim; callback gets the Lease, from the manager's thread, once it is granted.
+        If the manager stops first, cancel_callback is called instead, from the stopping thread.
+        """
+        with self._condition:
+            self._waiting.append(_Request(job_id, resources, callback, cancel_callback))
+            self._changed = True
+            self._ensure_started()
+            self._condition.notify()
+
+    def release(self, lease: Lease) -> None:
+        """Gives the units back. Returns at once; the leases are deleted by the next grant pass."""
+        with self._condition:
+            self._held.difference_update(lease.lease_ids)
+            self._released.extend(lease.lease_ids)
+            self._changed = True
+            self._ensure_started()
+            self._condition.notify()
+
+    def usage(self) -> List[Dict[str, object]]:
+        """Capacity, units held by all processes and runs waiting in this process, per group."""
+        now = datetime.now(timezone.utc)
+        lease = models.ResourceLease
+        db = next(database.get_db())
+        try:
+            in_use = dict(
+                db.query(lease.resource, func.sum(lease.units))
+                .filter(lease.expires_at > now).group_by(lease.resource).all()
+            )
+        finally:
+            db.close()
+        with self._condition:
+            waiting = [request.resources for request in self._waiting]
+        return [
+            dict(
+                name=name, capacity=capacity, in_use=int(in_use.get(name) or 0),
+                waiting=sum(1 for resources in waiting if name in resources),
+            )
+            for name, capacity in sorted(self.capacities.items())
+        ]
+
+    # --- thread ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="job-resources", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops granting, cancels the waiting claims and gives back every lease this process still holds."""
+        with self._condition:
+            thread = self._thread
+            self._thread = None
+            self._stopping = True
+            self._condition.notify()
+        # Joined first, so that a grant pass in progress cannot hand out a claim cancelled here.
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            waiting, self._waiting = self._waiting, []
+        if waiting:
+            logger.warning(f"Cancelling {len(waiting)} runs still waiting for concurrency groups")
+        for request in waiting:
+            if request.cancel_callback is None:
+                continue
+            try:
+                request.cancel_callback()
+            except Exception as e:
+                logger.error(f"Failed to cancel a run of job {request.job_id} waiting for {request.resources}: {e}", exc_info=True)
+        with self._condition:
+            if not self._held and not self._released:
+                return
+        db = next(database.get_db())
+        try:
+            db.query(models.ResourceLease).filter_by(holder=self.holder).delete(synchronize_session=False)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Failed to release the leases of {self.holder}; they expire with their TTL: {e}")
+        finally:
+            db.close()
+        with self._condition:
+            self._held.clear()
+            self._released.clear()
+
+    def _run(self) -> None:
+        renew_interval = self.lease_ttl_seconds / 3
+        next_renewal = time.monotonic() + renew_interval
+        while True:
+            with self._condition:
+                if self._stopping:
+                    return
+                renew = bool(self._held) and time.monotonic() >= next_renewal
+                if not renew and not (self._changed and (self._waiting or self._released)):
+                    if self._waiting or self._released:
+                        # Other processes may free capacity at any time.
+                        timeout = self.poll_interval_seconds
+                    elif self._held:
+                        timeout = next_renewal - time.monotonic()
+                    else:
+                        timeout = None
+                    if not self._condition.wait(timeout) and (self._waiting or self._released):
+                        self._changed = True
+                    continue
+                grant = self._changed and bool(self._waiting or self._released)
+                self._changed = False
+            if renew:
+                self._renew()
+                next_renewal = time.monotonic() + renew_interval
+            if not grant:
+                continue
+            for request, lease in self._grant():
+                try:
+                    request.callback(lease)
+                except Exception as e:
+                    logger.error(f"Failed to start a run of job {request.job_id} after granting {request.resources}: {e}", exc_info=True)
+                    self.release(lease)
+
+    def _grant(self) -> List[Tuple[_Request, Lease]]:
+        """Deletes released leases and makes one grant pass over the waiting runs, in a single transaction."""
+        with self._condition:
+            waiting = list(self._waiting)
+            released, self._released = self._released, []
+        names = sorted({name for request in waiting for name in request.resources})
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(seconds=self.lease_ttl_seconds)
+        group, lease = models.ResourceGroup, models.ResourceLease
+        granted: List[Tuple[_Request, Lease]] = []
+        db = next(database.get_db())
+        try:
+            if released:
+                db.query(lease).filter(lease.id.in_(released)).delete(synchronize_session=False)
+            # Writing the group rows first takes the locks that serialize grant passes of all processes.
+            for name in names:
+                values = {'capacity': self.capacities[name], 'updated_at': now}
+                if not db.query(group).filter_by(name=name).update(values, synchronize_session=False):
+                    db.add(group(name=name, **values))
+            db.flush()
+            db.query(lease).filter(lease.resource.in_(names), lease.expires_at <= now).delete(synchronize_session=False)
+            used = dict(
+                db.query(lease.resource, func.sum(lease.units)).filter(lease.resource.in_(names)).group_by(lease.resource).all()
+            )
+            # A run that does not fit blocks its groups for everyone behind it, so large claims are not starved.
+            blocked: Set[str] = set()
+            for request in waiting:
+                if blocked.intersection(request.resources):
+                    continue
+                if any((used.get(name) or 0) + units > self.capacities[name] for name, units in request.resources.items()):
+                    blocked.update(request.resources)
+                    continue
+                lease_ids = []
+                for name, units in request.resources.items():
+                    used[name] = (used.get(name) or 0) + units
+                    lease_ids.append(uuid.uuid4().hex)
+                    db.add(lease(
+                        id=lease_ids[-1], resource=name, units=units, holder=self.holder, job_id=request.job_id,
+                        acquired_at=now, expires_at=expires_at,
+                    ))
+                granted.append((request, Lease(request.job_id, dict(request.resources), lease_ids)))
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            # Typically a concurrent grant pass of another process; the runs keep waiting for the next poll.
+            logger.warning(f"Resource grant pass failed: {e}")
+            with self._condition:
+                self._released.extend(released)
+            return []
+        finally:
+            db.close()
+        with self._condition:
+            taken = {id(request) for request, _ in granted}
+            self._waiting = [request for request in self._waiting if id(request) not in taken]
+            for _, granted_lease in granted:
+                self._held.update(granted_lease.lease_ids)
+        return granted
+
+    def _renew(self) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.lease_ttl_seconds)
+        db = next(database.get_db())
+        try:
+            db.query(models.ResourceLease).filter_by(holder=self.holder).update({'expires_at': expires_at}, synchronize_session=False)
+            db.commit()
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Failed to renew the resource leases of {self.holder}: {e}")
+        finally:
+            db.close()
@@ -0,0 +1,210 @@
+"""
+Retention for execution logs.
+
+Expired rows are purged in bounded batches, each in its own short transaction, so the purge
+never holds a long write lock. Rows can optionally be archived to gzip-compressed JSONL
+(including their full output) before they are deleted. Runs as an internal scheduler job.
+A run that purges rows invalidates the timeline cursors handed out so far, so that clients
+reload instead of keeping purged runs on their timelines.
+"""
+import gzip
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import List, Optional
+
+from sqlalchemy import and_, func, or_
+
+from core import database
+from modules.scheduler import models, output_store, scheduler_instance, schemas
+from util import logger_util
+from util.config_util import PROJECT_ROOT, config
+
+logger = logger_util.get_logger(__name__)
+
+class RetentionPolicy:
+    """Retention settings, read from execution_logs.retention in config.yaml."""
+    def __init__(self, max_age_days: Optional[int] = 30, failed_max_age_days: Optional[int] = 90,
+                 max_rows_per_job: Optional[int] = None, batch_size: int = 1000,
+                 batch_pause_seconds: float = 0.05, archive_dir: Optional[str] = None,
+                 change_feed_max_age_days: Optional[int] = 7, vacuum_pages: int = 1000):
+        self.max_age_days = max_age_days
+        self.failed_max_age_days = failed_max_age_days
+        self.max_rows_per_job = max_rows_per_job
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.archive_dir = archive_dir
+        self.change_feed_max_age_days = change_feed_max_age_days
+        self.vacuum_pages = vacuum_pages
+
+    @classmethod
+    def from_config(cls) -> "RetentionPolicy":
+        settings = config.get('execution_logs.retention', {}) or {}
+        archive_dir = settings.get('archive_dir')
+        return cls(
+            max_age_days=settings.get('max_age_days', 30),
+            failed_max_age_days=settings.get('failed_max_age_days', 90),
+            max_rows_per_job=settings.get('max_rows_per_job'),
+            batch_size=int(settings.get('batch_size', 1000)),
+            batch_pause_seconds=float(settings.get('batch_pause_seconds', 0.05)),
+            archive_dir=str(PROJECT_ROOT / archive_dir) if archive_dir else None,
+            change_feed_max_age_days=settings.get('change_feed_max_age_days', 7),
+            vacuum_pages=int(settings.get('vacuum_pages', 1000)),
+        )
+
+_last_report: Optional[schemas.RetentionReport] = None
+
+def get_last_report() -> Optional[schemas.RetentionReport]:
+    return _last_report
+
+def _archive(rows: List[models.ProcessExecutionLog], db, archive_path: Path) -> None:
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(archive_path, 'at', encoding='utf-8') as f:
+        for row in rows:
+            record = {c.name: getattr(row, c.name) for c in row.__table__.columns}
+            for stream in output_store.STREAMS:
+                data, _ = output_store.read_output(db, row, stream)
+                record[stream] = data.decode('utf-8', errors='replace')
+            f.write(json.dumps(record, default=str) + '\n')
+
+def _purge_batches(build_query, policy: RetentionPolicy, archive_path: Optional[Path]) -> int:
+    """
+    Repeatedly deletes up to batch_size rows matched by build_query(db), one transaction per batch.
+    """
+    log = models.ProcessExecutionLog
+    purged = 0
+    while True:
+        db = database.SessionLocal()
+        try:
+            rows = build_query(db).order_by(log.start_time, log.id).limit(policy.batch_size).all()
+            if not rows:
+                return purged
+            if archive_path is not None:
+                _archive(rows, db, archive_path)
+            ids = [row.id for row in rows]
+            refs = [ref for row in rows for ref in (row.stdout_ref, row.stderr_ref)]
+            db.query(log).filter(log.id.in_(ids)).delete(synchronize_session=False)
+            output_store.delete_outputs(db, refs)
+            db.commit()
+            purged += len(ids)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if len(rows) < policy.batch_size:
+            return purged
+        time.sleep(policy.batch_pause_seconds)
+
+def _purge_by_age(policy: RetentionPolicy, now: datetime, archive_path: Optional[Path]) -> int:
+    log = models.ProcessExecutionLog
+    purged = 0
+    if policy.max_age_days is not None:
+        cutoff = now - timedelta(days=policy.max_age_days)
+        purged += _purge_batches(lambda db: db.query(log).filter(log.start_time < cutoff, log.status.notin_(models.FAILURE_STATUSES)), policy, archive_path)
+    failed_days = policy.failed_max_age_days if policy.failed_max_age_days is not None else policy.max_age_days
+    if failed_days is not None:
+        cutoff = now - timedelta(days=failed_days)
+        purged += _purge_batches(lambda db: db.query(log).filter(log.start_time < cutoff, log.status.in_(models.FAILURE_STATUSES)), policy, archive_path)
+    return purged
+
+def _purge_by_count(policy: RetentionPolicy, archive_path: Optional[Path]) -> int:
+    if not policy.max_rows_per_job:
+        return 0
+    log = models.ProcessExecutionLog
+    db = database.SessionLocal()
+    try:
+        over_limit = [row.job_id for row in db.query(log.job_id).group_by(log.job_id).having(func.count(log.id) > policy.max_rows_per_job)]
+        cutoffs = {}
+        for job_id in over_limit:
+            # (start_time, id) of the newest row beyond the limit, found via the (job_id, start_time) index.
+            # The ID breaks ties, so rows sharing the cutoff's start time that are within the limit stay.
+            cutoffs[job_id] = db.query(log.start_time, log.id).filter(log.job_id == job_id).order_by(
+                log.start_time.desc(), log.id.desc()).offset(policy.max_rows_per_job).limit(1).one()
+    finally:
+        db.close()
+    purged = 0
+    for job_id, (start_time, log_id) in cutoffs.items():
+        purged += _purge_batches(lambda db: db.query(log).filter(
+            log.job_id == job_id,
+            or_(log.start_time < start_time, and_(log.start_time == start_time, log.id <= log_id)),
+        ), policy, archive_path)
+    return purged
+
+def _prune_change_feed(policy: RetentionPolicy, now: datetime) -> int:
+    if policy.change_feed_max_age_days is None:
+        return 0
+    change = models.JobDefinitionChange
+    db = database.SessionLocal()
+    try:
+        latest = db.query(func.max(change.revision)).scalar()
+        if latest is None:
+            return 0
+        # The newest entry is always kept so that consumers can still read the current revision.
+        pruned = db.query(change).filter(
+            change.changed_at < now - timedelta(days=policy.change_feed_max_age_days), change.revision < latest
+        ).delete(synchronize_session=False)
+        db.commit()
+        return pruned
+    finally:
+        db.close()
+
+def _sweep_outputs() -> int:
+    db = database.SessionLocal()
+    try:
+        return output_store.sweep_outputs(db)
+    except OSError as e:
+        logger.error(f"Sweeping unreferenced execution output failed: {e}")
+        return 0
+    finally:
+        db.close()
+
+def _incremental_vacuum(policy: RetentionPolicy) -> bool:
+    """Returns free pages to the OS on SQLite databases created with auto_vacuum=INCREMENTAL."""
+    engine = database.engine
+    if engine.dialect.name != 'sqlite' or not policy.vacuum_pages:
+        return False
+    with engine.connect() as conn:
+        if conn.exec_driver_sql('PRAGMA auto_vacuum').scalar() != 2:
+            logger.debug("SQLite auto_vacuum is not INCREMENTAL; skipping incremental vacuum.")
+            return False
+        conn.exec_driver_sql(f'PRAGMA incremental_vacuum({int(policy.vacuum_pages)})').fetchall()
+        conn.commit()
+    return True
+
+def purge_execution_logs(policy: Optional[RetentionPolicy] = None) -> schemas.RetentionReport:
+    """
+    Applies the retention policy once and returns what was purged and how long it took.
+    """
+    global _last_report
+    policy = policy or RetentionPolicy.from_config()
+    if database.SessionLocal is None:
+        database.init_db()
+    started = time.monotonic()
+    now = datetime.now(timezone.utc)
+    archive_path = None
+    if policy.archive_dir:
+        archive_path = Path(policy.archive_dir) / f"execution_logs-{now.strftime('%Y%m%dT%H%M%S')}.jsonl.gz"
+
+    purged_by_age = _purge_by_age(policy, now, archive_path)
+    purged_by_count = _purge_by_count(policy, archive_path)
+    changes_pruned = _prune_change_feed(policy, now)
+    outputs_swept = _sweep_outputs()
+    vacuumed = _incremental_vacuum(policy) if purged_by_age or purged_by_count else False
+    if purged_by_age or purged_by_count:
+        scheduler_instance.job_journal.invalidate()
+
+    report = schemas.RetentionReport(
+        started_at=now,
+        duration_seconds=round(time.monotonic() - started, 3),
+        purged_by_age=purged_by_age,
+        purged_by_count=purged_by_count,
+        changes_pruned=changes_pruned,
+        outputs_swept=outputs_swept,
+        archive_path=str(archive_path) if archive_path and archive_path.exists() else None,
+        vacuumed=vacuumed,
+    )
+    _last_report = report
+    logger.info(f"Execution log retention finished: {report.model_dump()}")
+    return report
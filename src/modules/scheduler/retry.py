@@ -0,0 +1,282 @@
+"""
+Retries of failed runs.
+
+When a run of a persisted job fails, the job's retry policy (JobConfig.retry, or scheduler.retry
+in config.yaml) decides whether and when it runs again: after an exponentially growing, jittered
+delay, up to max_attempts runs in total, and only for the listed exception types.
+
+Pending retries live in an in-memory heap served by one timer thread and are mirrored to the
+job_retries table whenever they change, so they survive a restart. A due retry is submitted
+straight to the job's executor; no jobstore job is created for it. Retry runs are recorded like
+any other run, with their attempt number and the log ID of the chain's first run (retry_of).
+Once stopped, the manager only persists new retries, for the next process to load; runs still
+finishing during scheduler shutdown cannot start the timer thread again.
+"""
+import heapq
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from apscheduler.events import (
+    EVENT_ALL_JOBS_REMOVED, EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_REMOVED,
+)
+from apscheduler.executors.base import MaxInstancesReachedError
+
+from core import database
+from modules.scheduler import models, schemas
+from modules.scheduler.recorder import execution_log_id
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+RETRY_EVENTS = EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED | EVENT_JOB_REMOVED | EVENT_ALL_JOBS_REMOVED
+
+def retry_delay(policy: schemas.RetryPolicy, failed_attempts: int, rng=random) -> float:
+    """Seconds to wait before the next run after failed_attempts consecutive failures."""
+    delay = min(policy.initial_delay_seconds * policy.backoff_multiplier ** (failed_attempts - 1), policy.max_delay_seconds)
+    if policy.jitter:
+        delay *= 1 + rng.uniform(-policy.jitter, policy.jitter)
+    return max(delay, 0.0)
+
+def is_retryable(policy: schemas.RetryPolicy, exception: Optional[BaseException]) -> bool:
+    """Whether the policy retries this exception, matching class names along its MRO."""
+    if policy.retry_on is None:
+        return True
+    if exception is None:
+        return False
+    names = set()
+    for cls in type(exception).__mro__:
+        names.add(cls.__name__)
+        names.add(f"{cls.__module__}.{cls.__qualname__}")
+    return any(name in names for name in policy.retry_on)
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+class _Retry:
+    __slots__ = ('job_id', 'attempt', 'retry_of', 'due_time')
+
+    def __init__(self, job_id: str, attempt: int, retry_of: str, due_time: datetime):
+        self.job_id = job_id
+        self.attempt = attempt
+        self.retry_of = retry_of
+        self.due_time = due_time
+
+class RetryManager:
+    def __init__(self, scheduler, recorder, default_policy: schemas.RetryPolicy, jobstore: Optional[str] = None):
+        self.scheduler = scheduler
+        self.recorder = recorder
+        self.default_policy = default_policy
+        self.jobstore = jobstore
+        self._policies: Dict[str, schemas.RetryPolicy] = {}
+        # Pending retries by the log ID of their chain's first run; a chain has one at a time.
+        self._pending: Dict[str, _Retry] = {}
+        # (due time, retry_of); entries whose retry was rescheduled or cancelled are skipped.
+        self._heap: List[Tuple[datetime, str]] = []
+        # Log ID of each submitted retry run -> (attempt, retry_of), until its outcome arrives.
+        self._running: Dict[str, Tuple[int, str]] = {}
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._stopped = False
+
+    # --- policies ---
+
+    def set_policy(self, job_id: str, policy: Optional[schemas.RetryPolicy]) -> None:
+        """Sets the policy of a job; None falls back to the default policy."""
+        with self._condition:
+            if policy is None:
+                self._policies.pop(job_id, None)
+            else:
+                self._policies[job_id] = policy
+
+    def policy_for(self, job_id: str) -> schemas.RetryPolicy:
+        return self._policies.get(job_id, self.default_policy)
+
+    # --- events ---
+
+    def __call__(self, event) -> None:
+        try:
+            if event.code == EVENT_ALL_JOBS_REMOVED:
+                if event.alias is None or event.alias == self.jobstore:
+                    self._cancel(lambda retry: True)
+                return
+            if self.jobstore is not None and event.jobstore != self.jobstore:
+                return
+            if event.code == EVENT_JOB_REMOVED:
+                with self._condition:
+                    self._policies.pop(event.job_id, None)
+                self._cancel(lambda retry: retry.job_id == event.job_id)
+                return
+            log_id = execution_log_id(event.job_id, event.scheduled_run_time)
+            with self._condition:
+                attempt, retry_of = self._running.pop(log_id, (1, log_id))
+            if event.code == EVENT_JOB_ERROR:
+                self._on_failure(event, attempt, retry_of)
+        except Exception as e:
+            logger.error(f"Failed to handle retry event {event.code} for job {getattr(event, 'job_id', None)}: {e}", exc_info=True)
+
+    def _on_failure(self, event, attempt: int, retry_of: str) -> None:
+        policy = self.policy_for(event.job_id)
+        if attempt >= policy.max_attempts:
+            if policy.max_attempts > 1:
+                logger.error(f"Job {event.job_id} failed on attempt {attempt} of {policy.max_attempts}; giving up.")
+            return
+        if not is_retryable(policy, event.exception):
+            logger.info(f"Job {event.job_id} failed with non-retryable {type(event.exception).__name__}; not retrying.")
+            return
+        due_time = datetime.now(timezone.utc) + timedelta(seconds=retry_delay(policy, attempt))
+        self._schedule(_Retry(event.job_id, attempt + 1, retry_of, due_time))
+        logger.info(f"Retrying job {event.job_id} (attempt {attempt + 1} of {policy.max_attempts}) at {due_time}.")
+
+    # --- queue ---
+
+    def _schedule(self, retry: _Retry) -> None:
+        self._persist(retry)
+        with self._condition:
+            if self._stopped:
+                return
+            self._pending[retry.retry_of] = retry
+            heapq.heappush(self._heap, (retry.due_time, retry.retry_of))
+            self._condition.notify()
+        self._ensure_started()
+
+    def _cancel(self, predicate: Callable[[_Retry], bool]) -> None:
+        with self._condition:
+            cancelled = [retry for retry in self._pending.values() if predicate(retry)]
+            for retry in cancelled:
+                del self._pending[retry.retry_of]
+        if cancelled:
+            self._delete([retry.retry_of for retry in cancelled])
+
+    def load(self) -> int:
+        """
+        Loads the retries persisted by a previous process and serves them, also after stop().
+        Returns how many are pending.
+        """
+        db = next(database.get_db())
+        try:
+            rows = db.query(models.JobRetry).all()
+        finally:
+            db.close()
+        with self._condition:
+            self._stopped = False
+            for row in rows:
+                retry = _Retry(row.job_id, row.attempt, row.retry_of, _utc(row.due_time))
+                self._pending[retry.retry_of] = retry
+                heapq.heappush(self._heap, (retry.due_time, retry.retry_of))
+            self._condition.notify()
+            count = len(self._pending)
+        if count:
+            self._ensure_started()
+        return count
+
+    def pending(self) -> List[schemas.PendingRetry]:
+        with self._condition:
+            retries = sorted(self._pending.values(), key=lambda retry: retry.due_time)
+        return [
+            schemas.PendingRetry(job_id=retry.job_id, attempt=retry.attempt, retry_of=retry.retry_of, due_time=retry.due_time)
+            for retry in retries
+        ]
+
+    # --- persistence ---
+
+    def _persist(self, retry: _Retry) -> None:
+        db = next(database.get_db())
+        try:
+            db.merge(models.JobRetry(retry_of=retry.retry_of, job_id=retry.job_id, attempt=retry.attempt, due_time=retry.due_time))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to persist retry of {retry.retry_of}; it will be lost on restart: {e}")
+        finally:
+            db.close()
+
+    def _delete(self, retry_ofs: List[str]) -> None:
+        db = next(database.get_db())
+        try:
+            db.query(models.JobRetry).filter(models.JobRetry.retry_of.in_(retry_ofs)).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to delete persisted retries {retry_ofs}: {e}")
+        finally:
+            db.close()
+
+    # --- dispatch ---
+
+    def _ensure_started(self) -> None:
+        with self._condition:
+            if self._stopped:
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(target=self._run, name="job-retries", daemon=True)
+                self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the timer thread; retries scheduled from now on are only persisted."""
+        with self._condition:
+            thread = self._thread
+            self._thread = None
+            self._stopping = True
+            self._stopped = True
+            self._condition.notify()
+        if thread is not None:
+            thread.join()
+
+    def _next_due(self) -> Optional[_Retry]:
+        """Waits for the earliest retry to fall due and takes it; None once stopping."""
+        with self._condition:
+            while not self._stopping:
+                while self._heap:
+                    due_time, retry_of = self._heap[0]
+                    retry = self._pending.get(retry_of)
+                    if retry is not None and retry.due_time == due_time:
+                        break
+                    heapq.heappop(self._heap)
+                now = datetime.now(timezone.utc)
+                if self._heap and self._heap[0][0] <= now:
+                    _, retry_of = heapq.heappop(self._heap)
+                    return self._pending.pop(retry_of)
+                self._condition.wait((self._heap[0][0] - now).total_seconds() if self._heap else None)
+            return None
+
+    def _run(self) -> None:
+        while True:
+            retry = self._next_due()
+            if retry is None:
+                return
+            try:
+                self._dispatch(retry)
+            except Exception as e:
+                logger.error(f"Failed to run retry of {retry.retry_of}: {e}", exc_info=True)
+                self._delete([retry.retry_of])
+
+    def _dispatch(self, retry: _Retry) -> None:
+        job = self.scheduler.get_job(retry.job_id, self.jobstore)
+        if job is None or job.next_run_time is None:
+            logger.info(f"Dropping retry of job {retry.job_id}: the job was removed or paused.")
+            self._delete([retry.retry_of])
+            return
+        run_time = datetime.now(timezone.utc)
+        log_id = execution_log_id(job.id, run_time)
+        with self._condition:
+            self._running[log_id] = (retry.attempt, retry.retry_of)
+        # Deleted before submitting: a run that fails at once persists the chain's next retry under the same key.
+        self._delete([retry.retry_of])
+        try:
+            self.scheduler._lookup_executor(job.executor).submit_job(job, [run_time])
+        except MaxInstancesReachedError:
+            with self._condition:
+                self._running.pop(log_id, None)
+            # A run of the job is still going; try again after the policy's first delay.
+            retry.due_time = run_time + timedelta(seconds=max(self.policy_for(job.id).initial_delay_seconds, 1))
+            self._schedule(retry)
+            return
+        except Exception:
+            with self._condition:
+                self._running.pop(log_id, None)
+            raise
+        self.recorder.record_submission(job.id, self.jobstore, run_time, attempt=retry.attempt, retry_of=retry.retry_of)
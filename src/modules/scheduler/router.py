@@ -1,12 +1,13 @@
 import json, os
-from typing import List
+from typing import List, Optional
 import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Path, Query, Response
 from sqlalchemy.orm import Session
 from apscheduler.jobstores.base import JobLookupError
 
+from core import database
 from core.database import get_db
-from modules.scheduler import models, schemas, loader
+from modules.scheduler import models, schemas, loader, retention
 from modules.scheduler.service import job_definition_service
 from modules.scheduler import scheduler_instance, service
 from util import logger_util, config_util
@@ -18,30 +19,108 @@ router = APIRouter(prefix="/api")
 #
 # --- Dashboard Endpoints ---
 #
-@router.get("/dashboard/summary", response_model=schemas.DashboardSummary, tags=["Dashboard"], summary="Get Dashboard Summary", description="Provides a high-level summary of job statuses.")
-def get_dashboard_summary(db: Session = Depends(get_db)):
+@router.get("/dashboard/summary", response_model=schemas.DashboardSummary, tags=["Dashboard"], summary="Get Dashboard Summary", description="Provides a high-level summary of job statuses. With window_minutes, run counts cover only runs started in that window (up to dashboard.stats_window_hours).")
+def get_dashboard_summary(window_minutes: Optional[int] = Query(None, ge=1)):
     try:
-        return service.get_dashboard_summary(db)
+        return service.get_dashboard_summary(window_minutes=window_minutes)
     except Exception as e:
         logger.error(f"Error fetching dashboard summary: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch dashboard summary")
 
-@router.get("/logs", response_model=List[schemas.ProcessExecutionLogInfo], tags=["Dashboard"], summary="Get Execution Logs", description="Retrieves a paginated list of job execution logs.")
-def get_execution_logs(skip: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=200), db: Session = Depends(get_db)):
+@router.get("/logs", response_model=schemas.ProcessExecutionLogPage, tags=["Dashboard"], summary="Get Execution Logs", description="Retrieves a page of job execution logs, newest first. Pass next_cursor back as cursor to fetch the following page.")
+def get_execution_logs(
+    limit: int = Query(100, ge=1, le=200), cursor: Optional[str] = None,
+    since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None, status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     try:
-        return service.get_execution_logs(db, skip=skip, limit=limit)
+        return service.get_execution_logs(db, limit=limit, cursor=cursor, since=since, until=until, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching execution logs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch execution logs")
 
-@router.get("/timeline/data", response_model=List[schemas.TimelineItem], tags=["Dashboard"], summary="Get Timeline Data", description="Provides data for the job execution timeline, including scheduled and historical runs.")
-def get_timeline_data(db: Session = Depends(get_db)):
+@router.get("/logs/{log_id}", response_model=schemas.ProcessExecutionLogInfo, tags=["Dashboard"], summary="Get Execution Log Output", description="Retrieves a single execution log including its stdout and stderr.")
+def get_execution_log(log_id: str, db: Session = Depends(get_db)):
+    log = service.get_execution_log(db, log_id=log_id)
+    if log is None:
+        raise HTTPException(status_code=404, detail="Execution log not found")
+    return log
+
+@router.get("/logs/{log_id}/output/{stream}", response_model=schemas.ExecutionOutputRange, tags=["Dashboard"], summary="Read Execution Output", description="Reads a byte range of a run's stdout or stderr without loading the whole output.")
+def get_execution_output(
+    log_id: str, stream: str = Path(..., pattern="^(stdout|stderr)$"),
+    offset: int = Query(0, ge=0), length: int = Query(65536, ge=1, le=1048576),
+    db: Session = Depends(get_db),
+):
+    try:
+        output = service.get_execution_output(db, log_id=log_id, stream=stream, offset=offset, length=length)
+    except Exception as e:
+        logger.error(f"Error reading {stream} of execution log {log_id}: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to read execution output")
+    if output is None:
+        raise HTTPException(status_code=404, detail="Execution log not found")
+    return output
+
+@router.get("/timeline/data", response_model=schemas.TimelineData, tags=["Dashboard"], summary="Get Timeline Data", description="Provides data for the job execution timeline in [start, end), including scheduled and historical runs. resolution is 'auto' (individual runs when few enough, buckets otherwise), 'runs', or a bucket width in seconds.")
+def get_timeline_data(
+    start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+    groups: Optional[List[str]] = Query(None), resolution: Optional[str] = Query(None, pattern="^(auto|runs|[0-9]+)$"),
+    db: Session = Depends(get_db),
+):
     try:
-        return service.get_timeline_data(db)
+        return service.get_timeline_data(db, start=start, end=end, groups=groups, resolution=resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching timeline data: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/timeline/delta", response_model=schemas.TimelineDelta, tags=["Dashboard"], summary="Get Timeline Changes", description="Returns the timeline items of [start, end) added, changed or removed since the cursor of a previous timeline response. Pass that response's resolution_seconds (omit it for individual runs). If reset is true the client must reload /timeline/data.")
+def get_timeline_delta(
+    cursor: str, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+    groups: Optional[List[str]] = Query(None), resolution_seconds: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+):
+    try:
+        return service.get_timeline_delta(db, cursor=cursor, start=start, end=end, groups=groups, resolution_seconds=resolution_seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error fetching timeline changes: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/forecast", response_model=schemas.Forecast, tags=["Dashboard"], summary="Forecast Fire Times", description="Lists the upcoming fire times of scheduled jobs over the given horizon, with the number of fires per minute across the selected jobs.")
+def get_forecast(
+    start: Optional[datetime.datetime] = None, hours: float = Query(24, gt=0),
+    job_ids: Optional[List[str]] = Query(None), include_fire_times: bool = True,
+    max_fire_times: int = Query(500, ge=0, le=10000),
+):
+    try:
+        return service.get_forecast(
+            start=start, hours=hours, job_ids=job_ids,
+            include_fire_times=include_fire_times, max_fire_times=max_fire_times,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error computing forecast: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/forecast/spreading", response_model=schemas.SpreadAnalysis, tags=["Dashboard"], summary="Analyze Fire Time Spreading", description="Compares the per-minute fire times of the enabled job definitions over the given horizon without spreading (H at the lowest value of its range, no spread_seconds or jitter) and as scheduled. Jitter is sampled.")
+def get_spread_analysis(
+    start: Optional[datetime.datetime] = None, hours: float = Query(24, gt=0),
+    job_ids: Optional[List[str]] = Query(None), db: Session = Depends(get_db),
+):
+    try:
+        return service.get_spread_analysis(db, start=start, hours=hours, job_ids=job_ids)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error analyzing fire time spreading: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+
 # --- Job Definition Endpoints ---
 #
 @router.get("/jobs", response_model=List[schemas.JobConfig], tags=["Job Definitions"], summary="List All Job Definitions")
@@ -53,8 +132,13 @@ def read_jobs(db: Session = Depends(get_db), skip: int = Query(0, ge=0), limit:
 def create_job(job_in: schemas.JobConfig, db: Session = Depends(get_db)):
     if job_definition_service.get(db, id=job_in.id):
         raise HTTPException(status_code=409, detail="Job with this ID already exists")
+    try:
+        scheduler_instance.check_job_executor(job_in.executor, job_in.job_type)
+        scheduler_instance.check_job_resources(job_in.resources)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     db_job = job_definition_service.create_from_config(db, job_in=job_in)
-    loader.sync_jobs_from_db()
+    loader.sync_job_ids_from_db(db, [db_job.id])
     return schemas.JobConfig.model_validate(db_job)
 
 @router.get("/jobs/{job_id}", response_model=schemas.JobConfig, tags=["Job Definitions"])
@@ -69,8 +153,13 @@ def update_job(job_id: str, job_in: schemas.JobConfig, db: Session = Depends(get
     db_job = job_definition_service.get(db, id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        scheduler_instance.check_job_executor(job_in.executor, job_in.job_type)
+        scheduler_instance.check_job_resources(job_in.resources)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     db_job = job_definition_service.update_from_config(db, db_obj=db_job, job_in=job_in)
-    loader.sync_jobs_from_db()
+    loader.sync_job_ids_from_db(db, [job_id])
     return schemas.JobConfig.model_validate(db_job)
 
 @router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Job Definitions"])
@@ -78,19 +167,51 @@ def delete_job(job_id: str, db: Session = Depends(get_db)):
     db_job = job_definition_service.remove(db, id=job_id)
     if db_job is None:
         raise HTTPException(status_code=404, detail="Job not found")
-    loader.sync_jobs_from_db()
+    loader.sync_job_ids_from_db(db, [job_id])
     return
 
 
 # --- Scheduler Control Endpoints ---
-@router.get("/scheduler/jobs", response_model=List[schemas.JobInfo], tags=["Scheduler Control"])
-def get_scheduled_jobs():
+@router.get("/scheduler/jobs", response_model=List[schemas.JobInfo], tags=["Scheduler Control"], summary="List Scheduled Jobs", description="Lists scheduled jobs, optionally filtered by state (scheduled, paused) and trigger type (cron, interval, date) and sorted by id, next_run_time or -next_run_time. The total number of matches is returned in the X-Total-Count header.")
+def get_scheduled_jobs(
+    response: Response, state: Optional[str] = Query(None, pattern="^(scheduled|paused)$"),
+    trigger: Optional[str] = None, sort: str = Query('id', pattern="^(id|next_run_time|-next_run_time)$"),
+    skip: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1),
+):
     try:
-        return service.get_scheduled_jobs_info()
+        total, jobs = service.get_scheduled_jobs_info(state=state, trigger=trigger, sort=sort, skip=skip, limit=limit)
+        response.headers["X-Total-Count"] = str(total)
+        return jobs
     except Exception as e:
         logger.error(f"Error fetching scheduled jobs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch scheduled jobs")
 
+@router.get("/scheduler/retries", response_model=List[schemas.PendingRetry], tags=["Scheduler Control"], summary="List Pending Retries", description="Lists the retries of failed runs that are waiting for their backoff delay, soonest first.")
+def list_pending_retries():
+    return scheduler_instance.retry_manager.pending()
+
+@router.get("/scheduler/resources", response_model=List[schemas.ResourceUsage], tags=["Scheduler Control"], summary="List Concurrency Groups", description="Lists the configured concurrency groups with their capacity, the units currently leased by all scheduler processes and the runs of this process waiting for them.")
+def list_resource_usage():
+    try:
+        return scheduler_instance.resource_manager.usage()
+    except Exception as e:
+        logger.error(f"Error fetching resource usage: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to fetch resource usage")
+
+@router.get("/scheduler/queues", response_model=List[schemas.DispatchQueueStats], tags=["Scheduler Control"], summary="List Dispatch Queues", description="Reports, per thread or process pool and job priority, the runs waiting for a worker and how long started runs waited for one.")
+def list_dispatch_queues():
+    return scheduler_instance.dispatch_queue_stats()
+
+@router.post("/scheduler/sync", tags=["Scheduler Control"], summary="Resync All Jobs", description="Re-applies every job definition in the database to the scheduler. With force, jobs are re-added even if unchanged.")
+def resync_scheduled_jobs(force: bool = Query(False)):
+    try:
+        if force:
+            loader.reset_applied_state()
+        return {"message": "Scheduler resynced from the database.", "result": loader.sync_jobs_from_db()}
+    except Exception as e:
+        logger.error(f"Error during full scheduler resync: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to resync jobs")
+
 # --- job edit Endpoints ---
 
 @router.post("/scheduler/jobs/{job_id}/pause", tags=["Scheduler Control"])
@@ -117,24 +238,6 @@ def run_scheduled_job_immediately(job_id: str):
     except JobLookupError:
         raise HTTPException(status_code=404, detail=f"Job '{job_id}' not found.")
 
-
-@router.put("/jobs/{job_id}", response_model=schemas.JobConfig, tags=["Job Definitions"])
-def update_job(job_id: str, job_in: schemas.JobConfig, db: Session = Depends(get_db)):
-    db_job = job_definition_service.get(db, id=job_id)
-    if db_job is None:
-        raise HTTPException(status_code=404, detail="Job not found")
-    db_job = job_definition_service.update_from_config(db, db_obj=db_job, job_in=job_in)
-    loader.sync_jobs_from_db()
-    return schemas.JobConfig.model_validate(db_job)
-
-@router.delete("/jobs/{job_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Job Definitions"])
-def delete_job(job_id: str, db: Session = Depends(get_db)):
-    db_job = job_definition_service.remove(db, id=job_id)
-    if db_job is None:
-        raise HTTPException(status_code=404, detail="Job not found")
-    loader.sync_jobs_from_db()
-    return
-
 @router.post("/jobs/bulk/delete", status_code=status.HTTP_200_OK, tags=["Job Definitions"])
 def delete_bulk_jobs(payload: schemas.BulkJobUpdate, db: Session = Depends(get_db)):
     job_ids = payload.job_ids
@@ -144,12 +247,26 @@ def delete_bulk_jobs(payload: schemas.BulkJobUpdate, db: Session = Depends(get_d
     try:
         deleted_count = service.delete_bulk_jobs(db, job_ids=job_ids)
         if deleted_count > 0:
-            loader.sync_jobs_from_db()
+            loader.sync_job_ids_from_db(db, job_ids)
         return {"message": f"Successfully deleted {deleted_count} jobs."}
     except Exception as e:
         logger.error(f"Error during bulk deletion of jobs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to delete jobs")
 
+@router.post("/jobs/bulk/upsert", response_model=schemas.BulkJobUpsertResult, tags=["Job Definitions"], summary="Create or Update Many Job Definitions")
+def upsert_bulk_jobs(payload: schemas.BulkJobUpsert, db: Session = Depends(get_db)):
+    if not payload.jobs:
+        raise HTTPException(status_code=400, detail="No jobs provided")
+    try:
+        result = service.upsert_bulk_jobs(db, payload.jobs)
+        written_ids = [item.id for item in result.results if item.status != 'failed']
+        if written_ids:
+            loader.sync_job_ids_from_db(db, written_ids)
+        return result
+    except Exception as e:
+        logger.error(f"Error during bulk upsert of jobs: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to upsert jobs")
+
 @router.post("/scheduler/jobs/bulk/pause", tags=["Scheduler Control"])
 def pause_bulk_scheduled_jobs(payload: schemas.BulkJobUpdate):
     if not payload.job_ids:
@@ -176,10 +293,16 @@ def resume_bulk_scheduled_jobs(payload: schemas.BulkJobUpdate):
         logger.error(f"Error during bulk resume of jobs: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to resume jobs")
 
-@router.get("/jobs/{job_id}/history", response_model=List[schemas.ProcessExecutionLogInfo], tags=["Job Details"])
-def get_job_execution_history(job_id: str, db: Session = Depends(get_db)):
+@router.get("/jobs/{job_id}/history", response_model=schemas.ProcessExecutionLogPage, tags=["Job Details"])
+def get_job_execution_history(
+    job_id: str, limit: int = Query(50, ge=1, le=200), cursor: Optional[str] = None,
+    since: Optional[datetime.datetime] = None, until: Optional[datetime.datetime] = None, status: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
     try:
-        return service.get_job_execution_history(db, job_id=job_id)
+        return service.get_job_execution_history(db, job_id=job_id, limit=limit, cursor=cursor, since=since, until=until, status=status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error fetching job execution history for job {job_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Failed to fetch job execution history")
@@ -187,6 +310,23 @@ def get_job_execution_history(job_id: str, db: Session = Depends(get_db)):
 
 
 
+# --- Maintenance Endpoints ---
+@router.get("/maintenance/retention", response_model=Optional[schemas.RetentionReport], tags=["Maintenance"], summary="Get Last Retention Report")
+def get_retention_report():
+    return retention.get_last_report()
+
+@router.post("/maintenance/retention/run", response_model=schemas.RetentionReport, tags=["Maintenance"], summary="Run Execution Log Retention Now")
+def run_retention():
+    try:
+        return retention.purge_execution_logs()
+    except Exception as e:
+        logger.error(f"Error running execution log retention: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Failed to run execution log retention")
+
+@router.get("/maintenance/database/pool", response_model=schemas.DatabasePoolStatus, tags=["Maintenance"], summary="Get Database Pool Status", description="Reports the occupancy of the shared database connection pool and how long connection checkouts have waited since startup.")
+def get_database_pool_status():
+    return database.get_pool_status()
+
 @router.get("/jobs_yaml", tags=["Configuration"])
 def get_jobs_yaml_content():
     try:
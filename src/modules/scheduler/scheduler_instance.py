@@ -1,27 +1,81 @@
 import atexit
-from datetime import datetime, timedelta
 
-from apscheduler.executors.pool import ProcessPoolExecutor, ThreadPoolExecutor
+from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.events import EVENT_JOB_ERROR
 
-from core.config import settings
+from core import database
 from util import logger_util
+from modules.scheduler.executors import (
+    COMMAND_EXECUTOR, DEFAULT_EXECUTOR, INTERNAL_EXECUTOR, create_executors, is_command_executor,
+)
+from modules.scheduler import command_runner
+from modules.scheduler.jobstore import JSONJobStore
+from modules.scheduler.log_writer import log_writer
+from modules.scheduler.recorder import RECORDED_EVENTS, ExecutionRecorder
+from modules.scheduler.stats import JOB_EVENTS, DashboardStats
+from modules.scheduler.journal import JOURNAL_EVENTS, JobChangeJournal
+from modules.scheduler.forecast import ForecastEngine
+from modules.scheduler.job_index import INDEX_EVENTS, JobIndex
+from modules.scheduler.resources import ResourceManager
+from modules.scheduler.retry import RETRY_EVENTS, RetryManager
+from modules.scheduler.schemas import RetryPolicy
+from util.config_util import config
 
 logger = logger_util.get_logger(__name__)
 
-MAX_RETRIES = 3
-RETRY_DELAY_SECONDS = 30
+DEFAULT_JOBSTORE = "default"
+# Housekeeping jobs are recreated on every startup and must not be persisted.
+INTERNAL_JOBSTORE = "internal"
+
+def _create_default_jobstore():
+    if config.scheduler_jobstore == "sqlalchemy":
+        database.init_db()
+        return SQLAlchemyJobStore(engine=database.engine)
+    # Shares core.database.engine, which is initialized when the scheduler starts.
+    return JSONJobStore()
 
 jobstores = {
-    "default": SQLAlchemyJobStore(url=settings.DATABASE_URL)
+    DEFAULT_JOBSTORE: _create_default_jobstore(),
+    INTERNAL_JOBSTORE: MemoryJobStore(),
 }
 
-executors = {
-    "default": ThreadPoolExecutor(20),
-    "processpool": ProcessPoolExecutor(5),
-}
+# Named concurrency groups, enforced by the job executors and shared with other scheduler processes.
+resource_manager = ResourceManager(
+    config.scheduler_resources, lease_ttl_seconds=config.resource_lease_ttl_seconds,
+    poll_interval_seconds=config.resource_poll_interval_seconds,
+)
+
+executors = create_executors(config.scheduler_executors, resource_manager)
+
+def job_executor_names():
+    """Executors that job definitions may select."""
+    return sorted(name for name in executors if name != INTERNAL_EXECUTOR)
+
+def check_job_executor(name: str, job_type: str = "python") -> str:
+    """
+    Returns the executor a job of job_type runs on. "default" stands for the default pool of the
+    job type; command jobs need a command pool and Python jobs a thread or process pool.
+    """
+    if job_type == "command" and name == DEFAULT_EXECUTOR:
+        name = COMMAND_EXECUTOR
+    if name == INTERNAL_EXECUTOR or name not in executors:
+        raise ValueError(f"Unknown executor '{name}'; configured executors: {', '.join(job_executor_names())}")
+    if is_command_executor(executors[name]) != (job_type == "command"):
+        raise ValueError(f"Executor '{name}' cannot run {job_type} jobs")
+    return name
+
+def dispatch_queue_stats():
+    """Queue depth and slot waits per priority of every pool that dispatches by priority."""
+    return [
+        dict(executor=name, **row)
+        for name in job_executor_names() if hasattr(executors[name], 'queue_stats')
+        for row in executors[name].queue_stats()
+    ]
+
+def check_job_resources(resources) -> None:
+    """Raises ValueError unless the concurrency groups a job claims are configured and large enough."""
+    resource_manager.check(resources)
 
 job_defaults = {
     "coalesce": False,
@@ -34,31 +88,26 @@ scheduler = BackgroundScheduler(
     job_defaults=job_defaults
 )
 
-def job_error_listener(event):
-    job = scheduler.get_job(event.job_id)
-    if event.exception and job:
-        current_retries = job.kwargs.get('retry_count', 0)
-        logger.error(f"Job {job.id} failed: {event.exception}. Retries: {current_retries}")
-        if current_retries < MAX_RETRIES:
-            new_kwargs = job.kwargs.copy()
-            new_kwargs['retry_count'] = current_retries + 1
-            job_func_kwargs = new_kwargs.copy()
-            job_func_kwargs.pop('retry_count', None)
-            retry_time = datetime.now() + timedelta(seconds=RETRY_DELAY_SECONDS)
-            scheduler.add_job(
-                job.func,
-                'date',
-                run_date=retry_time,
-                args=job.args,
-                kwargs=job_func_kwargs,
-                id=f"{job.id}_retry_{current_retries + 1}",
-                replace_existing=True
-            )
-            logger.info(f"Rescheduled {job.id} for retry at {retry_time}.")
-        else:
-            logger.error(f"Job {job.id} reached max retries.")
-
-scheduler.add_listener(job_error_listener, EVENT_JOB_ERROR)
+# Dashboard counters, maintained from job events and run transitions.
+dashboard_stats = DashboardStats(window_hours=config.dashboard_stats_window_hours, ignored_jobstores={INTERNAL_JOBSTORE})
+scheduler.add_listener(dashboard_stats, JOB_EVENTS)
+
+# Snapshot of the persisted jobs for read endpoints; rebuilt once the scheduler has started.
+job_index = JobIndex(scheduler, jobstore=DEFAULT_JOBSTORE, resources=resource_manager)
+scheduler.add_listener(job_index, INDEX_EVENTS)
+
+# Scheduled job changes, for incremental timeline updates.
+job_journal = JobChangeJournal(ignored_jobstores={INTERNAL_JOBSTORE})
+scheduler.add_listener(job_journal, JOURNAL_EVENTS)
+forecast_engine = ForecastEngine(scheduler, job_journal, jobstore=DEFAULT_JOBSTORE)
+
+# Every run of a persisted job is recorded as a ProcessExecutionLog row.
+recorder = ExecutionRecorder(scheduler, stats=dashboard_stats, ignored_jobstores={INTERNAL_JOBSTORE})
+scheduler.add_listener(recorder, RECORDED_EVENTS)
+
+# Failed runs are retried per job retry policy, without adding jobs to the jobstore.
+retry_manager = RetryManager(scheduler, recorder, RetryPolicy(**config.scheduler_retry_policy), jobstore=DEFAULT_JOBSTORE)
+scheduler.add_listener(retry_manager, RETRY_EVENTS)
 
 def start_scheduler():
     logger.info("Starting scheduler...")
@@ -67,5 +116,11 @@ def start_scheduler():
 
 def shutdown_scheduler():
     logger.info("Shutting down scheduler...")
+    retry_manager.stop()
     if scheduler.running:
         scheduler.shutdown()
+    # Gives back the concurrency group units of this process's runs, so other processes need not wait for the TTL.
+    resource_manager.stop()
+    command_runner.supervisor.stop()
+    # Jobs have finished at this point; write out whatever log records they queued.
+    log_writer.stop()
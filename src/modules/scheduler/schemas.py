@@ -1,12 +1,15 @@
-from typing import Any, Dict, List, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional
 from datetime import datetime
 from pydantic import BaseModel, Field, ConfigDict, model_validator
 
-from modules.scheduler import models
+from modules.scheduler import models, spreading
+from modules.scheduler.command_runner import COMMAND_FUNC
 
 class BaseTrigger(BaseModel):
     type: str
     timezone: Optional[str] = 'UTC'
+    # Delays every fire by a random 0 to jitter seconds.
+    jitter: Optional[int] = Field(default=None, ge=1)
 
 class CronTrigger(BaseTrigger):
     type: str = 'cron'
@@ -19,17 +22,56 @@ class CronTrigger(BaseTrigger):
     minute: Optional[str] = None
     second: Optional[str] = None
 
+    @model_validator(mode='after')
+    def check_hash_fields(self) -> 'CronTrigger':
+        # Fields may use H, resolved per job by the spreading module.
+        spreading.check_cron_fields(self.model_dump(include=set(spreading.HASH_RANGES) | {'year'}))
+        return self
+
 class IntervalTrigger(BaseTrigger):
-    type: str = 'interval'
+    # A literal, so that a cron trigger failing its own validation is not taken for an interval.
+    type: Literal['interval'] = 'interval'
     weeks: int = 0
     days: int = 0
     hours: int = 0
     minutes: int = 0
     seconds: int = 0
+    # Fires at a phase derived from the job ID within the first spread_seconds of each interval.
+    spread_seconds: Optional[int] = Field(default=None, ge=1)
+
+class CommandSpec(BaseModel):
+    # Exactly one of argv (run directly) and shell (a command line run by the system shell).
+    argv: Optional[List[str]] = Field(default=None, min_length=1)
+    shell: Optional[str] = None
+    cwd: Optional[str] = None
+    # Added to the scheduler's environment.
+    env: Optional[Dict[str, str]] = None
+
+    @model_validator(mode='after')
+    def check_one_command(self) -> 'CommandSpec':
+        if (self.argv is None) == (self.shell is None):
+            raise ValueError("command needs exactly one of argv and shell")
+        return self
+
+class RetryPolicy(BaseModel):
+    # Runs in total, the first one included; 1 disables retries.
+    max_attempts: int = Field(default=4, ge=1)
+    # Delay before the first retry, multiplied by backoff_multiplier for each further retry.
+    initial_delay_seconds: float = Field(default=30, ge=0)
+    backoff_multiplier: float = Field(default=2.0, ge=1)
+    max_delay_seconds: float = Field(default=3600, ge=0)
+    # Each delay is randomized by up to this fraction in either direction.
+    jitter: float = Field(default=0.1, ge=0, le=1)
+    # Exception class names (e.g. 'ConnectionError' or 'requests.exceptions.Timeout') that are
+    # retried, subclasses included; None retries every error.
+    retry_on: Optional[List[str]] = None
 
 class JobConfig(BaseModel):
     id: str
-    func: str
+    # 'python' jobs call func; 'command' jobs run command as an external process.
+    job_type: Literal['python', 'command'] = 'python'
+    func: Optional[str] = None
+    command: Optional[CommandSpec] = None
     description: Optional[str] = None
     is_enabled: bool = True
     trigger: CronTrigger | IntervalTrigger
@@ -38,6 +80,16 @@ class JobConfig(BaseModel):
     max_instances: int = 1
     coalesce: bool = False
     misfire_grace_time: Optional[int] = 3600
+    # Name of an executor pool from scheduler.executors in config.yaml.
+    executor: str = 'default'
+    # None uses scheduler.retry from config.yaml.
+    retry: Optional[RetryPolicy] = None
+    # Runs longer than this are stopped and recorded as TIMEOUT; None lets runs take as long as they need.
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
+    # Units of the named concurrency groups from scheduler.resources in config.yaml each run holds.
+    resources: Optional[Dict[str, Annotated[int, Field(ge=1)]]] = None
+    # Runs waiting for a worker start highest priority first.
+    priority: int = 0
     replace_existing: bool = True
     model_config = ConfigDict(from_attributes=True)
 
@@ -50,9 +102,27 @@ class JobConfig(BaseModel):
                 'type': model_dict.get('trigger_type'),
                 **(model_dict.get('trigger_config') or {})
             }
+            model_dict['retry'] = model_dict.pop('retry_policy', None)
             return model_dict
         return data
 
+    @model_validator(mode='after')
+    def check_job_type(self) -> 'JobConfig':
+        if self.job_type == 'command':
+            if self.command is None:
+                raise ValueError("command jobs need a command")
+            if self.func not in (None, COMMAND_FUNC):
+                raise ValueError("command jobs cannot set func")
+            if self.args or self.kwargs:
+                raise ValueError("command jobs take no args or kwargs; use command.argv and command.env")
+            self.func = COMMAND_FUNC
+        else:
+            if not self.func:
+                raise ValueError("python jobs need a func")
+            if self.command is not None:
+                raise ValueError("only command jobs can set command")
+        return self
+
 class TimelineItem(BaseModel):
     id: str
     content: str
@@ -60,30 +130,194 @@ class TimelineItem(BaseModel):
     end: Optional[datetime] = None
     status: str
     group: Optional[str] = None
+    # Set on aggregated items, which stand for every run of the group started in [start, end).
+    count: Optional[int] = None
+    failed_count: Optional[int] = None
+
+class TimelineData(BaseModel):
+    start: datetime
+    end: datetime
+    # Width of the aggregation buckets in seconds; None when items are individual runs.
+    resolution_seconds: Optional[int] = None
+    # True when individual runs were requested but the window held more than could be returned.
+    truncated: bool = False
+    items: List[TimelineItem]
+    # Pass to the delta endpoint to fetch changes made after this response.
+    cursor: Optional[str] = None
+
+class TimelineDelta(BaseModel):
+    cursor: str
+    # Set when the changes cannot be determined; the client must reload the window.
+    reset: bool = False
+    # Items to add, or to replace the item with the same ID.
+    upserts: List[TimelineItem] = []
+    removed: List[str] = []
 
 class JobInfo(JobConfig):
     next_run_time: Optional[datetime] = None
+    # Status of the job's latest run, if it has run.
+    last_status: Optional[str] = None
 
 class BulkJobUpdate(BaseModel):
     job_ids: List[str]
 
+class BulkJobUpsert(BaseModel):
+    # Validated per item so that one bad definition does not reject the whole batch.
+    jobs: List[Dict[str, Any]]
+
+class BulkJobUpsertItemResult(BaseModel):
+    index: int
+    id: Optional[str] = None
+    status: str
+    detail: Optional[str] = None
+
+class BulkJobUpsertResult(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[BulkJobUpsertItemResult]
+
 class DashboardSummary(BaseModel):
     total_jobs: int
     running_jobs: int
     successful_runs: int
     failed_runs: int
+    missed_runs: int = 0
+    timed_out_runs: int = 0
+    # Run counts cover the last window_minutes when set, all time otherwise.
+    window_minutes: Optional[int] = None
 
 class ProcessExecutionLogInfo(BaseModel):
     id: str
     job_id: str
     command: str
     exit_code: Optional[int] = None
+    # Previews only; the full output is served by the output range endpoint.
     stdout: Optional[str] = None
     stderr: Optional[str] = None
+    stdout_size: Optional[int] = None
+    stderr_size: Optional[int] = None
+    scheduled_time: Optional[datetime] = None
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    status: str
+    attempt: int = 1
+    retry_of: Optional[str] = None
+    # Seconds the run waited for concurrency group capacity and a worker before it started.
+    wait_seconds: Optional[float] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class ProcessExecutionLogSummary(BaseModel):
+    """Execution log metadata without the stdout/stderr payloads."""
+    id: str
+    job_id: str
+    command: str
+    exit_code: Optional[int] = None
+    scheduled_time: Optional[datetime] = None
     start_time: datetime
     end_time: Optional[datetime] = None
     status: str
+    attempt: int = 1
+    retry_of: Optional[str] = None
+    wait_seconds: Optional[float] = None
+    stdout_size: int = 0
+    stderr_size: int = 0
     model_config = ConfigDict(from_attributes=True)
 
+class ExecutionOutputRange(BaseModel):
+    log_id: str
+    stream: str
+    offset: int
+    length: int
+    total_size: int
+    data: str
+
+class ProcessExecutionLogPage(BaseModel):
+    items: List[ProcessExecutionLogSummary]
+    # Pass back as ``cursor`` to fetch the next (older) page; None on the last page.
+    next_cursor: Optional[str] = None
+
+class PendingRetry(BaseModel):
+    job_id: str
+    # Attempt number the retry will run as, and the log ID of the chain's first run.
+    attempt: int
+    retry_of: str
+    due_time: datetime
+
+class ResourceUsage(BaseModel):
+    name: str
+    capacity: int
+    # Units held by runs of every scheduler process sharing the database.
+    in_use: int
+    # Runs of this process waiting for the group.
+    waiting: int
+
+class DispatchQueueStats(BaseModel):
+    executor: str
+    priority: int
+    # Runs waiting for a worker now, and how long the longest-waiting one has waited.
+    queued: int
+    oldest_wait_seconds: float
+    # Runs that got a worker since the scheduler started, and their waits for it.
+    started: int
+    mean_wait_seconds: float
+    max_wait_seconds: float
+
+class RetentionReport(BaseModel):
+    started_at: datetime
+    duration_seconds: float
+    purged_by_age: int
+    purged_by_count: int
+    changes_pruned: int
+    # Stored outputs removed because no execution log refers to them any more.
+    outputs_swept: int = 0
+    archive_path: Optional[str] = None
+    vacuumed: bool = False
+
+class DatabasePoolStatus(BaseModel):
+    dialect: str
+    pool_class: str
+    # Occupancy; None for pools that do not track it (e.g. in-memory SQLite).
+    size: Optional[int] = None
+    checked_out: Optional[int] = None
+    checked_in: Optional[int] = None
+    overflow: Optional[int] = None
+    # Checkout wait times since startup.
+    checkouts: int
+    timeouts: int
+    slow_checkouts: int
+    mean_wait_ms: float
+    max_wait_ms: float
+
+class JobForecast(BaseModel):
+    job_id: str
+    # Number of fire times in the horizon; fire_times may hold fewer (see truncated).
+    count: int
+    truncated: bool = False
+    fire_times: List[datetime] = []
+
+class ForecastBucket(BaseModel):
+    minute: datetime
+    fires: int
+
+class Forecast(BaseModel):
+    start: datetime
+    end: datetime
+    jobs: List[JobForecast]
+    # Fire times per minute across the selected jobs; minutes without fires are omitted.
+    histogram: List[ForecastBucket]
+    peak_fires_per_minute: int
+
+class SpreadAnalysis(BaseModel):
+    start: datetime
+    end: datetime
+    # Jobs whose triggers use H, spread_seconds or jitter.
+    spread_jobs: List[str]
+    # Fire times per minute without and with spreading; minutes without fires are omitted.
+    before: List[ForecastBucket]
+    after: List[ForecastBucket]
+    peak_before: int
+    peak_after: int
+
 class ErrorResponse(BaseModel):
     detail: str
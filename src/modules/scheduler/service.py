@@ -1,30 +1,37 @@
+import base64
+import math
+import binascii
+from sqlalchemy import and_, case, func, insert, or_, update
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from core import database
 from core.crud import CRUDBase
-from . import models, schemas, scheduler_instance
-from typing import List, Dict
-from datetime import datetime, timedelta, timezone
-from util import logger_util
-from sqlalchemy.orm import Session
-from core.crud import CRUDBase
-from . import models, schemas, scheduler_instance
-from typing import List, Dict
+from . import forecast, journal, models, output_store, schemas, scheduler_instance, stats
+from .log_writer import log_writer
+from typing import Any, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta, timezone
 from util import logger_util
+from util.config_util import config
 from apscheduler.jobstores.base import JobLookupError
 
 logger = logger_util.get_logger(__name__)
 
+# Upper bound on IDs per IN (...) clause, well below SQLite's bound parameter limit.
+BULK_CHUNK_SIZE = 500
+
 class JobDefinitionCRUD(CRUDBase[models.JobDefinition, schemas.JobConfig, schemas.JobConfig]):
-    def create_from_config(self, db: Session, *, job_in: schemas.JobConfig) -> models.JobDefinition:
+    def config_to_values(self, job_in: schemas.JobConfig) -> Dict[str, Any]:
         """
-        Creates a JobDefinition in the database from a JobConfig Pydantic schema.
+        Maps a JobConfig Pydantic schema onto JobDefinition column values.
         """
         trigger_dict = job_in.trigger.dict()
         trigger_type = trigger_dict.pop('type')
-        
-        db_obj = self.model(
+        return dict(
             id=job_in.id,
+            job_type=job_in.job_type,
             func=job_in.func,
+            command=job_in.command.model_dump(exclude_none=True) if job_in.command else None,
             description=job_in.description,
             is_enabled=job_in.is_enabled,
             trigger_type=trigger_type,
@@ -34,8 +41,20 @@ class JobDefinitionCRUD(CRUDBase[models.JobDefinition, schemas.JobConfig, schema
             max_instances=job_in.max_instances,
             coalesce=job_in.coalesce,
             misfire_grace_time=job_in.misfire_grace_time,
+            executor=job_in.executor,
+            retry_policy=job_in.retry.model_dump() if job_in.retry else None,
+            timeout_seconds=job_in.timeout_seconds,
+            resources=job_in.resources,
+            priority=job_in.priority,
         )
+
+    def create_from_config(self, db: Session, *, job_in: schemas.JobConfig) -> models.JobDefinition:
+        """
+        Creates a JobDefinition in the database from a JobConfig Pydantic schema.
+        """
+        db_obj = self.model(**self.config_to_values(job_in))
         db.add(db_obj)
+        record_job_changes(db, [job_in.id], 'upsert')
         db.commit()
         db.refresh(db_obj)
         return db_obj
@@ -44,316 +63,473 @@ class JobDefinitionCRUD(CRUDBase[models.JobDefinition, schemas.JobConfig, schema
         """
         Updates a JobDefinition in the database from a JobConfig Pydantic schema.
         """
-        db_obj.func = job_in.func
-        db_obj.description = job_in.description
-        db_obj.is_enabled = job_in.is_enabled
-        
-        trigger_dict = job_in.trigger.dict()
-        db_obj.trigger_type = trigger_dict.pop('type')
-        db_obj.trigger_config = trigger_dict
-
-        db_obj.args = job_in.args
-        db_obj.kwargs = job_in.kwargs
-        db_obj.max_instances = job_in.max_instances
-        db_obj.coalesce = job_in.coalesce
-        db_obj.misfire_grace_time = job_in.misfire_grace_time
+        values = self.config_to_values(job_in)
+        values.pop('id')
+        for field, value in values.items():
+            setattr(db_obj, field, value)
         
         db.add(db_obj)
+        record_job_changes(db, [db_obj.id], 'upsert')
         db.commit()
         db.refresh(db_obj)
         return db_obj
 
-job_definition_service = JobDefinitionCRUD(models.JobDefinition)
+    def bulk_upsert_from_configs(self, db: Session, *, jobs_in: List[schemas.JobConfig]) -> Dict[str, str]:
+        """
+        Creates or updates many JobDefinitions in a single transaction using batched statements.
+        Returns 'created' or 'updated' per job ID.
+        """
+        rows = [self.config_to_values(job_in) for job_in in jobs_in]
+        existing_ids = set()
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk_ids = [row['id'] for row in rows[i:i + BULK_CHUNK_SIZE]]
+            existing_ids.update(job_id for (job_id,) in db.query(self.model.id).filter(self.model.id.in_(chunk_ids)))
+        to_insert = [row for row in rows if row['id'] not in existing_ids]
+        to_update = [row for row in rows if row['id'] in existing_ids]
+        try:
+            if to_insert:
+                db.execute(insert(self.model), to_insert)
+            if to_update:
+                # ORM bulk UPDATE by primary key: one executemany for all rows.
+                db.execute(update(self.model), to_update)
+            record_job_changes(db, [row['id'] for row in rows], 'upsert')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return {row['id']: 'updated' if row['id'] in existing_ids else 'created' for row in rows}
 
-def get_dashboard_summary(db: Session) -> schemas.DashboardSummary:
+    def remove(self, db: Session, *, id: str) -> Optional[models.JobDefinition]:
+        obj = db.query(self.model).get(id)
+        if obj:
+            db.delete(obj)
+            record_job_changes(db, [id], 'delete')
+            db.commit()
+        return obj
+
+def record_job_changes(db: Session, job_ids: List[str], operation: str) -> None:
     """
-    Retrieves a summary of job statuses for the dashboard.
+    Appends entries to the job definition change feed.
+    The caller commits them together with the definition change itself.
     """
-    total_jobs = len(scheduler_instance.scheduler.get_jobs())
-    running_jobs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'RUNNING').count()
-    successful_runs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'COMPLETED').count()
-    failed_runs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'FAILED').count()
-    return schemas.DashboardSummary(
-        total_jobs=total_jobs,
-        running_jobs=running_jobs,
-        successful_runs=successful_runs,
-        failed_runs=failed_runs
-    )
+    if job_ids:
+        db.execute(insert(models.JobDefinitionChange), [{'job_id': job_id, 'operation': operation} for job_id in job_ids])
 
-def get_timeline_data(db: Session) -> List[schemas.TimelineItem]:
-    """
-    Provides data for the job execution timeline, including scheduled and historical runs.
-    """
-    timeline_items: List[schemas.TimelineItem] = []
-    scheduled_jobs = scheduler_instance.scheduler.get_jobs()
-    for job in scheduled_jobs:
-        if job.next_run_time:
-            start_time_aware = job.next_run_time.replace(tzinfo=timezone.utc) if job.next_run_time.tzinfo is None else job.next_run_time
-            timeline_items.append(schemas.TimelineItem(
-                id=f"scheduled-{job.id}-{start_time_aware.isoformat()}",
-                content=f"{job.id} (Scheduled)", start=start_time_aware, status="scheduled", group=job.id
-            ))
-    recent_logs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.start_time >= datetime.now(timezone.utc) - timedelta(days=7)).order_by(models.ProcessExecutionLog.start_time.asc()).all()
-    for log in recent_logs:
-        item_status = log.status.lower()
-        start = log.start_time.replace(tzinfo=timezone.utc) if log.start_time.tzinfo is None else log.start_time
-        end = None
-        if log.end_time:
-            end = log.end_time.replace(tzinfo=timezone.utc) if log.end_time.tzinfo is None else log.end_time
-        elif item_status == 'running':
-            end = datetime.now(timezone.utc)
-        timeline_items.append(schemas.TimelineItem(
-            id=f"log-{log.id}", content=f"{log.job_id} ({item_status.capitalize()})",
-            start=start, end=end, status=item_status, group=log.job_id
-        ))
-    timeline_items.sort(key=lambda item: item.start)
-    return timeline_items
+job_definition_service = JobDefinitionCRUD(models.JobDefinition)
 
+def get_dashboard_summary(window_minutes: Optional[int] = None) -> schemas.DashboardSummary:
+    """
+    Retrieves a summary of job statuses for the dashboard from the materialized counters.
+    With window_minutes, run counts only include runs started within that window.
+    """
+    summary = scheduler_instance.dashboard_stats.summary(window_minutes=window_minutes)
+    return schemas.DashboardSummary(window_minutes=window_minutes, **summary)
 
-def get_execution_logs(db: Session, skip: int = 0, limit: int = 100) -> List[models.ProcessExecutionLog]:
+def reconcile_dashboard_stats() -> None:
     """
-    Retrieves a paginated list of job execution logs.
+    Recomputes the dashboard counters from the database. Queued log records are written
+    first so that runs already counted in memory are not lost by the reconciliation.
     """
-    return db.query(models.ProcessExecutionLog).order_by(models.ProcessExecutionLog.start_time.desc()).offset(skip).limit(limit).all()
+    log_writer.flush(timeout=30)
+    with database.SessionLocal() as db:
+        scheduler_instance.dashboard_stats.reconcile(db, scheduler_instance.job_index.job_ids())
+
+# Bucket widths the timeline may aggregate runs into, narrowest first.
+TIMELINE_RESOLUTIONS = (60, 300, 900, 1800, 3600, 3 * 3600, 6 * 3600, 12 * 3600, 86400, 7 * 86400)
+
+def _as_utc(moment: datetime) -> datetime:
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+def _naive_utc(moment: datetime) -> datetime:
+    return moment.astimezone(timezone.utc).replace(tzinfo=None) if moment.tzinfo is not None else moment
 
-def get_job_execution_history(db: Session, job_id: str) -> List[models.ProcessExecutionLog]:
+def _min_bucket_seconds(start: datetime, end: datetime) -> int:
+    """The narrowest bucket width that keeps every group under timeline_buckets_per_group buckets."""
+    return max(1, math.ceil((end - start).total_seconds() / config.timeline_buckets_per_group))
+
+def _timeline_resolution(db: Session, query, start: datetime, end: datetime, resolution: Optional[str]) -> Optional[int]:
     """
-    Retrieves the execution history for a specific job.
+    Picks the bucket width in seconds, or None to return individual runs. 'auto' and 'runs'
+    return runs when the window holds at most timeline_max_items of them; otherwise 'auto' and
+    'runs' pick the narrowest of TIMELINE_RESOLUTIONS that keeps every group under
+    timeline_buckets_per_group buckets. Explicit widths are widened to that bound as well.
     """
-    return db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.job_id == job_id).order_by(models.ProcessExecutionLog.start_time.desc()).all()
+    if resolution not in (None, 'auto', 'runs'):
+        seconds = int(resolution)
+        if seconds <= 0:
+            raise ValueError("resolution must be 'auto', 'runs' or a positive number of seconds")
+        return max(seconds, _min_bucket_seconds(start, end))
+    if query.order_by(None).limit(config.timeline_max_items + 1).count() <= config.timeline_max_items:
+        return None
+    span = (end - start).total_seconds()
+    for seconds in TIMELINE_RESOLUTIONS:
+        if span / seconds <= config.timeline_buckets_per_group:
+            return seconds
+    return TIMELINE_RESOLUTIONS[-1]
+
+# Changed rows are re-read with this overlap, for rows stamped by other processes, whose
+# uncommitted batches the cursor cannot see, and their clocks. Items are upserted, so repeats
+# are harmless.
+TIMELINE_DELTA_OVERLAP = timedelta(seconds=5)
+
+def _timeline_window(start: Optional[datetime], end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    now = datetime.now(timezone.utc)
+    start = _naive_utc(start) if start else _naive_utc(now - timedelta(days=1))
+    end = _naive_utc(end) if end else _naive_utc(now + timedelta(days=3))
+    if end <= start:
+        raise ValueError("end must be after start")
+    return start, end
+
+def _timeline_filters(start: datetime, end: datetime, groups: Optional[List[str]]) -> List[Any]:
+    log = models.ProcessExecutionLog
+    filters = [log.start_time >= start, log.start_time < end]
+    if groups:
+        filters.append(log.job_id.in_(groups))
+    return filters
+
+def _timeline_run_items(db: Session, filters: List[Any]) -> Tuple[List[schemas.TimelineItem], bool]:
+    log = models.ProcessExecutionLog
+    now = datetime.now(timezone.utc)
+    rows = (
+        db.query(log.id, log.job_id, log.status, log.start_time, log.end_time)
+        .filter(*filters).order_by(log.start_time.asc())
+        .limit(config.timeline_max_items + 1).all()
+    )
+    items = []
+    for row in rows[:config.timeline_max_items]:
+        item_status = row.status.lower()
+        end_time = _as_utc(row.end_time) if row.end_time else None
+        if end_time is None and item_status == 'running':
+            end_time = now
+        items.append(schemas.TimelineItem(
+            id=f"log-{row.id}", content=f"{row.job_id} ({item_status.capitalize()})",
+            start=_as_utc(row.start_time), end=end_time, status=item_status, group=row.job_id,
+        ))
+    return items, len(rows) > config.timeline_max_items
+
+def _timeline_bucket_items(db: Session, filters: List[Any], resolution_seconds: int, keys=None) -> List[schemas.TimelineItem]:
+    """Aggregates runs per (job, bucket); with keys, only those (job_id, bucket) pairs are returned."""
+    log = models.ProcessExecutionLog
+    bucket = stats.time_bucket(db.get_bind().dialect.name, log.start_time, resolution_seconds).label('bucket')
+    rows = (
+        db.query(
+            log.job_id, bucket, func.count(log.id).label('runs'),
+            func.sum(case((log.status.in_(models.FAILURE_STATUSES), 1), else_=0)).label('failed'),
+            func.sum(case((log.status == 'RUNNING', 1), else_=0)).label('running'),
+        )
+        .filter(*filters).group_by(log.job_id, bucket).order_by(bucket).all()
+    )
+    items = []
+    for row in rows:
+        if keys is not None and (row.job_id, row.bucket) not in keys:
+            continue
+        bucket_start = _as_utc(stats.bucket_start(row.bucket))
+        item_status = 'failed' if row.failed else 'running' if row.running else 'completed'
+        items.append(schemas.TimelineItem(
+            id=f"bucket-{row.job_id}-{row.bucket}", content=f"{row.job_id} ({row.runs} runs)",
+            start=bucket_start, end=bucket_start + timedelta(seconds=resolution_seconds),
+            status=item_status, group=row.job_id, count=row.runs, failed_count=row.failed,
+        ))
+    return items
 
-def get_scheduled_jobs_info() -> List[schemas.JobInfo]:
+def _scheduled_item(job, start: datetime, end: datetime, groups: Optional[List[str]]) -> Optional[schemas.TimelineItem]:
+    """The job's next run as a timeline item with a stable ID, or None if it is not in the window."""
+    if job is None or not job.next_run_time or (groups and job.id not in groups):
+        return None
+    next_run = _as_utc(job.next_run_time)
+    if not _as_utc(start) <= next_run < _as_utc(end):
+        return None
+    return schemas.TimelineItem(
+        id=f"scheduled-{job.id}", content=f"{job.id} (Scheduled)", start=next_run, status="scheduled", group=job.id
+    )
+
+def encode_timeline_cursor(epoch: str, seq: int, as_of: datetime) -> str:
     """
-    Retrieves a list of currently scheduled jobs with formatted trigger information.
+    Encodes the journal position and database time a timeline response reflects.
     """
-    jobs = scheduler_instance.scheduler.get_jobs()
-    job_infos = []
-    for job in jobs:
-        try:
-            trigger_dict = {"type": "unknown"}
-            trigger_class_name = job.trigger.__class__.__name__.lower()
-            if "cron" in trigger_class_name:
-                trigger_dict["type"] = "cron"
-                for field in job.trigger.fields:
-                    trigger_dict[field.name] = str(field)
-            elif "interval" in trigger_class_name:
-                trigger_dict["type"] = "interval"
-                td = job.trigger.interval
-                trigger_dict['weeks'] = td.days // 7
-                trigger_dict['days'] = td.days % 7
-                trigger_dict['hours'] = td.seconds // 3600
-                trigger_dict['minutes'] = (td.seconds // 60) % 60
-                trigger_dict['seconds'] = td.seconds % 60
-            func_repr = job.func
-            if not isinstance(func_repr, str):
-                func_repr = f"{job.func.__module__}:{job.func.__name__}"
-            job_info = schemas.JobInfo(
-                id=job.id, func=func_repr, trigger=trigger_dict, args=list(job.args),
-                kwargs=job.kwargs, max_instances=job.max_instances, coalesce=job.coalesce,
-                misfire_grace_time=job.misfire_grace_time, next_run_time=job.next_run_time
-            )
-            job_infos.append(job_info)
-        except Exception as e:
-            logger.error(f"Error processing job '{job.id}' for API response: {e}", exc_info=True)
-    return job_infos
+    raw = f"{epoch}|{seq}|{as_of.isoformat()}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
 
-def delete_bulk_jobs(db: Session, job_ids: List[str]) -> int:
+def decode_timeline_cursor(cursor: str) -> Tuple[str, int, datetime]:
     """
-    Deletes a list of job definitions from the database.
-    Returns the number of jobs successfully deleted.
+    Decodes a cursor produced by encode_timeline_cursor. Raises ValueError if it is malformed.
     """
-    deleted_count = 0
-    for job_id in job_ids:
-        if job_definition_service.remove(db, id=job_id):
-            deleted_count += 1
-    return deleted_count
+    try:
+        epoch, seq, as_of = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 2)
+        return epoch, int(seq), datetime.fromisoformat(as_of)
+    except (UnicodeError, binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
-def pause_bulk_scheduled_jobs(job_ids: List[str]) -> Dict[str, list]:
+def _current_timeline_cursor() -> str:
+    # Taken before reading, so that changes made while the response is built are sent again.
+    # Runs are stamped before their batch commits, so as_of stops short of uncommitted stamps.
+    job_journal = scheduler_instance.job_journal
+    return encode_timeline_cursor(job_journal.epoch, job_journal.seq, log_writer.committed_as_of())
+
+def get_timeline_data(
+    db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    groups: Optional[List[str]] = None, resolution: Optional[str] = None,
+) -> schemas.TimelineData:
     """
-    Pauses a list of scheduled jobs.
-    Returns a dictionary with lists of successfully paused and failed job IDs.
+    Provides the job execution timeline for [start, end): scheduled runs plus historical runs,
+    optionally limited to the given job IDs (groups). Wide windows are collapsed server-side into
+    per-job buckets with run and failure counts, so the response stays bounded however many runs
+    the window holds. Only the columns needed for drawing are selected.
+    The returned cursor can be passed to get_timeline_delta to fetch later changes.
     """
-    paused_ids = []
-    failed_ids = {}
-    for job_id in job_ids:
-        try:
-            scheduler_instance.scheduler.pause_job(job_id)
-            paused_ids.append(job_id)
-        except JobLookupError:
-            failed_ids[job_id] = "Not Found"
-    return {"paused": paused_ids, "failed": failed_ids}
+    start, end = _timeline_window(start, end)
+    cursor = _current_timeline_cursor()
+    filters = _timeline_filters(start, end, groups)
+    log = models.ProcessExecutionLog
+    resolution_seconds = _timeline_resolution(db, db.query(log.id).filter(*filters), start, end, resolution)
 
-def resume_bulk_scheduled_jobs(job_ids: List[str]) -> Dict[str, list]:
+    truncated = False
+    if resolution_seconds is None:
+        timeline_items, truncated = _timeline_run_items(db, filters)
+    else:
+        timeline_items = _timeline_bucket_items(db, filters, resolution_seconds)
+
+    for job in scheduler_instance.job_index.scheduled_between(_as_utc(start), _as_utc(end)):
+        item = _scheduled_item(job, start, end, groups)
+        if item is not None:
+            timeline_items.append(item)
+    timeline_items.sort(key=lambda item: item.start)
+    return schemas.TimelineData(
+        start=_as_utc(start), end=_as_utc(end), resolution_seconds=resolution_seconds,
+        truncated=truncated, items=timeline_items, cursor=cursor,
+    )
+
+def get_timeline_delta(
+    db: Session, cursor: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+    groups: Optional[List[str]] = None, resolution_seconds: Optional[int] = None,
+) -> schemas.TimelineDelta:
     """
-    Resumes a list of scheduled jobs.
-    Returns a dictionary with lists of successfully resumed and failed job IDs.
+    Returns the timeline items of [start, end) added or changed since cursor, and the IDs of
+    scheduled items that left the window. resolution_seconds must be the one of the response the
+    client is patching (None for individual runs); changed buckets are re-aggregated in full.
+    Cost is proportional to the number of changes, not to the history in the window. When the
+    changes cannot be determined (the server restarted, the journal moved on, or too many runs
+    changed), reset is set and the client must reload with get_timeline_data.
     """
-    resumed_ids = []
-    failed_ids = {}
-    for job_id in job_ids:
-        try:
-            scheduler_instance.scheduler.resume_job(job_id)
-            resumed_ids.append(job_id)
-        except JobLookupError:
-            failed_ids[job_id] = "Not Found"
-    return {"resumed": resumed_ids, "failed": failed_ids}
+    start, end = _timeline_window(start, end)
+    epoch, seq, as_of = decode_timeline_cursor(cursor)
+    new_cursor = _current_timeline_cursor()
+    changed_jobs = scheduler_instance.job_journal.changes_since(epoch, seq)
+    if changed_jobs is None:
+        return schemas.TimelineDelta(cursor=new_cursor, reset=True)
+    if resolution_seconds is not None and resolution_seconds < _min_bucket_seconds(start, end):
+        # Narrower than get_timeline_data would ever return for this window.
+        return schemas.TimelineDelta(cursor=new_cursor, reset=True)
 
+    log = models.ProcessExecutionLog
+    filters = _timeline_filters(start, end, groups) + [log.updated_at >= as_of - TIMELINE_DELTA_OVERLAP]
+    upserts: List[schemas.TimelineItem] = []
+    if resolution_seconds is None:
+        upserts, truncated = _timeline_run_items(db, filters)
+        if truncated:
+            return schemas.TimelineDelta(cursor=new_cursor, reset=True)
+    else:
+        bucket = stats.time_bucket(db.get_bind().dialect.name, log.start_time, resolution_seconds)
+        keys = {(job_id, value) for job_id, value in db.query(log.job_id, bucket).filter(*filters).distinct()}
+        if keys:
+            bucket_filters = _timeline_filters(start, end, sorted({job_id for job_id, _ in keys}))
+            upserts = _timeline_bucket_items(db, bucket_filters, resolution_seconds, keys=keys)
 
-logger = logger_util.get_logger(__name__)
+    removed: List[str] = []
+    if journal.ALL_JOBS in changed_jobs:
+        changed_jobs = (changed_jobs - {journal.ALL_JOBS}) | set(scheduler_instance.job_index.job_ids())
+    jobs_by_id = {job_id: scheduler_instance.job_index.get(job_id) for job_id in changed_jobs}
+    for job_id in sorted(changed_jobs):
+        item = _scheduled_item(jobs_by_id.get(job_id), start, end, groups)
+        if item is None:
+            removed.append(f"scheduled-{job_id}")
+        else:
+            upserts.append(item)
+    return schemas.TimelineDelta(cursor=new_cursor, upserts=upserts, removed=removed)
 
-class JobDefinitionCRUD(CRUDBase[models.JobDefinition, schemas.JobConfig, schemas.JobConfig]):
-    def create_from_config(self, db: Session, *, job_in: schemas.JobConfig) -> models.JobDefinition:
-        """
-        Creates a JobDefinition in the database from a JobConfig Pydantic schema.
-        """
-        trigger_dict = job_in.trigger.dict()
-        trigger_type = trigger_dict.pop('type')
-        
-        db_obj = self.model(
-            id=job_in.id,
-            func=job_in.func,
-            description=job_in.description,
-            is_enabled=job_in.is_enabled,
-            trigger_type=trigger_type,
-            trigger_config=trigger_dict,
-            args=job_in.args,
-            kwargs=job_in.kwargs,
-            max_instances=job_in.max_instances,
-            coalesce=job_in.coalesce,
-            misfire_grace_time=job_in.misfire_grace_time,
-        )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+def get_forecast(
+    start: Optional[datetime] = None, hours: float = 24, job_ids: Optional[List[str]] = None,
+    include_fire_times: bool = True, max_fire_times: int = 500,
+) -> schemas.Forecast:
+    """
+    Forecasts the fire times of the scheduled jobs over the next ``hours`` from start (now by
+    default), with a per-minute histogram of fires across the selected jobs.
+    """
+    if hours > config.forecast_max_hours:
+        raise ValueError(f"hours must not exceed {config.forecast_max_hours}")
+    start = start or datetime.now(timezone.utc)
+    return scheduler_instance.forecast_engine.forecast(
+        start, start + timedelta(hours=hours), job_ids=job_ids,
+        include_fire_times=include_fire_times, max_fire_times=max_fire_times,
+    )
 
-    def update_from_config(self, db: Session, *, db_obj: models.JobDefinition, job_in: schemas.JobConfig) -> models.JobDefinition:
-        """
-        Updates a JobDefinition in the database from a JobConfig Pydantic schema.
-        """
-        db_obj.func = job_in.func
-        db_obj.description = job_in.description
-        db_obj.is_enabled = job_in.is_enabled
-        
-        trigger_dict = job_in.trigger.dict()
-        db_obj.trigger_type = trigger_dict.pop('type')
-        db_obj.trigger_config = trigger_dict
-
-        db_obj.args = job_in.args
-        db_obj.kwargs = job_in.kwargs
-        db_obj.max_instances = job_in.max_instances
-        db_obj.coalesce = job_in.coalesce
-        db_obj.misfire_grace_time = job_in.misfire_grace_time
-        
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+def get_spread_analysis(
+    db: Session, start: Optional[datetime] = None, hours: float = 24, job_ids: Optional[List[str]] = None,
+) -> schemas.SpreadAnalysis:
+    """
+    Compares the per-minute fire times of the enabled job definitions (or of job_ids) over the
+    next ``hours`` from start, without and with the spreading of their triggers.
+    """
+    if hours > config.forecast_max_hours:
+        raise ValueError(f"hours must not exceed {config.forecast_max_hours}")
+    start = start or datetime.now(timezone.utc)
+    query = db.query(models.JobDefinition).filter(models.JobDefinition.is_enabled.is_(True))
+    if job_ids:
+        query = query.filter(models.JobDefinition.id.in_(job_ids))
+    configs = [schemas.JobConfig.model_validate(job) for job in query.all()]
+    return forecast.analyze_spreading(configs, start, start + timedelta(hours=hours))
 
-job_definition_service = JobDefinitionCRUD(models.JobDefinition)
+def encode_log_cursor(log) -> str:
+    """
+    Encodes the (start_time, id) position of a log row as an opaque page cursor.
+    """
+    raw = f"{log.start_time.isoformat()}|{log.id}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
 
-def get_dashboard_summary(db: Session) -> schemas.DashboardSummary:
+def decode_log_cursor(cursor: str) -> Tuple[datetime, str]:
     """
-    Retrieves a summary of job statuses for the dashboard.
+    Decodes a cursor produced by encode_log_cursor. Raises ValueError if it is malformed.
     """
-    total_jobs = len(scheduler_instance.scheduler.get_jobs())
-    running_jobs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'RUNNING').count()
-    successful_runs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'COMPLETED').count()
-    failed_runs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.status == 'FAILED').count()
-    return schemas.DashboardSummary(
-        total_jobs=total_jobs,
-        running_jobs=running_jobs,
-        successful_runs=successful_runs,
-        failed_runs=failed_runs
+    try:
+        start_time, log_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|', 1)
+        return datetime.fromisoformat(start_time), log_id
+    except (UnicodeError, binascii.Error, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def get_execution_logs(
+    db: Session, limit: int = 100, cursor: Optional[str] = None, job_id: Optional[str] = None,
+    since: Optional[datetime] = None, until: Optional[datetime] = None, status: Optional[str] = None,
+) -> schemas.ProcessExecutionLogPage:
+    """
+    Retrieves a page of job execution log summaries, newest first, using keyset pagination on
+    (start_time, id) so that every page costs the same regardless of its depth.
+    Only metadata columns are selected; use get_execution_log for the output of a run.
+    since and until may be timezone-aware; naive values are taken as UTC, like start_time.
+    """
+    log = models.ProcessExecutionLog
+    query = db.query(
+        log.id, log.job_id, log.command, log.exit_code, log.scheduled_time, log.start_time, log.end_time, log.status,
+        log.attempt, log.retry_of, log.wait_seconds,
+        func.coalesce(log.stdout_size, func.length(log.stdout), 0).label('stdout_size'),
+        func.coalesce(log.stderr_size, func.length(log.stderr), 0).label('stderr_size'),
     )
+    if job_id is not None:
+        query = query.filter(log.job_id == job_id)
+    if since is not None:
+        query = query.filter(log.start_time >= _naive_utc(since))
+    if until is not None:
+        query = query.filter(log.start_time < _naive_utc(until))
+    if status:
+        query = query.filter(log.status == status.upper())
+    if cursor:
+        cursor_time, cursor_id = decode_log_cursor(cursor)
+        query = query.filter(or_(log.start_time < cursor_time, and_(log.start_time == cursor_time, log.id < cursor_id)))
 
-def get_timeline_data(db: Session) -> List[schemas.TimelineItem]:
-    """
-    Provides data for the job execution timeline, including scheduled and historical runs.
-    """
-    timeline_items: List[schemas.TimelineItem] = []
-    scheduled_jobs = scheduler_instance.scheduler.get_jobs()
-    for job in scheduled_jobs:
-        if job.next_run_time:
-            start_time_aware = job.next_run_time.replace(tzinfo=timezone.utc) if job.next_run_time.tzinfo is None else job.next_run_time
-            timeline_items.append(schemas.TimelineItem(
-                id=f"scheduled-{job.id}-{start_time_aware.isoformat()}",
-                content=f"{job.id} (Scheduled)", start=start_time_aware, status="scheduled", group=job.id
-            ))
-    recent_logs = db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.start_time >= datetime.now(timezone.utc) - timedelta(days=7)).order_by(models.ProcessExecutionLog.start_time.asc()).all()
-    for log in recent_logs:
-        item_status = log.status.lower()
-        start = log.start_time.replace(tzinfo=timezone.utc) if log.start_time.tzinfo is None else log.start_time
-        end = None
-        if log.end_time:
-            end = log.end_time.replace(tzinfo=timezone.utc) if log.end_time.tzinfo is None else log.end_time
-        elif item_status == 'running':
-            end = datetime.now(timezone.utc)
-        timeline_items.append(schemas.TimelineItem(
-            id=f"log-{log.id}", content=f"{log.job_id} ({item_status.capitalize()})",
-            start=start, end=end, status=item_status, group=log.job_id
-        ))
-    timeline_items.sort(key=lambda item: item.start)
-    return timeline_items
+    rows = query.order_by(log.start_time.desc(), log.id.desc()).limit(limit + 1).all()
+    next_cursor = encode_log_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return schemas.ProcessExecutionLogPage(items=rows[:limit], next_cursor=next_cursor)
 
+def get_execution_log(db: Session, log_id: str) -> Optional[models.ProcessExecutionLog]:
+    """
+    Retrieves a single execution log including its stdout/stderr previews.
+    """
+    return db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.id == log_id).first()
 
-def get_execution_logs(db: Session, skip: int = 0, limit: int = 100) -> List[models.ProcessExecutionLog]:
+def get_execution_output(db: Session, log_id: str, stream: str, offset: int = 0, length: int = 65536) -> Optional[schemas.ExecutionOutputRange]:
     """
-    Retrieves a paginated list of job execution logs.
+    Reads a byte range of a run's stdout or stderr from the output store.
     """
-    return db.query(models.ProcessExecutionLog).order_by(models.ProcessExecutionLog.start_time.desc()).offset(skip).limit(limit).all()
+    log = get_execution_log(db, log_id)
+    if log is None:
+        return None
+    data, total_size = output_store.read_output(db, log, stream, offset, length)
+    return schemas.ExecutionOutputRange(
+        log_id=log_id, stream=stream, offset=offset, length=len(data), total_size=total_size,
+        data=data.decode('utf-8', errors='replace'),
+    )
 
-def get_job_execution_history(db: Session, job_id: str) -> List[models.ProcessExecutionLog]:
+def get_job_execution_history(db: Session, job_id: str, limit: int = 50, cursor: Optional[str] = None, **filters) -> schemas.ProcessExecutionLogPage:
     """
-    Retrieves the execution history for a specific job.
+    Retrieves a page of the execution history for a specific job.
     """
-    return db.query(models.ProcessExecutionLog).filter(models.ProcessExecutionLog.job_id == job_id).order_by(models.ProcessExecutionLog.start_time.desc()).all()
+    return get_execution_logs(db, limit=limit, cursor=cursor, job_id=job_id, **filters)
 
-def get_scheduled_jobs_info() -> List[schemas.JobInfo]:
+def get_scheduled_jobs_info(
+    state: Optional[str] = None, trigger: Optional[str] = None, sort: str = 'id',
+    skip: int = 0, limit: Optional[int] = None,
+) -> Tuple[int, List[schemas.JobInfo]]:
     """
-    Retrieves a list of currently scheduled jobs with formatted trigger information.
+    Retrieves currently scheduled jobs with formatted trigger information from the job index,
+    filtered, sorted and paged, with the status of their latest run from the dashboard stats.
+    Returns the total number of matching jobs and the page.
     """
-    jobs = scheduler_instance.scheduler.get_jobs()
-    job_infos = []
-    for job in jobs:
-        try:
-            trigger_dict = {"type": "unknown"}
-            trigger_class_name = job.trigger.__class__.__name__.lower()
-            if "cron" in trigger_class_name:
-                trigger_dict["type"] = "cron"
-                for field in job.trigger.fields:
-                    trigger_dict[field.name] = str(field)
-            elif "interval" in trigger_class_name:
-                trigger_dict["type"] = "interval"
-                td = job.trigger.interval
-                trigger_dict['weeks'] = td.days // 7
-                trigger_dict['days'] = td.days % 7
-                trigger_dict['hours'] = td.seconds // 3600
-                trigger_dict['minutes'] = (td.seconds // 60) % 60
-                trigger_dict['seconds'] = td.seconds % 60
-            func_repr = job.func
-            if not isinstance(func_repr, str):
-                func_repr = f"{job.func.__module__}:{job.func.__name__}"
-            job_info = schemas.JobInfo(
-                id=job.id, func=func_repr, trigger=trigger_dict, args=list(job.args),
-                kwargs=job.kwargs, max_instances=job.max_instances, coalesce=job.coalesce,
-                misfire_grace_time=job.misfire_grace_time, next_run_time=job.next_run_time
-            )
-            job_infos.append(job_info)
-        except Exception as e:
-            logger.error(f"Error processing job '{job.id}' for API response: {e}", exc_info=True)
-    return job_infos
+    total, jobs = scheduler_instance.job_index.query(state=state, trigger=trigger, sort=sort, skip=skip, limit=limit)
+    stats = scheduler_instance.dashboard_stats
+    return total, [job.model_copy(update={'last_status': stats.last_status(job.id)}) for job in jobs]
 
 def delete_bulk_jobs(db: Session, job_ids: List[str]) -> int:
     """
-    Deletes a list of job definitions from the database.
+    Deletes a list of job definitions from the database in a single transaction.
     Returns the number of jobs successfully deleted.
     """
-    deleted_count = 0
-    for job_id in job_ids:
-        if job_definition_service.remove(db, id=job_id):
-            deleted_count += 1
-    return deleted_count
+    job_ids = list(dict.fromkeys(job_ids))
+    existing_ids = []
+    for i in range(0, len(job_ids), BULK_CHUNK_SIZE):
+        chunk = job_ids[i:i + BULK_CHUNK_SIZE]
+        existing_ids.extend(job_id for (job_id,) in db.query(models.JobDefinition.id).filter(models.JobDefinition.id.in_(chunk)))
+    if not existing_ids:
+        return 0
+    try:
+        for i in range(0, len(existing_ids), BULK_CHUNK_SIZE):
+            chunk = existing_ids[i:i + BULK_CHUNK_SIZE]
+            db.query(models.JobDefinition).filter(models.JobDefinition.id.in_(chunk)).delete(synchronize_session=False)
+        record_job_changes(db, existing_ids, 'delete')
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return len(existing_ids)
+
+def upsert_bulk_jobs(db: Session, raw_jobs: List[Dict[str, Any]]) -> schemas.BulkJobUpsertResult:
+    """
+    Validates each raw job definition and writes all valid ones in one transaction.
+    Returns a per-item result in the order of the request.
+    """
+    results: List[schemas.BulkJobUpsertItemResult] = []
+    valid: Dict[str, schemas.JobConfig] = {}
+    for index, raw in enumerate(raw_jobs):
+        job_id = raw.get('id') if isinstance(raw, dict) else None
+        try:
+            job_in = schemas.JobConfig.model_validate(raw)
+            scheduler_instance.check_job_executor(job_in.executor, job_in.job_type)
+            scheduler_instance.check_job_resources(job_in.resources)
+        except (ValidationError, ValueError) as e:
+            results.append(schemas.BulkJobUpsertItemResult(index=index, id=job_id, status='failed', detail=str(e)))
+            continue
+        if job_in.id in valid:
+            results.append(schemas.BulkJobUpsertItemResult(index=index, id=job_in.id, status='failed', detail="Duplicate job ID in request"))
+            continue
+        valid[job_in.id] = job_in
+        results.append(schemas.BulkJobUpsertItemResult(index=index, id=job_in.id, status='pending'))
+
+    outcome: Dict[str, str] = {}
+    error = None
+    if valid:
+        try:
+            outcome = job_definition_service.bulk_upsert_from_configs(db, jobs_in=list(valid.values()))
+        except SQLAlchemyError as e:
+            logger.error(f"Bulk upsert of {len(valid)} jobs failed: {e}", exc_info=True)
+            error = "Database write failed; no jobs in this request were saved"
+    for item in results:
+        if item.status == 'pending':
+            item.status = outcome.get(item.id, 'failed')
+            item.detail = error if item.status == 'failed' else None
+    return schemas.BulkJobUpsertResult(
+        created=sum(1 for item in results if item.status == 'created'),
+        updated=sum(1 for item in results if item.status == 'updated'),
+        failed=sum(1 for item in results if item.status == 'failed'),
+        results=results,
+    )
 
 def pause_bulk_scheduled_jobs(job_ids: List[str]) -> Dict[str, list]:
     """
@@ -369,3 +545,18 @@ def pause_bulk_scheduled_jobs(job_ids: List[str]) -> Dict[str, list]:
         except JobLookupError:
             failed_ids[job_id] = "Not Found"
     return {"paused": paused_ids, "failed": failed_ids}
+
+def resume_bulk_scheduled_jobs(job_ids: List[str]) -> Dict[str, list]:
+    """
+    Resumes a list of scheduled jobs.
+    Returns a dictionary with lists of successfully resumed and failed job IDs.
+    """
+    resumed_ids = []
+    failed_ids = {}
+    for job_id in job_ids:
+        try:
+            scheduler_instance.scheduler.resume_job(job_id)
+            resumed_ids.append(job_id)
+        except JobLookupError:
+            failed_ids[job_id] = "Not Found"
+    return {"resumed": resumed_ids, "failed": failed_ids}
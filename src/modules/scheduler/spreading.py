@@ -0,0 +1,117 @@
+"""
+Spreading of fire times, so that jobs written for the same moment do not all fire at once.
+
+Jobs opt in per trigger:
+
+* ``H`` in cron fields (as in Jenkins) stands for a value derived from a hash of the job ID:
+  ``minute: 'H'`` fires at a fixed minute between 0 and 59, ``H(0-14)`` within 0-14, ``H/15``
+  every 15 minutes starting at a hashed minute below 15, and ``H(0-29)/10`` combines both. Parts
+  of a comma-separated list are resolved independently. The day field hashes within 1-28, so
+  the result exists in every month. A job keeps its slot across restarts and processes.
+* ``spread_seconds`` on interval triggers places the job's phase at a hashed offset within the
+  first spread_seconds of the interval, counted from midnight of 2000-01-01 in the trigger's
+  timezone; without it an interval job starts counting when it is added, so jobs loaded
+  together fire together.
+* ``jitter`` (both trigger types) is APScheduler's bounded random delay of up to that many
+  seconds, drawn anew for every fire.
+
+forecast.analyze_spreading compares the fire times of job definitions with and without it.
+"""
+import hashlib
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, Tuple
+
+# Values H may take per cron field.
+HASH_RANGES = {
+    'month': (1, 12), 'week': (1, 52), 'day': (1, 28), 'day_of_week': (0, 6),
+    'hour': (0, 23), 'minute': (0, 59), 'second': (0, 59),
+}
+_HASH_PATTERN = re.compile(r'^H(?:\((\d+)-(\d+)\))?(?:/(\d+))?$')
+
+# Origin of spread interval phases; naive, so APScheduler places it in the trigger's timezone.
+INTERVAL_ANCHOR = datetime(2000, 1, 1)
+
+def job_hash(job_id: str, salt: str) -> int:
+    """A stable hash of a job ID; unlike hash(), equal in every process."""
+    return int.from_bytes(hashlib.sha256(f"{job_id}:{salt}".encode('utf-8')).digest()[:8], 'big')
+
+def _parse_hash(field: str, part: str) -> Tuple[int, int, int]:
+    """(low, high, step) of one H part of a cron field; step is 0 without /n."""
+    if field not in HASH_RANGES:
+        raise ValueError(f"H is not supported in the {field} field")
+    match = _HASH_PATTERN.match(part)
+    if match is None:
+        raise ValueError(f"Invalid H expression '{part}' in the {field} field; expected H, H(a-b), H/n or H(a-b)/n")
+    low, high = HASH_RANGES[field]
+    if match.group(1) is not None:
+        low, high = int(match.group(1)), int(match.group(2))
+        if not HASH_RANGES[field][0] <= low <= high <= HASH_RANGES[field][1]:
+            raise ValueError(f"H range {low}-{high} of the {field} field must lie within {HASH_RANGES[field][0]}-{HASH_RANGES[field][1]}")
+    step = int(match.group(3) or 0)
+    if match.group(3) is not None and not 1 <= step <= high - low + 1:
+        raise ValueError(f"H step {step} of the {field} field must be between 1 and {high - low + 1}")
+    return low, high, step
+
+def _is_hash(part: str) -> bool:
+    # A leading H, not any H: day_of_week may be written THU.
+    return part.startswith('H')
+
+def has_hash(expression: Any) -> bool:
+    return isinstance(expression, str) and any(_is_hash(part.strip()) for part in expression.split(','))
+
+def check_cron_fields(fields: Dict[str, Any]) -> None:
+    """Raises ValueError for malformed H expressions in the fields of a cron trigger."""
+    for field, expression in fields.items():
+        if has_hash(expression):
+            for part in expression.split(','):
+                if _is_hash(part.strip()):
+                    _parse_hash(field, part.strip())
+
+def resolve_cron_field(job_id: str, field: str, expression: str, spread: bool = True) -> str:
+    """Replaces the H parts of a cron field by the job's values; without spread, by the lowest ones."""
+    parts = []
+    for part in expression.split(','):
+        part = part.strip()
+        if not _is_hash(part):
+            parts.append(part)
+            continue
+        low, high, step = _parse_hash(field, part)
+        size = step or high - low + 1
+        value = low + (job_hash(job_id, field) % size if spread else 0)
+        parts.append(f"{value}-{high}/{step}" if step else str(value))
+    return ','.join(parts)
+
+def interval_offset(job_id: str, trigger) -> int:
+    """Seconds after the anchor at which a spread interval job's phase starts."""
+    interval = int(timedelta(
+        weeks=trigger.weeks, days=trigger.days, hours=trigger.hours, minutes=trigger.minutes, seconds=trigger.seconds,
+    ).total_seconds())
+    window = max(1, min(trigger.spread_seconds, interval))
+    return job_hash(job_id, 'interval') % window
+
+def trigger_arguments(job_id: str, trigger, spread: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    The APScheduler trigger type and arguments of a job's trigger schema, with its spreading
+    applied. Without spread, H takes the lowest value of its range and spread_seconds and jitter
+    are left out.
+    """
+    arguments = trigger.model_dump()
+    trigger_type = arguments.pop('type')
+    if trigger_type == 'cron':
+        for field, expression in arguments.items():
+            if field in HASH_RANGES and has_hash(expression):
+                arguments[field] = resolve_cron_field(job_id, field, expression, spread)
+    elif trigger_type == 'interval':
+        arguments.pop('spread_seconds', None)
+        if spread and trigger.spread_seconds:
+            arguments['start_date'] = INTERVAL_ANCHOR + timedelta(seconds=interval_offset(job_id, trigger))
+    if not spread:
+        arguments.pop('jitter', None)
+    return trigger_type, arguments
+
+def is_spread(trigger) -> bool:
+    """Whether a trigger schema uses any kind of spreading."""
+    if getattr(trigger, 'jitter', None) or getattr(trigger, 'spread_seconds', None):
+        return True
+    return any(has_hash(value) for field, value in trigger.model_dump().items() if field in HASH_RANGES)
@@ -0,0 +1,153 @@
+"""
+Materialized dashboard statistics.
+
+Counters are maintained incrementally from run transitions (reported by the execution
+recorder) and job add/remove events, so the dashboard summary never scans the log table or
+loads jobs from the jobstore. Finished runs are also counted in per-minute buckets (keyed by
+the run's start minute) covering ``window_hours``, which back the time-windowed summaries.
+``reconcile`` periodically replaces everything with values recomputed from the database to
+correct drift from lost events, other processes or retention purges.
+"""
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Optional, Set
+
+from apscheduler.events import EVENT_ALL_JOBS_REMOVED, EVENT_JOB_ADDED, EVENT_JOB_REMOVED
+from sqlalchemy import and_, cast, func, Integer
+from sqlalchemy.orm import Session
+
+from modules.scheduler import models
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+JOB_EVENTS = EVENT_JOB_ADDED | EVENT_JOB_REMOVED | EVENT_ALL_JOBS_REMOVED
+
+_EPOCH = datetime(1970, 1, 1)
+
+def time_bucket(dialect_name: str, column, seconds: int):
+    """
+    SQL expression for the start of the ``seconds``-wide bucket containing column, as seconds
+    since the epoch of the stored wall-clock time.
+    """
+    if dialect_name == 'sqlite':
+        epoch = cast(func.strftime('%s', column), Integer)
+    else:
+        epoch = cast(func.floor(func.extract('epoch', column)), Integer)
+    return (epoch // seconds) * seconds
+
+def bucket_start(epoch_seconds: int) -> datetime:
+    """Converts a time_bucket value back to a naive datetime."""
+    return _EPOCH + timedelta(seconds=int(epoch_seconds))
+
+def _minute(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0, tzinfo=None)
+
+class DashboardStats:
+    def __init__(self, window_hours: float = 24, ignored_jobstores: Iterable[str] = ()):
+        self.window = timedelta(hours=window_hours)
+        self.ignored_jobstores = set(ignored_jobstores)
+        self._lock = threading.Lock()
+        self._totals: Counter = Counter()
+        self._running = 0
+        self._last_status: Dict[str, str] = {}
+        self._job_ids: Set[str] = set()
+        self._buckets: Dict[datetime, Counter] = {}
+
+    def __call__(self, event) -> None:
+        """Scheduler listener keeping the set of scheduled jobs current."""
+        with self._lock:
+            if event.code == EVENT_ALL_JOBS_REMOVED:
+                if event.alias is None or event.alias not in self.ignored_jobstores:
+                    self._job_ids.clear()
+            elif event.jobstore in self.ignored_jobstores:
+                return
+            elif event.code == EVENT_JOB_ADDED:
+                self._job_ids.add(event.job_id)
+            else:
+                self._job_ids.discard(event.job_id)
+                self._last_status.pop(event.job_id, None)
+
+    def run_started(self, job_id: str) -> None:
+        with self._lock:
+            self._running += 1
+            self._last_status[job_id] = 'RUNNING'
+
+    def run_finished(self, job_id: str, status: str, start_time: datetime, was_running: bool = True) -> None:
+        with self._lock:
+            if was_running:
+                self._running = max(self._running - 1, 0)
+            self._totals[status] += 1
+            self._last_status[job_id] = status
+            self._buckets.setdefault(_minute(start_time), Counter())[status] += 1
+
+    def summary(self, window_minutes: Optional[int] = None, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Returns total_jobs, running_jobs and per-status run counts. Run counts are all-time,
+        or limited to runs started within the last window_minutes (at most window_hours).
+        """
+        with self._lock:
+            if window_minutes is None:
+                counts = Counter(self._totals)
+            else:
+                since = _minute(now or datetime.now(timezone.utc)) - timedelta(minutes=window_minutes - 1)
+                self._prune(now)
+                counts = Counter()
+                for minute, bucket in self._buckets.items():
+                    if minute >= since:
+                        counts.update(bucket)
+            return {
+                'total_jobs': len(self._job_ids),
+                'running_jobs': self._running,
+                'successful_runs': counts['COMPLETED'],
+                'failed_runs': counts['FAILED'],
+                'timed_out_runs': counts['TIMEOUT'],
+                'missed_runs': counts['MISSED'],
+            }
+
+    def last_status(self, job_id: str) -> Optional[str]:
+        return self._last_status.get(job_id)
+
+    def _prune(self, now: Optional[datetime] = None) -> None:
+        cutoff = _minute(now or datetime.now(timezone.utc)) - self.window
+        for minute in [minute for minute in self._buckets if minute < cutoff]:
+            del self._buckets[minute]
+
+    def reconcile(self, db: Session, job_ids: Iterable[str], now: Optional[datetime] = None) -> None:
+        """
+        Recomputes all counters from the execution log table and the given scheduled job IDs:
+        one GROUP BY for the totals, one for the last status of every job and one for the
+        per-minute buckets of the window.
+        """
+        log = models.ProcessExecutionLog
+        by_status = dict(db.query(log.status, func.count(log.id)).group_by(log.status).all())
+
+        latest = (
+            db.query(log.job_id, func.max(log.start_time).label('start_time'))
+            .group_by(log.job_id).subquery()
+        )
+        last_status = dict(
+            db.query(log.job_id, log.status)
+            .join(latest, and_(log.job_id == latest.c.job_id, log.start_time == latest.c.start_time))
+            .all()
+        )
+
+        since = _minute(now or datetime.now(timezone.utc)) - self.window
+        minute = time_bucket(db.get_bind().dialect.name, log.start_time, 60).label('minute')
+        buckets: Dict[datetime, Counter] = {}
+        rows = (
+            db.query(minute, log.status, func.count(log.id))
+            .filter(log.start_time >= since, log.status != 'RUNNING')
+            .group_by(minute, log.status).all()
+        )
+        for epoch, status, count in rows:
+            buckets.setdefault(bucket_start(epoch), Counter())[status] = count
+
+        with self._lock:
+            self._running = by_status.pop('RUNNING', 0)
+            self._totals = Counter(by_status)
+            self._last_status = last_status
+            self._job_ids = set(job_ids)
+            self._buckets = buckets
+        logger.debug(f"Dashboard stats reconciled: {len(self._job_ids)} jobs, {sum(self._totals.values())} finished runs.")
@@ -0,0 +1,367 @@
+"""
+Execution timeouts and the executors that enforce them.
+
+A job with ``timeout_seconds`` in its definition gets that long per run, counted from the moment
+the run gets a worker slot. What happens at the deadline depends on where the run executes:
+
+* command jobs: run_command kills the command's whole process group (see command_runner);
+* process pool jobs: the run's worker process is killed;
+* thread pool jobs: threads cannot be killed, so the run's cancel token is set. Job functions
+  that may run long should poll ``current_cancel_token()`` (or wait on it instead of sleeping)
+  and return early once it is cancelled.
+
+In every case the run is reported at the deadline as a job error carrying a JobTimeoutError,
+which the recorder logs as TIMEOUT, and its slot and max_instances count are given back right
+away, as are the concurrency group units it held. A thread that ignores its token keeps
+running in the background, outside the pool's capacity; its eventual result is discarded.
+Deadlines of all executors are served by one watchdog thread.
+
+Runs waiting for a slot are started by priority (see dispatch).
+"""
+import heapq
+import itertools
+import multiprocessing
+import pickle
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from apscheduler.events import EVENT_JOB_ERROR, JobExecutionEvent
+from apscheduler.executors.base import BaseExecutor, run_job
+
+from core import database
+from modules.scheduler.dispatch import DispatchQueue, job_priority
+from modules.scheduler.events import dispatch_started, missed_events
+from modules.scheduler.resources import Lease, ResourceManager
+from util import logger_util
+
+logger = logger_util.get_logger(__name__)
+
+class JobTimeoutError(TimeoutError):
+    """A run exceeded its job's timeout_seconds."""
+    def __init__(self, job_id: str, timeout_seconds: float):
+        super().__init__(f"Job {job_id} timed out after {timeout_seconds:g} seconds")
+        self.job_id = job_id
+        self.timeout_seconds = timeout_seconds
+
+class JobCancelledError(Exception):
+    """Raised by CancelToken.raise_if_cancelled once the run has been cancelled."""
+
+class CancelToken:
+    """Cooperative cancellation flag of one run."""
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, seconds: Optional[float] = None) -> bool:
+        """Sleeps up to seconds, waking early on cancellation. Returns whether the run was cancelled."""
+        return self._event.wait(seconds)
+
+    def raise_if_cancelled(self) -> None:
+        if self._event.is_set():
+            raise JobCancelledError("The run was cancelled")
+
+_local = threading.local()
+# Handed out outside of timed runs; never cancelled.
+_NEVER_CANCELLED = CancelToken()
+
+def current_cancel_token() -> CancelToken:
+    """The cancel token of the run executing in this thread."""
+    return getattr(_local, 'token', None) or _NEVER_CANCELLED
+
+# timeout_seconds of every job that has one, by job ID; maintained by the loader.
+_job_timeouts: Dict[str, float] = {}
+
+def set_job_timeout(job_id: str, timeout_seconds: Optional[float]) -> None:
+    if timeout_seconds is None:
+        _job_timeouts.pop(job_id, None)
+    else:
+        _job_timeouts[job_id] = timeout_seconds
+
+def job_timeout(job_id: str) -> Optional[float]:
+    return _job_timeouts.get(job_id)
+
+class _Watchdog:
+    """Calls callbacks at their deadlines from a single daemon thread."""
+    def __init__(self):
+        self._condition = threading.Condition()
+        # (deadline, sequence); callbacks of cancelled entries are removed from _callbacks.
+        self._heap: List[Tuple[float, int]] = []
+        self._callbacks: Dict[int, Callable[[], None]] = {}
+        self._sequence = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, seconds: float, callback: Callable[[], None]) -> int:
+        with self._condition:
+            handle = next(self._sequence)
+            self._callbacks[handle] = callback
+            heapq.heappush(self._heap, (time.monotonic() + seconds, handle))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="job-timeouts", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+            return handle
+
+    def cancel(self, handle: int) -> None:
+        with self._condition:
+            self._callbacks.pop(handle, None)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][1] not in self._callbacks:
+                        heapq.heappop(self._heap)
+                    now = time.monotonic()
+                    if self._heap and self._heap[0][0] <= now:
+                        callback = self._callbacks.pop(heapq.heappop(self._heap)[1])
+                        break
+                    self._condition.wait(self._heap[0][0] - now if self._heap else None)
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Timeout handler failed: {e}", exc_info=True)
+
+watchdog = _Watchdog()
+
+class _Run:
+    __slots__ = ('job', 'run_times', 'timeout', 'token', 'deadline', 'done', 'process', 'lease', 'submitted_at')
+
+    def __init__(self, job, run_times, timeout: Optional[float]):
+        self.job = job
+        self.run_times = run_times
+        self.timeout = timeout
+        self.submitted_at = time.monotonic()
+        self.lease: Optional[Lease] = None
+        self.token = CancelToken()
+        self.deadline: Optional[int] = None
+        # Set once the run's outcome has been reported, by whichever of completion and timeout comes first.
+        self.done = False
+        self.process = None
+
+class TimeoutThreadPoolExecutor(BaseExecutor):
+    """
+    Runs jobs in threads, at most max_workers at a time; further runs queue for a slot, ordered
+    by priority (see DispatchQueue for reserved_workers, reserved_priority and aging_seconds).
+    Runs that exceed their job's timeout are cancelled cooperatively and lose their slot.
+    Runs of jobs that claim concurrency groups first wait for them, without taking a slot.
+    """
+    def __init__(self, max_workers: int = 10, resources: Optional[ResourceManager] = None, reserved_workers: int = 0,
+                 reserved_priority: int = 0, aging_seconds: Optional[float] = None):
+        super().__init__()
+        if reserved_workers >= max_workers:
+            raise ValueError("reserved_workers must leave at least one worker for every priority")
+        self.max_workers = max_workers
+        self.resources = resources
+        self._queue = DispatchQueue(reserved_workers, reserved_priority, aging_seconds)
+        self._active = 0
+        self._shutdown = False
+        self._all_done = threading.Condition(threading.Lock())
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        self._shutdown = False
+
+    def shutdown(self, wait=True):
+        with self._all_done:
+            self._shutdown = True
+            queued = self._queue.clear()
+            if wait:
+                self._all_done.wait_for(lambda: self._active == 0)
+        if queued:
+            self._logger.warning(f"Shut down with {len(queued)} runs still queued for a worker; they are reported as missed")
+        for run in queued:
+            self._drop(run)
+
+    def queue_stats(self) -> List[Dict[str, Any]]:
+        """Runs waiting for a slot and their waits, per job priority."""
+        with self._all_done:
+            return self._queue.stats()
+
+    def _do_submit_job(self, job, run_times):
+        run = _Run(job, run_times, job_timeout(job.id))
+        with self._all_done:
+            if self._shutdown:
+                raise RuntimeError("Executor is shut down")
+        claims = self.resources.resources_for(job.id) if self.resources is not None else None
+        if claims:
+            self.resources.request(job.id, claims, lambda lease: self._admit(run, lease), lambda: self._drop(run))
+        else:
+            self._admit(run, None)
+
+    def _admit(self, run: _Run, lease: Optional[Lease]) -> None:
+        """Queues a run for a slot, once it holds the concurrency groups it claims."""
+        run.lease = lease
+        with self._all_done:
+            dropped = self._shutdown
+            if not dropped:
+                self._queue.push(run, job_priority(run.job.id), run.run_times[0])
+            ready = self._take_ready()
+        if dropped:
+            self._drop(run)
+        self._start(ready)
+
+    def _release(self, run: _Run) -> None:
+        if run.lease is not None:
+            lease, run.lease = run.lease, None
+            self.resources.release(lease)
+
+    def _drop(self, run: _Run) -> None:
+        """Reports a run that was shut down before it started as missed."""
+        self._release(run)
+        self._run_job_success(run.job.id, missed_events(run.job, run.run_times))
+
+    def _take_ready(self) -> List[_Run]:
+        """Claims free slots for queued runs; call with _all_done held."""
+        if self._shutdown:
+            return []
+        ready = []
+        while True:
+            run = self._queue.pop(self._active, self.max_workers)
+            if run is None:
+                return ready
+            self._active += 1
+            ready.append(run)
+
+    def _start(self, runs: List[_Run]) -> None:
+        for run in runs:
+            if run.timeout is not None:
+                run.deadline = watchdog.schedule(run.timeout, lambda run=run: self._expire(run))
+            dispatch_started(self._scheduler, run.job, run.run_times, run.submitted_at)
+            threading.Thread(target=self._execute, args=(run,), name=f"job-{run.job.id}", daemon=True).start()
+
+    def _execute(self, run: _Run) -> None:
+        _local.token = run.token
+        try:
+            events = self._call(run)
+        except BaseException:
+            self._finish(run, None, sys.exc_info())
+        else:
+            self._finish(run, events, None)
+        finally:
+            _local.token = None
+
+    def _call(self, run: _Run):
+        return run_job(run.job, run.job._jobstore_alias, run.run_times, self._logger.name)
+
+    def _interrupt(self, run: _Run) -> None:
+        run.token.cancel()
+
+    def _finish(self, run: _Run, events, exc_info) -> None:
+        if run.deadline is not None:
+            watchdog.cancel(run.deadline)
+        with self._all_done:
+            timed_out = run.done
+            if not timed_out:
+                run.done = True
+                self._active -= 1
+            ready = self._take_ready()
+            self._all_done.notify_all()
+        if not timed_out:
+            self._release(run)
+        self._start(ready)
+        if timed_out:
+            self._logger.warning(f'Run of job "{run.job.id}" finished after it had timed out; its result is discarded')
+        elif exc_info is not None:
+            self._run_job_error(run.job.id, *exc_info[1:])
+        else:
+            self._run_job_success(run.job.id, events)
+
+    def _expire(self, run: _Run) -> None:
+        with self._all_done:
+            if run.done:
+                return
+            run.done = True
+        self._interrupt(run)
+        with self._all_done:
+            self._active -= 1
+            ready = self._take_ready()
+            self._all_done.notify_all()
+        self._release(run)
+        self._start(ready)
+        exception = JobTimeoutError(run.job.id, run.timeout)
+        self._logger.error(str(exception))
+        self._run_job_success(run.job.id, [
+            JobExecutionEvent(EVENT_JOB_ERROR, run.job.id, run.job._jobstore_alias, run_time, exception=exception)
+            for run_time in run.run_times
+        ])
+
+def default_start_method() -> str:
+    """forkserver where the platform has it, else spawn; never fork, see TimeoutProcessPoolExecutor."""
+    return 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+def _run_in_child(connection, job, jobstore_alias, run_times, logger_name) -> None:
+    if database.engine is not None:
+        # Inherited through fork: the parent's pooled connections must not be used, or closed, here.
+        database.engine.dispose(close=False)
+    try:
+        events = run_job(job, jobstore_alias, run_times, logger_name)
+        try:
+            connection.send(events)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # An exception or return value that cannot cross the pipe; send its description instead.
+            for event in events:
+                if event.exception is not None:
+                    event.exception = RuntimeError(repr(event.exception))
+                event.retval = None if event.retval is None else repr(event.retval)
+            connection.send(events)
+    finally:
+        connection.close()
+
+class TimeoutProcessPoolExecutor(TimeoutThreadPoolExecutor):
+    """
+    Runs each job in a worker process of its own, at most max_workers at a time. A run that
+    exceeds its job's timeout has its process killed. The job and its return value must be
+    picklable.
+
+    Workers are started with start_method, by default forkserver (spawn where it is missing).
+    Forking this process would copy its threads' locks in whatever state they are, and its
+    database connections; fork is accepted, but the child then only drops the inherited pool.
+    """
+    def __init__(self, max_workers: int = 10, resources: Optional[ResourceManager] = None,
+                 start_method: Optional[str] = None, **dispatch_options):
+        super().__init__(max_workers, resources, **dispatch_options)
+        self._context = multiprocessing.get_context(start_method or default_start_method())
+
+    def _call(self, run: _Run):
+        receiver, sender = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_run_in_child, args=(sender, run.job, run.job._jobstore_alias, run.run_times, self._logger.name),
+            name=f"job-{run.job.id}", daemon=True,
+        )
+        try:
+            with self._all_done:
+                if run.done:
+                    return []
+                run.process = process
+            # Starting a process takes a while, so it is not done under the lock. A timeout that
+            # struck meanwhile may have found the process not yet alive; it is killed here then.
+            process.start()
+            with self._all_done:
+                expired = run.done
+            if expired:
+                process.kill()
+            sender.close()
+            try:
+                return receiver.recv()
+            except EOFError:
+                process.join()
+                raise RuntimeError(f"Worker process of job {run.job.id} exited with code {process.exitcode} without a result")
+        finally:
+            receiver.close()
+            if process.pid is not None:
+                process.join()
+
+    def _interrupt(self, run: _Run) -> None:
+        super()._interrupt(run)
+        with self._all_done:
+            process = run.process
+        if process is not None and process.is_alive():
+            process.kill()
@@ -74,6 +74,146 @@ class AppConfig:
     def database_url(self) -> str:
         return self.get('core.database_url', 'sqlite:///jobs.sqlite')
 
+    @property
+    def sqlite_journal_mode(self) -> str:
+        return self.get('core.sqlite.journal_mode', 'wal')
+
+    @property
+    def sqlite_synchronous(self) -> str:
+        return self.get('core.sqlite.synchronous', 'normal')
+
+    @property
+    def sqlite_busy_timeout_ms(self) -> int:
+        return int(self.get('core.sqlite.busy_timeout_ms', 5000))
+
+    @property
+    def sqlite_auto_vacuum(self) -> str:
+        return self.get('core.sqlite.auto_vacuum', 'incremental')
+
+    @property
+    def pool_size(self) -> int:
+        return int(self.get('core.pool.size', 10))
+
+    @property
+    def pool_max_overflow(self) -> int:
+        return int(self.get('core.pool.max_overflow', 20))
+
+    @property
+    def pool_timeout_seconds(self) -> float:
+        return float(self.get('core.pool.timeout_seconds', 30))
+
+    @property
+    def pool_pre_ping(self) -> bool:
+        return bool(self.get('core.pool.pre_ping', True))
+
+    @property
+    def pool_recycle_seconds(self) -> int:
+        return int(self.get('core.pool.recycle_seconds', 1800))
+
+    @property
+    def pool_slow_checkout_ms(self) -> float:
+        return float(self.get('core.pool.slow_checkout_ms', 100))
+
+    @property
+    def output_store_backend(self) -> str:
+        return self.get('execution_logs.output_store.backend', 'database')
+
+    @property
+    def output_store_path(self) -> str:
+        return str(PROJECT_ROOT / self.get('execution_logs.output_store.path', 'data/outputs'))
+
+    @property
+    def output_store_chunk_size(self) -> int:
+        return int(self.get('execution_logs.output_store.chunk_size', 65536))
+
+    @property
+    def output_store_orphan_grace_seconds(self) -> float:
+        return float(self.get('execution_logs.output_store.orphan_grace_seconds', 3600))
+
+    @property
+    def output_preview_chars(self) -> int:
+        return int(self.get('execution_logs.output_store.preview_chars', 1024))
+
+    @property
+    def retention_enabled(self) -> bool:
+        return bool(self.get('execution_logs.retention.enabled', True))
+
+    @property
+    def retention_interval_minutes(self) -> float:
+        return float(self.get('execution_logs.retention.interval_minutes', 60))
+
+    @property
+    def log_writer_batch_size(self) -> int:
+        return int(self.get('execution_logs.writer.batch_size', 500))
+
+    @property
+    def log_writer_flush_interval_seconds(self) -> float:
+        return float(self.get('execution_logs.writer.flush_interval_seconds', 0.5))
+
+    @property
+    def log_writer_max_queue_size(self) -> int:
+        return int(self.get('execution_logs.writer.max_queue_size', 100000))
+
+    @property
+    def dashboard_stats_window_hours(self) -> float:
+        return float(self.get('dashboard.stats_window_hours', 24))
+
+    @property
+    def dashboard_stats_reconcile_interval_minutes(self) -> float:
+        return float(self.get('dashboard.stats_reconcile_interval_minutes', 5))
+
+    @property
+    def timeline_max_items(self) -> int:
+        return int(self.get('dashboard.timeline_max_items', 2000))
+
+    @property
+    def timeline_buckets_per_group(self) -> int:
+        return int(self.get('dashboard.timeline_buckets_per_group', 200))
+
+    @property
+    def forecast_max_hours(self) -> float:
+        return float(self.get('dashboard.forecast_max_hours', 168))
+
+    @property
+    def scheduler_jobstore(self) -> str:
+        return self.get('scheduler.jobstore', 'json')
+
+    @property
+    def scheduler_executors(self) -> dict:
+        return self.get('scheduler.executors', None) or {
+            'default': {'type': 'thread', 'max_workers': 20},
+            'processpool': {'type': 'process', 'max_workers': 5},
+            'command': {'type': 'command', 'max_workers': 200},
+        }
+
+    @property
+    def scheduler_retry_policy(self) -> dict:
+        return self.get('scheduler.retry', None) or {}
+
+    @property
+    def scheduler_resources(self) -> dict:
+        return self.get('scheduler.resources', None) or {}
+
+    @property
+    def resource_lease_ttl_seconds(self) -> float:
+        return float(self.get('scheduler.resource_leases.ttl_seconds', 60))
+
+    @property
+    def resource_poll_interval_seconds(self) -> float:
+        return float(self.get('scheduler.resource_leases.poll_interval_seconds', 1))
+
+    @property
+    def command_max_output_bytes(self) -> int:
+        return int(self.get('scheduler.commands.max_output_bytes', 1048576))
+
+    @property
+    def command_read_chunk_bytes(self) -> int:
+        return int(self.get('scheduler.commands.read_chunk_bytes', 65536))
+
+    @property
+    def scheduler_change_feed_interval_seconds(self) -> float:
+        return float(self.get('scheduler.change_feed_interval_seconds', 1))
+
 # Create a single, importable instance for the application to use.
 config = AppConfig()
 
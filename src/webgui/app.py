@@ -1,4 +1,4 @@
-from flask import Flask, render_template, jsonify
+from flask import Flask, render_template, jsonify, request
 import requests
 
 # The template_folder is set to the 'templates' directory relative to this file's location.
@@ -44,13 +44,23 @@ def job_detail(job_id):
 @app.route('/api/timeline-data')
 def timeline_data():
     try:
-        response = requests.get(f"{API_BASE_URL}/api/timeline/data")
+        response = requests.get(f"{API_BASE_URL}/api/timeline/data", params=request.args)
         response.raise_for_status()
         return jsonify(response.json())
     except requests.exceptions.RequestException as e:
         print(f"Error fetching timeline data from backend API: {e}")
         return jsonify({"error": "Could not fetch timeline data"}), 500
 
+@app.route('/api/timeline-delta')
+def timeline_delta():
+    try:
+        response = requests.get(f"{API_BASE_URL}/api/timeline/delta", params=request.args)
+        response.raise_for_status()
+        return jsonify(response.json())
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching timeline changes from backend API: {e}")
+        return jsonify({"error": "Could not fetch timeline changes"}), 500
+
 @app.route('/settings')
 def settings():
     return render_template('settings.html')
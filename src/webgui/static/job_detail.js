@@ -20,6 +20,8 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Execution History Elements
     const executionHistoryBody = document.getElementById('execution-history-body');
+    const loadMoreHistoryBtn = document.getElementById('load-more-history-btn');
+    let historyNextCursor = null;
 
     // Log Display Elements
     const logDisplaySection = document.getElementById('log-display-section');
@@ -27,6 +29,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const logStdoutCode = document.getElementById('log-stdout');
     const logStderrCode = document.getElementById('log-stderr');
     const copyLogBtn = document.getElementById('copy-log-btn');
+    const LOG_OUTPUT_MAX_BYTES = 256 * 1024;
 
     // --- Utility Functions ---
 
@@ -87,29 +90,32 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
-    function fetchExecutionHistory() {
-        fetch(`${API_BASE_URL}/api/jobs/${jobId}/history`)
+    function fetchExecutionHistory(cursor = null) {
+        const params = new URLSearchParams({ limit: 50 });
+        if (cursor) params.append('cursor', cursor);
+        fetch(`${API_BASE_URL}/api/jobs/${jobId}/history?${params}`)
             .then(response => {
                 if (!response.ok) throw new Error('実行履歴の取得に失敗しました。');
                 return response.json();
             })
-            .then(history => {
-                executionHistoryBody.innerHTML = '';
-                if (history.length === 0) {
+            .then(page => {
+                if (!cursor) executionHistoryBody.innerHTML = '';
+                historyNextCursor = page.next_cursor;
+                loadMoreHistoryBtn.classList.toggle('d-none', !historyNextCursor);
+                if (!cursor && page.items.length === 0) {
                     executionHistoryBody.innerHTML = `<tr><td colspan="6" class="text-center">このジョブの実行履歴はありません。</td></tr>`;
                     return;
                 }
-                history.forEach(log => {
+                page.items.forEach(log => {
                     const row = document.createElement('tr');
                     row.innerHTML = `
                         <td>${log.id}</td>
-                        <td><span class="badge bg-${log.status === 'COMPLETED' ? 'success' : log.status === 'FAILED' ? 'danger' : 'info'}">${log.status}</span></td>
+                        <td><span class="badge bg-${log.status === 'COMPLETED' ? 'success' : log.status === 'FAILED' ? 'danger' : log.status === 'TIMEOUT' ? 'warning' : 'info'}">${log.status}</span></td>
                         <td>${formatDateTime(log.start_time)}</td>
                         <td>${formatDateTime(log.end_time)}</td>
                         <td>${formatDuration(log.start_time, log.end_time)}</td>
                         <td>
-                            <button class="btn btn-sm btn-secondary btn-view-log" data-log-id="${log.id}" 
-                                data-stdout="${log.stdout || ''}" data-stderr="${log.stderr || ''}">
+                            <button class="btn btn-sm btn-secondary btn-view-log" data-log-id="${log.id}">
                                 ログ表示
                             </button>
                         </td>
@@ -129,19 +135,35 @@ document.addEventListener('DOMContentLoaded', function() {
         const target = event.target;
         if (target.classList.contains('btn-view-log')) {
             const logId = target.dataset.logId;
-            const stdout = target.dataset.stdout;
-            const stderr = target.dataset.stderr;
-
-            logDetailIdSpan.textContent = logId;
-            logStdoutCode.textContent = stdout;
-            logStderrCode.textContent = stderr;
-            logDisplaySection.style.display = 'block';
-
-            // Scroll to log section
-            logDisplaySection.scrollIntoView({ behavior: 'smooth' });
+            // Output is not part of the history listing; fetch it for this run only.
+            const fetchOutput = stream =>
+                fetch(`${API_BASE_URL}/api/logs/${encodeURIComponent(logId)}/output/${stream}?length=${LOG_OUTPUT_MAX_BYTES}`)
+                    .then(response => {
+                        if (!response.ok) throw new Error('ログの取得に失敗しました。');
+                        return response.json();
+                    })
+                    .then(output => output.data + (output.total_size > output.length ? `\n... (${output.total_size - output.length} bytes omitted)` : ''));
+            Promise.all([fetchOutput('stdout'), fetchOutput('stderr')])
+                .then(([stdout, stderr]) => {
+                    logDetailIdSpan.textContent = logId;
+                    logStdoutCode.textContent = stdout;
+                    logStderrCode.textContent = stderr;
+                    logDisplaySection.style.display = 'block';
+
+                    // Scroll to log section
+                    logDisplaySection.scrollIntoView({ behavior: 'smooth' });
+                })
+                .catch(error => {
+                    console.error('Error fetching execution log:', error);
+                    alert(`ログの取得に失敗しました: ${error.message}`);
+                });
         }
     });
 
+    loadMoreHistoryBtn.addEventListener('click', function() {
+        if (historyNextCursor) fetchExecutionHistory(historyNextCursor);
+    });
+
     copyLogBtn.addEventListener('click', function() {
         const activeTabContent = document.querySelector('#logTabs .nav-link.active').getAttribute('aria-controls');
         let textToCopy = '';
@@ -17,9 +17,9 @@ document.addEventListener('DOMContentLoaded', function() {
                 }
                 return response.json();
             })
-            .then(logs => {
+            .then(page => {
                 logListBody.innerHTML = ''; // Clear existing rows
-                logs.forEach(log => {
+                page.items.forEach(log => {
                     const startTime = new Date(log.start_time).toLocaleString();
                     const endTime = log.end_time ? new Date(log.end_time).toLocaleString() : '-';
                     
@@ -31,6 +31,9 @@ document.addEventListener('DOMContentLoaded', function() {
                         case 'FAILED':
                             statusBadge = '<span class="badge bg-danger">Failed</span>';
                             break;
+                        case 'TIMEOUT':
+                            statusBadge = '<span class="badge bg-warning text-dark">Timed out</span>';
+                            break;
                         case 'RUNNING':
                             statusBadge = '<span class="badge bg-info">Running</span>';
                             break;
@@ -26,63 +26,119 @@ document.addEventListener('DOMContentLoaded', function() {
     // Create the Timeline
     const timeline = new vis.Timeline(container, items, options);
 
-    // Function to fetch and render timeline data
+    // Converts a timeline item of the API into a vis.js item.
+    function toVisItem(job) {
+        let className = '';
+
+        // Determine class name based on job status/type
+        if (job.status === 'completed') {
+            className = 'job-completed';
+        } else if (job.status === 'failed') {
+            className = 'job-failed';
+        } else if (job.status === 'running') {
+            className = 'job-running';
+        } else if (job.status === 'scheduled') {
+            className = 'job-scheduled';
+        }
+
+        let title = `Job ID: ${job.group}<br>Status: ${job.status}<br>Start: ${new Date(job.start).toLocaleString()}` + (job.end ? `<br>End: ${new Date(job.end).toLocaleString()}` : '');
+        if (job.count !== null && job.count !== undefined) {
+            className += ' job-bucket';
+            title += `<br>Runs: ${job.count}<br>Failed: ${job.failed_count}`;
+        }
+
+        return {
+            id: job.id,
+            content: job.content,
+            start: job.start,
+            end: job.end, // Optional, for range items
+            type: job.end ? 'range' : 'point', // 'range' for finished runs and buckets, 'point' for scheduled runs
+            className: className,
+            title: title
+        };
+    }
+
+    function showError(error) {
+        console.error('Error fetching timeline data:', error);
+        // Display an error message on the timeline container
+        container.innerHTML = '<p class="text-danger">タイムラインデータの読み込みに失敗しました。</p>';
+    }
+
+    function fetchJson(url) {
+        return fetch(url).then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return response.json();
+        });
+    }
+
+    // State of the loaded window; deltas are only valid for the same window and resolution.
+    let requestSeq = 0;
+    let loaded = null; // { start, end, cursor, resolutionSeconds }
+
+    // Fetches the visible window only; the API aggregates runs into buckets when zoomed out.
     function fetchAndRenderTimelineData() {
-        fetch(`${API_BASE_URL}/api/timeline-data`)
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error(`HTTP error! status: ${response.status}`);
+        const range = timeline.getWindow();
+        const params = new URLSearchParams({
+            start: range.start.toISOString(),
+            end: range.end.toISOString(),
+            resolution: 'auto',
+        });
+        const seq = ++requestSeq;
+        fetchJson(`${API_BASE_URL}/api/timeline-data?${params}`)
+            .then(data => {
+                if (seq !== requestSeq) {
+                    return; // A newer window has been requested meanwhile.
                 }
-                return response.json();
+                items.clear();
+                items.add(data.items.map(toVisItem));
+                loaded = {
+                    start: params.get('start'),
+                    end: params.get('end'),
+                    cursor: data.cursor,
+                    resolutionSeconds: data.resolution_seconds,
+                };
             })
-            .then(data => {
-                items.clear(); // Clear existing items
-                // Process data and add to items DataSet
-                // Example data structure for vis.js:
-                // { id: 1, content: 'Job A', start: '2025-09-20T10:00:00', end: '2025-09-20T10:05:00', type: 'range', className: 'job-completed' }
-                // { id: 2, content: 'Job B (Scheduled)', start: '2025-09-22T14:30:00', type: 'point', className: 'job-scheduled' }
-
-                data.forEach(job => {
-                    let className = '';
-                    let content = job.id; // Default content
-
-                    // Determine class name based on job status/type
-                    if (job.status === 'completed') {
-                        className = 'job-completed';
-                    } else if (job.status === 'failed') {
-                        className = 'job-failed';
-                    } else if (job.status === 'running') {
-                        className = 'job-running';
-                        content += ' (Running)';
-                    } else if (job.status === 'scheduled') {
-                        className = 'job-scheduled';
-                        content += ' (Scheduled)';
-                    }
-
-                    // Add item to DataSet
-                    items.add({
-                        id: job.id + '-' + job.start, // Unique ID for each item
-                        content: content,
-                        start: job.start,
-                        end: job.end, // Optional, for range items
-                        type: job.end ? 'range' : 'point', // 'range' for completed/failed, 'point' for scheduled/running
-                        className: className,
-                        title: `Job ID: ${job.id}<br>Status: ${job.status}<br>Function: ${job.func}<br>Start: ${new Date(job.start).toLocaleString()}` + (job.end ? `<br>End: ${new Date(job.end).toLocaleString()}` : '')
-                    });
-                });
-
-                timeline.fit(); // Adjust timeline to fit all items
+            .catch(showError);
+    }
+
+    // Patches the DataSet in place with what changed since the last response.
+    function fetchAndApplyTimelineDelta() {
+        if (loaded === null) {
+            return;
+        }
+        const params = new URLSearchParams({ cursor: loaded.cursor, start: loaded.start, end: loaded.end });
+        if (loaded.resolutionSeconds !== null) {
+            params.set('resolution_seconds', loaded.resolutionSeconds);
+        }
+        const seq = requestSeq;
+        fetchJson(`${API_BASE_URL}/api/timeline-delta?${params}`)
+            .then(delta => {
+                if (seq !== requestSeq || loaded === null) {
+                    return; // The window changed meanwhile; a full load is under way.
+                }
+                if (delta.reset) {
+                    fetchAndRenderTimelineData();
+                    return;
+                }
+                items.remove(delta.removed);
+                items.update(delta.upserts.map(toVisItem));
+                loaded.cursor = delta.cursor;
             })
-            .catch(error => {
-                console.error('Error fetching timeline data:', error);
-                // Display an error message on the timeline container
-                container.innerHTML = '<p class="text-danger">タイムラインデータの読み込みに失敗しました。</p>';
-            });
+            .catch(error => console.error('Error fetching timeline changes:', error));
     }
 
+    // Reload whenever the user pans or zooms, debounced so that a drag issues one request.
+    let reloadTimer = null;
+    timeline.on('rangechanged', () => {
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(fetchAndRenderTimelineData, 250);
+    });
+
     // Initial fetch and render
     fetchAndRenderTimelineData();
 
-    // Optional: Refresh data periodically
-    // setInterval(fetchAndRenderTimelineData, 60000); // Refresh every minute
+    // Keep the window current with incremental updates.
+    setInterval(fetchAndApplyTimelineDelta, 5000);
 });
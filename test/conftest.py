@@ -0,0 +1,46 @@
+import pytest
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from core import database
+from core.database import Base
+from modules.scheduler import loader, scheduler_instance
+
+@pytest.fixture
+def db(monkeypatch):
+    """An in-memory database shared by every session of the test."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    session = session_factory()
+    yield session
+    session.close()
+
+@pytest.fixture
+def file_db(tmp_path, monkeypatch):
+    """A pooled file database, for tests whose background threads write concurrently."""
+    engine = database.create_app_engine(f"sqlite:///{tmp_path / 'jobs.sqlite'}")
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+    session = session_factory()
+    yield session
+    session.close()
+    engine.dispose()
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """A paused scheduler with a memory jobstore, standing in for the application's scheduler."""
+    loader.reset_applied_state()
+    sched = BackgroundScheduler(jobstores={"default": MemoryJobStore()})
+    sched.start(paused=True)
+    monkeypatch.setattr(scheduler_instance, "scheduler", sched)
+    yield sched
+    sched.shutdown(wait=False)
+    loader.reset_applied_state()
@@ -0,0 +1,14 @@
+from modules.scheduler import schemas
+
+def raw_job(job_id, **overrides):
+    """A job definition as the API receives it."""
+    data = {
+        "id": job_id,
+        "func": "modules.scheduler.tasks.sample_tasks.print_current_time",
+        "trigger": {"type": "interval", "minutes": 10},
+    }
+    data.update(overrides)
+    return data
+
+def job_config(job_id, **overrides):
+    return schemas.JobConfig.model_validate(raw_job(job_id, **overrides))
@@ -0,0 +1,68 @@
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import pytest
+from apscheduler.events import EVENT_JOB_EXECUTED
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from helpers import raw_job
+from modules.scheduler import command_runner, schemas
+
+def test_command_runner_bounds_output_and_reports_exit_codes():
+    supervisor = command_runner.CommandSupervisor()
+    try:
+        ok = supervisor.submit(command_runner.run_command(argv=[sys.executable, "-c", "print('x' * 5000000)"]), limit=2)
+        failed = supervisor.submit(command_runner.run_command(shell="echo oops >&2; exit 3"), limit=2)
+        result = ok.result(timeout=30)
+        with pytest.raises(command_runner.CommandFailedError) as error:
+            failed.result(timeout=30)
+    finally:
+        supervisor.stop()
+
+    assert result.exit_code == 0 and result.truncated
+    assert result.stdout_bytes == 5000001
+    assert len(result.stdout) < 1100000 and "bytes omitted" in result.stdout
+    assert (error.value.result.exit_code, error.value.result.stderr) == (3, "oops\n")
+
+def test_command_outcomes_are_reported_off_the_supervisor_loop():
+    supervisor = command_runner.CommandSupervisor(name="test-supervisor")
+    scheduler = BackgroundScheduler(
+        jobstores={"default": MemoryJobStore()},
+        executors={"default": command_runner.CommandExecutor(2, supervisor=supervisor)},
+    )
+    reported = []
+
+    def slow_listener(event):
+        reported.append((event.job_id, threading.current_thread().name, time.monotonic()))
+        time.sleep(0.5)
+
+    scheduler.add_listener(slow_listener, EVENT_JOB_EXECUTED)
+    scheduler.start()
+    try:
+        now = datetime.now(timezone.utc)
+        for job_id in ("a", "b"):
+            scheduler.add_job(command_runner.run_command, "interval", hours=1, next_run_time=now, id=job_id, kwargs={"shell": "true"})
+        started = time.monotonic()
+        # The loop keeps serving other work while a listener blocks.
+        assert supervisor.submit(command_runner.run_command(shell="true")).result(timeout=10).exit_code == 0
+        assert time.monotonic() - started < 0.5
+    finally:
+        scheduler.shutdown(wait=True)
+        supervisor.stop()
+
+    assert sorted(job_id for job_id, _, _ in reported) == ["a", "b"]
+    assert all(name.startswith("test-supervisor-dispatch") for _, name, _ in reported)
+
+def test_command_jobs_need_a_command_and_no_func():
+    job = schemas.JobConfig.model_validate(raw_job("c", func=None, job_type="command", command={"shell": "true"}))
+    assert job.func == "modules.scheduler.command_runner.run_command"
+    for invalid in (
+        raw_job("c", job_type="command"),
+        raw_job("c", func=None, job_type="command", command={"shell": "true", "argv": ["true"]}),
+        raw_job("c", command={"shell": "true"}),
+    ):
+        with pytest.raises(ValueError):
+            schemas.JobConfig.model_validate(invalid)
@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from modules.scheduler import dispatch, executors
+
+def test_dispatch_queue_orders_by_priority_with_reserved_slots_and_aging(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(dispatch.time, "monotonic", lambda: now[0])
+    queue = dispatch.DispatchQueue(reserved_workers=1, reserved_priority=10, aging_seconds=60)
+    base = datetime(2024, 1, 1)
+    queue.push("report-late", 0, base + timedelta(minutes=1))
+    queue.push("report", 0, base)
+    queue.push("cleanup", -5, base)
+    queue.push("health", 10, base + timedelta(minutes=2))
+    # With one slot left, only jobs entitled to the reserved slot may start.
+    assert queue.pop(active=3, max_workers=4) == "health"
+    assert queue.pop(active=3, max_workers=4) is None
+    assert queue.pop(active=4, max_workers=4) is None
+    # Same priority: the earlier scheduled time goes first. Aging lifts the long-waiting
+    # low-priority run above a newer run of a higher priority.
+    now[0] = 330.0
+    queue.push("report-new", 0, base + timedelta(minutes=3))
+    assert [queue.pop(active=0, max_workers=4) for _ in range(3)] == ["report", "report-late", "cleanup"]
+    assert [(row["priority"], row["queued"], row["started"]) for row in queue.stats()] == [(10, 0, 1), (0, 1, 2), (-5, 0, 1)]
+    assert queue.stats()[1]["max_wait_seconds"] == 330.0
+    with pytest.raises(ValueError):
+        executors.create_executors({"io": {"type": "thread", "max_workers": 2, "reserved_workers": 2}})
+    with pytest.raises(ValueError):
+        executors.create_executors({"sh": {"type": "command", "reserved_workers": 1}})
@@ -0,0 +1,19 @@
+import pytest
+
+from modules.scheduler import executors
+from modules.scheduler.timeouts import TimeoutProcessPoolExecutor, TimeoutThreadPoolExecutor
+
+def test_create_executors_builds_named_pools():
+    pools = executors.create_executors({"io": {"type": "thread", "max_workers": 4}, "cpu": {"type": "process", "max_workers": 2}})
+    assert set(pools) == {"io", "cpu", executors.DEFAULT_EXECUTOR, executors.COMMAND_EXECUTOR, executors.INTERNAL_EXECUTOR}
+    assert type(pools["cpu"]) is TimeoutProcessPoolExecutor and type(pools["io"]) is TimeoutThreadPoolExecutor
+    with pytest.raises(ValueError):
+        executors.create_executors({"gpu": {"type": "cuda"}})
+    with pytest.raises(ValueError):
+        executors.create_executors({executors.INTERNAL_EXECUTOR: {}})
+    assert pools["cpu"]._context.get_start_method() != "fork"
+    spawned = executors.create_executors({"cpu": {"type": "process", "start_method": "spawn"}})
+    assert spawned["cpu"]._context.get_start_method() == "spawn"
+    for invalid in ({"type": "process", "start_method": "clone"}, {"type": "thread", "start_method": "spawn"}):
+        with pytest.raises(ValueError):
+            executors.create_executors({"cpu": invalid})
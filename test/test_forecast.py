@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta, timezone
+
+from modules.scheduler import forecast as forecast_module
+from modules.scheduler.forecast import ForecastEngine
+from modules.scheduler.journal import JOURNAL_EVENTS, JobChangeJournal
+
+def test_forecast_expands_interval_and_cron_jobs(scheduler):
+    journal = JobChangeJournal()
+    scheduler.add_listener(journal, JOURNAL_EVENTS)
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    scheduler.add_job(print, "interval", minutes=15, start_date=start, id="every-15m", timezone="UTC")
+    for i in range(3):
+        scheduler.add_job(print, "cron", minute="0,30", id=f"half-hourly-{i}", timezone="UTC")
+    scheduler.add_job(print, "interval", seconds=90, start_date=start, id="every-90s", timezone="UTC")
+    scheduler.add_job(print, "date", run_date=start + timedelta(minutes=45), id="once", timezone="UTC")
+    engine = ForecastEngine(scheduler, journal)
+
+    forecast = engine.forecast(start, start + timedelta(hours=1), max_fire_times=2)
+    counts = {job.job_id: job.count for job in forecast.jobs}
+    assert counts == {"every-15m": 4, "half-hourly-0": 2, "half-hourly-1": 2, "half-hourly-2": 2, "every-90s": 40, "once": 1}
+    assert next(job for job in forecast.jobs if job.job_id == "every-15m").truncated
+    histogram = {(bucket.minute - start) // timedelta(minutes=1): bucket.fires for bucket in forecast.histogram}
+    assert histogram[0] == 1 + 3 + 1
+    assert histogram[30] == 1 + 3 + 1
+    assert histogram[45] == 1 + 1 + 1
+    assert sum(histogram.values()) == sum(counts.values())
+    assert forecast.peak_fires_per_minute == 5
+    assert len(engine._expansions) == 1
+
+    scheduler.remove_job("every-90s")
+    scheduler.pause_job("once")
+    assert {job.job_id for job in engine.forecast(start, start + timedelta(hours=1)).jobs} == {
+        "every-15m", "half-hourly-0", "half-hourly-1", "half-hourly-2"}
+
+def test_truncated_cron_expansions_are_cached_only_up_to_their_last_fire_time(scheduler, monkeypatch):
+    monkeypatch.setattr(forecast_module, "MAX_EXPANSION", 3)
+    journal = JobChangeJournal()
+    scheduler.add_listener(journal, JOURNAL_EVENTS)
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    scheduler.add_job(print, "cron", minute="*", id="every-minute", timezone="UTC")
+    engine = ForecastEngine(scheduler, journal)
+
+    engine.forecast(start, start + timedelta(minutes=5))
+    ((_, covered_end, times),) = engine._expansions.values()
+    assert covered_end == times[-1] == (start + timedelta(minutes=2)).timestamp()
+    # Within the span that was requested, but past what the truncated expansion covers.
+    later = engine.forecast(start + timedelta(minutes=4), start + timedelta(minutes=8))
+    assert {job.job_id: job.count for job in later.jobs} == {"every-minute": 3}
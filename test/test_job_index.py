@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta, timezone
+
+from apscheduler.events import EVENT_JOB_SUBMITTED, JobSubmissionEvent
+
+from modules.scheduler.job_index import INDEX_EVENTS, JobIndex
+
+def test_job_index_follows_scheduler_events(scheduler):
+    start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    scheduler.add_job(print, "interval", minutes=10, start_date=start, id="preexisting", timezone="UTC")
+    index = JobIndex(scheduler)
+    scheduler.add_listener(index, INDEX_EVENTS)
+    assert index.rebuild() == 1
+
+    scheduler.add_job(print, "interval", minutes=5, start_date=start, id="b", timezone="UTC")
+    scheduler.add_job(print, "cron", hour="3", id="c", timezone="UTC")
+    scheduler.pause_job("preexisting")
+    assert [job.id for job in index.query(sort="next_run_time")[1]] == ["c", "b", "preexisting"]
+    assert index.query(state="paused")[1][0].next_run_time is None
+    total, page = index.query(trigger="interval", skip=1, limit=1)
+    assert (total, [job.id for job in page]) == (2, ["preexisting"])
+    assert index.get("b").trigger.minutes == 5
+
+    # A submission moves the next run on without reading the jobstore.
+    index(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "b", "default", [start]))
+    assert index.get("b").next_run_time >= start + timedelta(minutes=5)
+    assert [job.id for job in index.scheduled_between(start, start + timedelta(minutes=1))] == []
+
+    scheduler.remove_job("c")
+    assert index.job_ids() == ["b", "preexisting"]
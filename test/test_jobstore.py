@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from apscheduler.jobstores.base import ConflictingIdError
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from modules.scheduler.jobstore import JSONJobStore
+
+def test_json_jobstore_round_trips_jobs():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    store = JSONJobStore(engine=engine)
+    sched = BackgroundScheduler(jobstores={"default": store}, timezone="UTC")
+    sched.start(paused=True)
+    try:
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        func = "builtins:print"
+        sched.add_job(func, "cron", minute="*/5", hour="1-3", id="cron", kwargs={"sep": " "})
+        sched.add_job(func, "interval", minutes=7, start_date=start, id="interval", args=[1, "x"])
+        sched.add_job(func, "date", run_date=start + timedelta(days=1), id="date")
+        sched.add_job(func, "interval", hours=1, start_date=start, id="pickled", args=[datetime(2020, 1, 1)])
+        with pytest.raises(ConflictingIdError):
+            store.add_job(sched.get_job("date"))
+
+        # A fresh store reads everything back from the table.
+        reloaded = JSONJobStore(engine=engine)
+        reloaded.start(sched, "default")
+        jobs = {job.id: job for job in reloaded.get_all_jobs()}
+        assert str(jobs["cron"].trigger) == str(sched.get_job("cron").trigger)
+        assert jobs["interval"].trigger.interval == timedelta(minutes=7) and jobs["interval"].args == (1, "x")
+        assert jobs["interval"].next_run_time == start
+        assert jobs["pickled"].args == (datetime(2020, 1, 1),)
+        assert jobs["date"].next_run_time == start + timedelta(days=1)
+        assert [job.id for job in reloaded.get_due_jobs(start + timedelta(minutes=1))] == ["cron", "interval", "pickled"]
+
+        sched.pause_job("interval")
+        assert store.lookup_job("interval").next_run_time is None
+        sched.remove_job("cron")
+        assert store.lookup_job("cron") is None
+        assert reloaded.get_next_run_time() is not None
+    finally:
+        sched.shutdown(wait=False)
@@ -0,0 +1,142 @@
+import pytest
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_MODIFIED, EVENT_JOB_REMOVED
+
+from helpers import job_config
+from modules.scheduler import executors, loader, models, router, scheduler_instance, schemas
+from modules.scheduler.service import job_definition_service
+
+def test_apply_adds_then_skips_unchanged_jobs(scheduler):
+    configs = [job_config("a"), job_config("b")]
+    assert loader.apply_job_config(scheduler, configs)["added"] == 2
+    counts = loader.apply_job_config(scheduler, configs)
+    assert counts["unchanged"] == 2
+    assert counts["added"] == counts["replaced"] == 0
+
+def test_apply_replaces_pauses_and_removes_only_changed_jobs(scheduler):
+    loader.apply_job_config(scheduler, [job_config("a"), job_config("b"), job_config("c")])
+    counts = loader.apply_job_config(scheduler, [
+        job_config("a", trigger={"type": "interval", "minutes": 5}),
+        job_config("b", is_enabled=False),
+    ])
+    assert (counts["replaced"], counts["paused"], counts["removed"]) == (1, 1, 1)
+    assert scheduler.get_job("c") is None
+    assert scheduler.get_job("b").next_run_time is None
+
+    counts = loader.apply_job_config(scheduler, [job_config("a", trigger={"type": "interval", "minutes": 5}), job_config("b")])
+    assert counts["resumed"] == 1
+    assert scheduler.get_job("b").next_run_time is not None
+
+def test_first_apply_removes_stale_jobs_from_jobstore(scheduler):
+    scheduler.add_job(print, "interval", minutes=1, id="stale")
+    counts = loader.apply_job_config(scheduler, [job_config("a")])
+    assert counts["removed"] == 1
+    assert scheduler.get_job("stale") is None
+
+def test_jobs_run_on_their_configured_executor(scheduler):
+    loader.apply_job_config(scheduler, [job_config("a"), job_config("b", executor="processpool")])
+    assert (scheduler.get_job("a").executor, scheduler.get_job("b").executor) == ("default", "processpool")
+
+    counts = loader.apply_job_config(scheduler, [job_config("a", executor="processpool"), job_config("b", executor="missing")])
+    assert (counts["replaced"], counts["failed"]) == (1, 1)
+    assert scheduler.get_job("a").executor == "processpool"
+    with pytest.raises(ValueError):
+        scheduler_instance.check_job_executor(executors.INTERNAL_EXECUTOR)
+
+    command_job = job_config("c", func=None, job_type="command", command={"argv": ["true"]})
+    loader.apply_job_config(scheduler, [command_job, job_config("d", executor=executors.COMMAND_EXECUTOR)])
+    assert scheduler.get_job("c").executor == executors.COMMAND_EXECUTOR
+    assert scheduler.get_job("c").kwargs == {"argv": ["true"], "job_id": "c"}
+    assert scheduler.get_job("d") is None
+
+def test_poll_applies_only_changed_definitions(db, scheduler):
+    job_definition_service.create_from_config(db, job_in=job_config("a"))
+    assert loader.poll_job_changes()["added"] == 1
+    assert loader.poll_job_changes() is None
+
+    job_definition_service.create_from_config(db, job_in=job_config("b"))
+    job_definition_service.remove(db, id="a")
+    counts = loader.poll_job_changes()
+    assert (counts["added"], counts["removed"], counts["unchanged"]) == (1, 1, 0)
+    assert [job.id for job in scheduler.get_jobs()] == ["b"]
+
+def test_poll_times_each_revision_gap_separately(db, scheduler, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(loader.time, "monotonic", lambda: now[0])
+    job_definition_service.create_from_config(db, job_in=job_config("a"))
+    loader.poll_job_changes()
+    base = loader._feed.revision
+
+    def change(offset):
+        db.add(models.JobDefinitionChange(revision=base + offset, job_id="a", operation="upsert"))
+        db.commit()
+
+    # A revision still uncommitted elsewhere holds consumption back ...
+    change(2)
+    loader.poll_job_changes()
+    assert loader._feed.revision == base
+    # ... until it commits; a later gap then gets a timer of its own.
+    now[0] = loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS + 1
+    change(1)
+    change(4)
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 2
+    now[0] += loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS / 2
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 2
+    # A gap open for longer than the timeout belongs to a rolled back transaction.
+    now[0] += loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 4
+
+def test_poll_does_not_pass_a_gap_behind_a_timed_out_one(db, scheduler, monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(loader.time, "monotonic", lambda: now[0])
+    job_definition_service.create_from_config(db, job_in=job_config("a"))
+    loader.poll_job_changes()
+    base = loader._feed.revision
+    for offset in (1, 3, 5):
+        db.add(models.JobDefinitionChange(revision=base + offset, job_id="a", operation="upsert"))
+    db.commit()
+
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 1
+    # The first gap timing out only lets consumption reach the second, whose timer starts now.
+    now[0] = loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS + 1
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 3
+    now[0] += loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS / 2
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 3
+    now[0] += loader.CHANGE_FEED_GAP_TIMEOUT_SECONDS
+    loader.poll_job_changes()
+    assert loader._feed.revision == base + 5
+
+def test_job_writes_through_the_api_apply_only_the_affected_jobs(db, scheduler):
+    touched = []
+    scheduler.add_listener(lambda event: touched.append(event.job_id), EVENT_JOB_ADDED | EVENT_JOB_MODIFIED | EVENT_JOB_REMOVED)
+    router.upsert_bulk_jobs(schemas.BulkJobUpsert(jobs=[job_config(job_id).model_dump() for job_id in "abcd"]), db)
+    assert sorted(touched) == ["a", "b", "c", "d"]
+
+    touched.clear()
+    router.create_job(job_config("e"), db)
+    assert touched == ["e"]
+    touched.clear()
+    router.update_job("a", job_config("a", trigger={"type": "interval", "minutes": 5}), db)
+    assert touched == ["a"]
+    touched.clear()
+    router.delete_job("b", db)
+    assert touched == ["b"]
+    touched.clear()
+    # Unchanged definitions in a bulk write are left alone as well.
+    router.upsert_bulk_jobs(schemas.BulkJobUpsert(jobs=[job_config("c").model_dump(), job_config("d", is_enabled=False).model_dump()]), db)
+    assert touched == ["d"]
+    touched.clear()
+    router.delete_bulk_jobs(schemas.BulkJobUpdate(job_ids=["c", "e"]), db)
+    assert sorted(touched) == ["c", "e"]
+    assert sorted(job.id for job in scheduler.get_jobs()) == ["a", "d"]
+
+    touched.clear()
+    assert router.resync_scheduled_jobs(force=False)["result"]["unchanged"] == 2
+    assert touched == []
+    result = router.resync_scheduled_jobs(force=True)["result"]
+    assert result["unchanged"] == 0 and sorted(touched) == ["a", "d"]
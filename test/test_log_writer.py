@@ -0,0 +1,79 @@
+import threading
+import time
+
+from helpers import raw_job
+from modules.scheduler import log_writer, models, output_store, service
+
+def test_log_writer_batches_and_coalesces_records(db):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    writer = log_writer.ExecutionLogWriter(batch_size=100, flush_interval=0.05)
+    try:
+        writer.record_start("run-1", job_id="a", command="cmd")
+        writer.record_finish("run-1", status="COMPLETED", exit_code=0, stdout="hello")
+        writer.record_start("run-2", job_id="a", command="cmd")
+        assert writer.flush(timeout=5)
+        writer.record_finish("run-2", status="FAILED", exit_code=1, stderr="boom")
+        # A duplicate insert fails the batch; the remaining records are still written one by one.
+        writer.record_start("run-1", job_id="a", command="cmd")
+        writer.record_start("run-3", job_id="a", command="cmd")
+    finally:
+        writer.stop()
+
+    db.expire_all()
+    runs = {log.id: log for log in db.query(models.ProcessExecutionLog)}
+    assert sorted(runs) == ["run-1", "run-2", "run-3"]
+    assert (runs["run-1"].status, runs["run-1"].stdout, runs["run-1"].stdout_size) == ("COMPLETED", "hello", 5)
+    assert (runs["run-2"].status, runs["run-2"].exit_code) == ("FAILED", 1)
+    assert output_store.read_output(db, runs["run-2"], "stderr") == (b"boom", 4)
+    assert runs["run-3"].status == "RUNNING"
+
+def test_log_writer_survives_output_store_errors(db, monkeypatch):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    store_output = output_store.output_values
+
+    def failing_output_values(session, log_id, **outputs):
+        if log_id == "run-bad":
+            raise OSError("disk full")
+        return store_output(session, log_id, **outputs)
+
+    monkeypatch.setattr(output_store, "output_values", failing_output_values)
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    try:
+        writer.record_start("run-bad", job_id="a", command="cmd", stdout="lost")
+        writer.record_start("run-ok", job_id="a", command="cmd")
+        assert writer.flush(timeout=5)
+        writer.record_start("run-later", job_id="a", command="cmd")
+        assert writer.flush(timeout=5)
+    finally:
+        writer.stop()
+
+    db.expire_all()
+    assert sorted(log.id for log in db.query(models.ProcessExecutionLog)) == ["run-later", "run-ok"]
+
+def test_committed_as_of_stays_before_batches_still_being_written(db, monkeypatch):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    writing, proceed = threading.Event(), threading.Event()
+    store_output = output_store.output_values
+
+    def slow_output_values(*args, **kwargs):
+        writing.set()
+        proceed.wait(10)
+        return store_output(*args, **kwargs)
+
+    monkeypatch.setattr(output_store, "output_values", slow_output_values)
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    try:
+        writer.record_start("run-1", job_id="a", command="cmd", stdout="hello")
+        assert writing.wait(5)
+        as_of = writer.committed_as_of()
+        time.sleep(0.05)
+        assert writer.committed_as_of() == as_of
+        proceed.set()
+        assert writer.flush(timeout=5)
+        assert writer.committed_as_of() > as_of
+    finally:
+        proceed.set()
+        writer.stop()
+
+    db.expire_all()
+    assert db.get(models.ProcessExecutionLog, "run-1").updated_at.replace(tzinfo=None) == as_of.replace(tzinfo=None)
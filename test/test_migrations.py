@@ -0,0 +1,69 @@
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import StaticPool
+
+from core import database, migrations
+from modules.scheduler import migrations as scheduler_migrations  # noqa: F401
+
+def test_migrations_add_indexes_to_existing_table_once():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    with engine.begin() as conn:
+        # Execution log table as created before it declared any secondary indexes.
+        conn.execute(text(
+            "CREATE TABLE process_execution_logs (id VARCHAR PRIMARY KEY, job_id VARCHAR NOT NULL, "
+            "workflow_run_id VARCHAR, command VARCHAR NOT NULL, exit_code INTEGER, stdout TEXT, "
+            "stderr TEXT, start_time DATETIME, end_time DATETIME, status VARCHAR NOT NULL)"
+        ))
+
+    assert "scheduler_0001" in migrations.run_migrations(engine)
+    index_names = {index["name"] for index in inspect(engine).get_indexes("process_execution_logs")}
+    assert {
+        "ix_process_execution_logs_job_id_start_time", "ix_process_execution_logs_status_start_time",
+        "ix_process_execution_logs_stdout_ref", "ix_process_execution_logs_stderr_ref",
+    } <= index_names
+
+    assert migrations.run_migrations(engine) == []
+
+def test_app_engine_applies_sqlite_pragmas_and_records_pool_waits(tmp_path):
+    engine = database.create_app_engine(f"sqlite:///{tmp_path / 'app.sqlite'}", pool_size=1, max_overflow=0)
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2  # INCREMENTAL
+    assert isinstance(engine.pool, database.InstrumentedQueuePool)
+
+    database.pool_stats.reset()
+    held = engine.connect()
+    releaser = threading.Timer(0.2, held.close)
+    releaser.start()
+    with engine.connect():
+        pass
+    releaser.join()
+    stats = database.pool_stats.snapshot()
+    assert stats["checkouts"] == 2 and stats["timeouts"] == 0
+    assert stats["max_wait_ms"] >= 150
+    engine.dispose()
+
+def test_migration_whose_ddl_loses_a_race_counts_as_applied_concurrently(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.sqlite'}")
+
+    def racing_upgrade(conn):
+        # Another process applies and records the migration while this one is at it.
+        with engine.begin() as other:
+            other.execute(migrations.schema_migrations.insert().values(version="test_0001", applied_at=datetime.now(timezone.utc)))
+        raise OperationalError("ALTER TABLE ...", {}, Exception("duplicate column name"))
+
+    def failing_upgrade(conn):
+        raise OperationalError("ALTER TABLE ...", {}, Exception("no such table"))
+
+    monkeypatch.setattr(migrations, "_registry", [migrations.Migration("test_0001", "racing", racing_upgrade)])
+    assert migrations.run_migrations(engine) == []
+    monkeypatch.setattr(migrations, "_registry", [migrations.Migration("test_0002", "failing", failing_upgrade)])
+    with pytest.raises(OperationalError):
+        migrations.run_migrations(engine)
+    engine.dispose()
@@ -0,0 +1,65 @@
+import os
+import time
+
+import pytest
+
+from helpers import raw_job
+from modules.scheduler import models, output_store, service
+
+@pytest.mark.parametrize("backend", ["database", "filesystem"])
+def test_output_store_range_reads(db, monkeypatch, tmp_path, backend):
+    store = (output_store.DatabaseOutputStore(chunk_size=4) if backend == "database"
+             else output_store.FileOutputStore(str(tmp_path), chunk_size=4))
+    monkeypatch.setattr(output_store, "_store", store)
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    log = models.ProcessExecutionLog(id="run", job_id="a", command="cmd", status="COMPLETED")
+    output_store.attach_output(db, log, stdout="0123456789" * 300)
+    db.add(log)
+    db.commit()
+
+    assert log.stdout_size == 3000 and len(log.stdout) < 3000
+    assert service.get_execution_logs(db).items[0].stdout_size == 3000
+    output = service.get_execution_output(db, "run", "stdout", offset=1005, length=7)
+    assert (output.data, output.total_size) == ("5678901", 3000)
+    assert service.get_execution_output(db, "run", "stderr").total_size == 0
+
+def test_output_stays_readable_after_store_settings_change(db, monkeypatch, tmp_path):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    stored = {}
+    for backend, store in (("database", output_store.DatabaseOutputStore(chunk_size=4)),
+                           ("filesystem", output_store.FileOutputStore(str(tmp_path), chunk_size=5))):
+        monkeypatch.setattr(output_store, "_store", store)
+        log = models.ProcessExecutionLog(id=f"run-{backend}", job_id="a", command="cmd", status="COMPLETED")
+        output_store.attach_output(db, log, stdout=f"{backend}:" + "0123456789" * 30)
+        db.add(log)
+        stored[backend] = log
+    db.commit()
+
+    # Both were written with other chunk sizes, and the database output by another backend.
+    monkeypatch.setattr(output_store, "_store", output_store.FileOutputStore(str(tmp_path), chunk_size=7))
+    monkeypatch.setattr(output_store, "_other_stores", {})
+    for backend, log in stored.items():
+        text = (f"{backend}:" + "0123456789" * 30).encode()
+        assert output_store.read_output(db, log, "stdout", offset=25, length=13) == (text[25:38], len(text))
+
+def test_file_output_store_removes_content_only_when_unused_past_grace(db, tmp_path):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    store = output_store.FileOutputStore(str(tmp_path), chunk_size=4, grace_seconds=60)
+    kept = models.ProcessExecutionLog(id="kept", job_id="a", command="cmd", status="COMPLETED",
+                                      stdout_ref=store.write(db, "kept", "stdout", b"shared"))
+    db.add(kept)
+    db.commit()
+    # Written for a row that was never committed.
+    orphan = output_store.parse_ref(store.write(db, "lost", "stdout", b"orphan"))[2]
+    assert store.sweep(db) == 0
+    old = time.time() - 120
+    for key in (orphan, output_store.parse_ref(kept.stdout_ref)[2]):
+        os.utime(store._dir(key), (old, old))
+    assert store.sweep(db) == 1
+    assert not store._dir(orphan).exists()
+    # Reusing content restarts its grace period, even once no committed row refers to it.
+    db.delete(kept)
+    db.commit()
+    store.write(db, "new", "stdout", b"shared")
+    assert store.sweep(db) == 0
+    assert store.read(db, output_store.parse_ref(kept.stdout_ref)[2], 0, 6, 4) == b"shared"
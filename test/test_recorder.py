@@ -0,0 +1,32 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_SUBMITTED, JobExecutionEvent, JobSubmissionEvent,
+)
+
+from helpers import raw_job
+from modules.scheduler import log_writer, models, recorder, service
+
+def test_recorder_records_runs_from_scheduler_events(db):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    scheduler = SimpleNamespace(get_job=lambda job_id, jobstore=None: SimpleNamespace(func_ref="tasks:run"))
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    listener = recorder.ExecutionRecorder(scheduler, writer=writer, ignored_jobstores={"internal"})
+    first, second = datetime(2025, 1, 1, 0, 0), datetime(2025, 1, 1, 0, 1)
+    try:
+        listener(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "a", "default", [first]))
+        listener(JobExecutionEvent(EVENT_JOB_EXECUTED, "a", "default", first, retval="done"))
+        # A fast job may report its outcome before the submission event is dispatched.
+        listener(JobExecutionEvent(EVENT_JOB_ERROR, "a", "default", second, exception=ValueError("x"), traceback="Traceback"))
+        listener(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "a", "default", [second]))
+        listener(JobSubmissionEvent(EVENT_JOB_SUBMITTED, "housekeeping", "internal", [first]))
+    finally:
+        writer.stop()
+
+    runs = {log.id: log for log in db.query(models.ProcessExecutionLog)}
+    assert sorted(runs) == [recorder.execution_log_id("a", first), recorder.execution_log_id("a", second)]
+    done, failed = runs[recorder.execution_log_id("a", first)], runs[recorder.execution_log_id("a", second)]
+    assert (done.status, done.stdout, done.command, done.scheduled_time) == ("COMPLETED", "done", "tasks:run", first)
+    assert (failed.status, failed.stderr) == ("FAILED", "Traceback")
+    assert failed.end_time is not None
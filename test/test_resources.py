@@ -0,0 +1,70 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from helpers import raw_job
+from modules.scheduler import log_writer, models, recorder, resources, service, timeouts
+
+_resource_runs = []
+
+def _hold(job_id):
+    started = time.monotonic()
+    time.sleep(0.3)
+    _resource_runs.append((job_id, started, time.monotonic()))
+
+def test_runs_claiming_a_resource_wait_for_its_capacity(file_db):
+    db = file_db
+    manager = resources.ResourceManager({"warehouse": 1}, poll_interval_seconds=0.05)
+    with pytest.raises(ValueError):
+        manager.check({"warehouse": 2})
+    with pytest.raises(ValueError):
+        manager.check({"ledger": 1})
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b")])
+    _resource_runs.clear()
+    scheduler = BackgroundScheduler(
+        jobstores={"default": MemoryJobStore()},
+        executors={"default": timeouts.TimeoutThreadPoolExecutor(4, resources=manager)},
+    )
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    scheduler.add_listener(recorder.ExecutionRecorder(scheduler, writer=writer), recorder.RECORDED_EVENTS)
+    for job_id in ("a", "b"):
+        manager.set_job_resources(job_id, {"warehouse": 1})
+    scheduler.start()
+    try:
+        now = datetime.now(timezone.utc)
+        for job_id in ("a", "b"):
+            scheduler.add_job(_hold, "interval", hours=1, next_run_time=now, id=job_id, kwargs={"job_id": job_id})
+        deadline = time.monotonic() + 10
+        while len(_resource_runs) < 1 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert [usage["in_use"] for usage in manager.usage()] == [1]
+        while db.query(models.ProcessExecutionLog).filter_by(status="COMPLETED").count() < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            db.expire_all()
+    finally:
+        scheduler.shutdown()
+        manager.stop()
+        writer.stop()
+
+    (_, _, first_end), (_, second_start, _) = sorted(_resource_runs, key=lambda run: run[1])
+    assert second_start >= first_end
+    waits = sorted(log.wait_seconds for log in db.query(models.ProcessExecutionLog).all())
+    assert len(waits) == 2 and waits[0] < 0.2 and waits[1] >= 0.25
+    assert db.query(models.ResourceLease).count() == 0
+    assert manager.usage() == [dict(name="warehouse", capacity=1, in_use=0, waiting=0)]
+
+def test_stopping_the_manager_cancels_the_waiting_claims(file_db):
+    manager = resources.ResourceManager({"warehouse": 1}, poll_interval_seconds=0.05)
+    granted, cancelled = [], []
+    for job_id in ("a", "b"):
+        manager.request(job_id, {"warehouse": 1}, granted.append, lambda job_id=job_id: cancelled.append(job_id))
+    deadline = time.monotonic() + 10
+    while not granted and time.monotonic() < deadline:
+        time.sleep(0.02)
+    manager.stop()
+
+    assert [lease.job_id for lease in granted] == ["a"] and cancelled == ["b"]
+    assert manager.usage() == [dict(name="warehouse", capacity=1, in_use=0, waiting=0)]
@@ -0,0 +1,34 @@
+from datetime import datetime, timedelta
+
+from helpers import raw_job
+from modules.scheduler import models, retention, scheduler_instance, service
+from modules.scheduler.journal import JobChangeJournal
+
+def test_retention_purges_expired_and_excess_rows(db, tmp_path, monkeypatch):
+    job_journal = JobChangeJournal()
+    monkeypatch.setattr(scheduler_instance, "job_journal", job_journal)
+    cursor = (job_journal.epoch, job_journal.seq)
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b"), raw_job("c")])
+    now = datetime.utcnow()
+    db.add_all([
+        models.ProcessExecutionLog(id="old-ok", job_id="a", command="cmd", status="COMPLETED", start_time=now - timedelta(days=40)),
+        models.ProcessExecutionLog(id="old-failed", job_id="a", command="cmd", status="FAILED", start_time=now - timedelta(days=40)),
+    ] + [
+        models.ProcessExecutionLog(id=f"b-{i}", job_id="b", command="cmd", status="COMPLETED", start_time=now - timedelta(minutes=i))
+        for i in range(5)
+    ] + [
+        # Runs with equal start times: only as many as exceed the limit are purged.
+        models.ProcessExecutionLog(id=f"c-{i}", job_id="c", command="cmd", status="COMPLETED", start_time=now)
+        for i in range(4)
+    ])
+    db.commit()
+
+    policy = retention.RetentionPolicy(max_age_days=30, failed_max_age_days=90, max_rows_per_job=3,
+                                       batch_size=1, batch_pause_seconds=0, archive_dir=str(tmp_path))
+    report = retention.purge_execution_logs(policy)
+    assert (report.purged_by_age, report.purged_by_count) == (1, 3)
+    remaining = {row.id for row in db.query(models.ProcessExecutionLog)}
+    assert remaining == {"old-failed", "b-0", "b-1", "b-2", "c-1", "c-2", "c-3"}
+    assert report.archive_path is not None
+    # Timelines may still show the purged runs; their cursors now make the clients reload.
+    assert job_journal.changes_since(*cursor) is None
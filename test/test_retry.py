@@ -0,0 +1,65 @@
+import time
+from datetime import datetime, timezone
+
+from apscheduler.events import EVENT_JOB_ERROR, JobExecutionEvent
+from apscheduler.executors.pool import ThreadPoolExecutor
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from helpers import raw_job
+from modules.scheduler import log_writer, models, recorder, retry, schemas, service
+
+_failed_calls = []
+
+def _fail(job_id):
+    _failed_calls.append(job_id)
+    raise ConnectionError("unreachable")
+
+def test_retry_manager_retries_with_backoff_and_links_attempts(file_db):
+    db = file_db
+    policy = schemas.RetryPolicy(max_attempts=3, initial_delay_seconds=30, backoff_multiplier=2, max_delay_seconds=100, jitter=0)
+    assert [retry.retry_delay(policy, n) for n in (1, 2, 3)] == [30, 60, 100]
+
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b")])
+    calls = _failed_calls
+    calls.clear()
+    scheduler = BackgroundScheduler(jobstores={"default": MemoryJobStore()}, executors={"default": ThreadPoolExecutor(2)})
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    listener = recorder.ExecutionRecorder(scheduler, writer=writer)
+    manager = retry.RetryManager(scheduler, listener, policy.model_copy(update={"initial_delay_seconds": 0.05}), jobstore="default")
+    manager.set_policy("b", schemas.RetryPolicy(max_attempts=3, retry_on=["ValueError"]))
+    scheduler.add_listener(listener, recorder.RECORDED_EVENTS)
+    scheduler.add_listener(manager, retry.RETRY_EVENTS)
+    scheduler.start()
+    try:
+        now = datetime.now(timezone.utc)
+        for job_id in ("a", "b"):
+            scheduler.add_job(_fail, "interval", hours=1, next_run_time=now, id=job_id, kwargs={"job_id": job_id})
+        deadline = time.monotonic() + 10
+        while calls.count("a") < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        time.sleep(0.2)
+    finally:
+        scheduler.shutdown()
+        manager.stop()
+        writer.stop()
+
+    assert (calls.count("a"), calls.count("b")) == (3, 1)
+    assert manager.pending() == [] and db.query(models.JobRetry).count() == 0
+    runs = sorted(db.query(models.ProcessExecutionLog).filter_by(job_id="a"), key=lambda log: log.attempt)
+    first = runs[0]
+    assert [(log.attempt, log.retry_of, log.status) for log in runs] == [
+        (1, None, "FAILED"), (2, first.id, "FAILED"), (3, first.id, "FAILED"),
+    ]
+
+def test_stopped_retry_manager_only_persists_new_retries(file_db):
+    db = file_db
+    manager = retry.RetryManager(BackgroundScheduler(), None, schemas.RetryPolicy(max_attempts=3), jobstore="default")
+    manager.stop()
+    # A run failing while the scheduler shuts down, after the manager was stopped.
+    manager(JobExecutionEvent(EVENT_JOB_ERROR, "a", "default", datetime.now(timezone.utc), exception=ConnectionError()))
+
+    assert manager._thread is None and manager.pending() == []
+    assert [row.job_id for row in db.query(models.JobRetry)] == ["a"]
+    assert manager.load() == 1 and manager._thread.is_alive()
+    manager.stop()
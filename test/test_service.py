@@ -0,0 +1,142 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from helpers import raw_job
+from modules.scheduler import models, scheduler_instance, schemas, service
+from modules.scheduler.stats import DashboardStats
+from modules.scheduler.journal import JobChangeJournal
+from util.config_util import AppConfig
+
+def test_upsert_bulk_jobs_reports_per_item_results(db):
+    service.upsert_bulk_jobs(db, [raw_job("existing")])
+
+    result = service.upsert_bulk_jobs(db, [
+        raw_job("new"),
+        raw_job("existing", description="changed"),
+        {"id": "broken"},
+        raw_job("new"),
+    ])
+    assert [item.status for item in result.results] == ["created", "updated", "failed", "failed"]
+    assert (result.created, result.updated, result.failed) == (1, 1, 2)
+    assert db.get(models.JobDefinition, "existing").description == "changed"
+    assert db.query(models.JobDefinitionChange).count() == 3
+
+def test_delete_bulk_jobs_ignores_unknown_ids(db, monkeypatch):
+    monkeypatch.setattr(service, "BULK_CHUNK_SIZE", 2)
+    service.upsert_bulk_jobs(db, [raw_job(job_id) for job_id in "abcde"])
+    assert service.delete_bulk_jobs(db, ["a", "b", "missing", "c", "d"]) == 4
+    assert [job.id for job in db.query(models.JobDefinition)] == ["e"]
+
+def test_execution_logs_keyset_pagination(db):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    base = datetime(2025, 1, 1)
+    db.add_all([
+        models.ProcessExecutionLog(id=f"run-{i}", job_id="a", command="cmd", status="FAILED" if i % 2 else "COMPLETED",
+                                   start_time=base + timedelta(minutes=i // 2))
+        for i in range(7)
+    ])
+    db.commit()
+
+    seen, cursor = [], None
+    while True:
+        page = service.get_job_execution_history(db, job_id="a", limit=3, cursor=cursor)
+        seen.extend(item.id for item in page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            break
+    assert seen == ["run-6", "run-5", "run-4", "run-3", "run-2", "run-1", "run-0"]
+
+    failed = service.get_execution_logs(db, status="failed", since=base + timedelta(minutes=1))
+    assert [item.id for item in failed.items] == ["run-5", "run-3"]
+    tokyo = timezone(timedelta(hours=9))
+    window = service.get_job_execution_history(
+        db, job_id="a", since=datetime(2025, 1, 1, 9, 1, tzinfo=tokyo), until=datetime(2025, 1, 1, 9, 2, tzinfo=tokyo),
+    )
+    assert [item.id for item in window.items] == ["run-3", "run-2"]
+    with pytest.raises(ValueError):
+        service.get_execution_logs(db, cursor="not-a-cursor")
+
+def test_execution_log_listing_omits_output(db):
+    service.upsert_bulk_jobs(db, [raw_job("a")])
+    db.add(models.ProcessExecutionLog(id="run", job_id="a", command="cmd", status="COMPLETED", stdout="x" * 100))
+    db.commit()
+
+    summary = service.get_execution_logs(db).items[0]
+    assert (summary.stdout_size, summary.stderr_size) == (100, 0)
+    assert not hasattr(summary, "stdout")
+    assert service.get_execution_log(db, "run").stdout == "x" * 100
+
+def test_timeline_returns_runs_or_buckets_for_the_window(db, monkeypatch):
+    monkeypatch.setattr(AppConfig, "timeline_max_items", property(lambda self: 5))
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b")])
+    base = datetime(2025, 1, 1)
+    db.add_all([
+        models.ProcessExecutionLog(id=f"a-{i}", job_id="a", command="cmd", status="FAILED" if i == 3 else "COMPLETED",
+                                   start_time=base + timedelta(minutes=10 * i), end_time=base + timedelta(minutes=10 * i + 1))
+        for i in range(12)
+    ] + [models.ProcessExecutionLog(id="b-0", job_id="b", command="cmd", status="COMPLETED", start_time=base)])
+    db.commit()
+
+    zoomed = service.get_timeline_data(db, start=base, end=base + timedelta(minutes=30))
+    assert zoomed.resolution_seconds is None
+    assert [item.id for item in zoomed.items] == ["log-a-0", "log-b-0", "log-a-1", "log-a-2"]
+
+    wide = service.get_timeline_data(db, start=base, end=base + timedelta(days=1), groups=["a"])
+    assert wide.resolution_seconds == 900
+    assert [(item.count, item.failed_count) for item in wide.items][:3] == [(2, 0), (1, 0), (2, 1)]
+    assert {item.group for item in wide.items} == {"a"}
+
+    # Too many runs for 'runs', and too narrow buckets for the window: both fall back to bounded buckets.
+    capped = service.get_timeline_data(db, start=base, end=base + timedelta(days=1), resolution="runs")
+    assert capped.resolution_seconds == 900 and not capped.truncated
+    narrow = service.get_timeline_data(db, start=base, end=base + timedelta(days=7), resolution="1")
+    assert narrow.resolution_seconds == 7 * 86400 // 200
+
+def test_timeline_delta_returns_changed_runs_and_scheduled_jobs(db, monkeypatch):
+    next_run = datetime.now(timezone.utc) + timedelta(hours=1)
+    jobs = {"a": SimpleNamespace(id="a", next_run_time=next_run), "b": SimpleNamespace(id="b", next_run_time=next_run)}
+    fake_index = SimpleNamespace(
+        scheduled_between=lambda start, end: list(jobs.values()),
+        get=jobs.get,
+        job_ids=lambda: list(jobs),
+    )
+    job_journal = JobChangeJournal()
+    monkeypatch.setattr(scheduler_instance, "job_index", fake_index)
+    monkeypatch.setattr(scheduler_instance, "job_journal", job_journal)
+    monkeypatch.setattr(service, "TIMELINE_DELTA_OVERLAP", timedelta(0))
+
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b")])
+    start, end = datetime.now(timezone.utc) - timedelta(hours=1), datetime.now(timezone.utc) + timedelta(hours=2)
+    db.add(models.ProcessExecutionLog(id="old", job_id="a", command="cmd", status="COMPLETED",
+                                      start_time=datetime.now(timezone.utc) - timedelta(minutes=5), updated_at=datetime.now(timezone.utc) - timedelta(minutes=5)))
+    db.commit()
+    full = service.get_timeline_data(db, start=start, end=end)
+    assert {item.id for item in full.items} == {"log-old", "scheduled-a", "scheduled-b"}
+
+    db.add(models.ProcessExecutionLog(id="new", job_id="b", command="cmd", status="RUNNING", start_time=datetime.now(timezone.utc),
+                                      updated_at=datetime.now(timezone.utc) + timedelta(seconds=1)))
+    db.commit()
+    jobs["a"].next_run_time = next_run + timedelta(minutes=10)
+    del jobs["b"]
+    job_journal.append("a")
+    job_journal.append("b")
+
+    delta = service.get_timeline_delta(db, cursor=full.cursor, start=start, end=end)
+    assert not delta.reset
+    assert [item.id for item in delta.upserts] == ["log-new", "scheduled-a"]
+    assert delta.removed == ["scheduled-b"]
+
+    assert service.get_timeline_delta(db, cursor=service.encode_timeline_cursor("other", 0, datetime.now(timezone.utc))).reset
+
+def test_scheduled_jobs_carry_the_status_of_their_latest_run(monkeypatch):
+    infos = [schemas.JobInfo.model_validate(raw_job(job_id)) for job_id in ("a", "b")]
+    stats = DashboardStats()
+    stats.run_started("a")
+    stats.run_finished("a", "FAILED", datetime.now(timezone.utc))
+    monkeypatch.setattr(scheduler_instance, "job_index", SimpleNamespace(query=lambda **filters: (2, infos)))
+    monkeypatch.setattr(scheduler_instance, "dashboard_stats", stats)
+
+    total, jobs = service.get_scheduled_jobs_info()
+    assert total == 2 and [(job.id, job.last_status) for job in jobs] == [("a", "FAILED"), ("b", None)]
@@ -0,0 +1,29 @@
+from datetime import datetime, timezone
+
+import pytest
+from pydantic import ValidationError
+
+from helpers import job_config
+from modules.scheduler import forecast, schemas, spreading
+
+def test_hashed_cron_fields_and_interval_phases_spread_fire_times():
+    minutes = {spreading.resolve_cron_field(f"report_{i}", "minute", "H") for i in range(50)}
+    assert len(minutes) > 20 and all(0 <= int(minute) <= 59 for minute in minutes)
+    assert spreading.resolve_cron_field("report_1", "minute", "H") == spreading.resolve_cron_field("report_1", "minute", "H")
+    low, rest = spreading.resolve_cron_field("report_1", "minute", "H(10-29)/5,45").split("-", 1)
+    assert 10 <= int(low) < 15 and rest == "29/5,45"
+    assert spreading.resolve_cron_field("report_1", "day_of_week", "THU") == "THU"
+    for fields in ({"minute": "H(50-70)"}, {"hour": "H/0"}, {"year": "H"}, {"minute": "H5"}):
+        with pytest.raises(ValidationError):
+            schemas.CronTrigger(**fields)
+    trigger_type, arguments = spreading.trigger_arguments("sample", schemas.IntervalTrigger(minutes=10, spread_seconds=600, jitter=5))
+    assert trigger_type == "interval" and "spread_seconds" not in arguments and arguments["jitter"] == 5
+    assert (arguments["start_date"] - spreading.INTERVAL_ANCHOR).total_seconds() == spreading.interval_offset("sample", schemas.IntervalTrigger(minutes=10, spread_seconds=600))
+
+    configs = [job_config(f"report_{i}", trigger={"type": "cron", "minute": "H"}) for i in range(20)]
+    configs.append(job_config("poll", trigger={"type": "interval", "minutes": 10}))
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    analysis = forecast.analyze_spreading(configs, start, start.replace(hour=1))
+    assert analysis.peak_before == 21 and analysis.peak_after < 5
+    assert sum(bucket.fires for bucket in analysis.before) == sum(bucket.fires for bucket in analysis.after) == 26
+    assert analysis.spread_jobs == sorted(f"report_{i}" for i in range(20))
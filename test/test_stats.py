@@ -0,0 +1,36 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from apscheduler.events import EVENT_JOB_ADDED, EVENT_JOB_REMOVED
+
+from helpers import raw_job
+from modules.scheduler import models, service
+from modules.scheduler.stats import DashboardStats
+
+def test_dashboard_stats_track_transitions_and_reconcile(db):
+    now = datetime(2025, 1, 2, 12, 0)
+    stats = DashboardStats(window_hours=24, ignored_jobstores={"internal"})
+    for job_id, jobstore in (("a", "default"), ("a", "default"), ("b", "default"), ("housekeeping", "internal")):
+        stats(SimpleNamespace(code=EVENT_JOB_ADDED, job_id=job_id, jobstore=jobstore))
+    stats.run_started("a")
+    stats.run_finished("a", "COMPLETED", now - timedelta(hours=2))
+    stats.run_started("b")
+    stats.run_finished("b", "FAILED", now - timedelta(minutes=5), was_running=False)
+    stats(SimpleNamespace(code=EVENT_JOB_REMOVED, job_id="b", jobstore="default"))
+
+    assert stats.summary() == {"total_jobs": 1, "running_jobs": 1, "successful_runs": 1, "failed_runs": 1, "timed_out_runs": 0, "missed_runs": 0}
+    assert stats.summary(window_minutes=60, now=now)["successful_runs"] == 0
+    assert stats.summary(window_minutes=60, now=now)["failed_runs"] == 1
+
+    service.upsert_bulk_jobs(db, [raw_job("a"), raw_job("b")])
+    db.add_all([
+        models.ProcessExecutionLog(id="1", job_id="a", command="cmd", status="COMPLETED", start_time=now - timedelta(days=2)),
+        models.ProcessExecutionLog(id="2", job_id="a", command="cmd", status="FAILED", start_time=now - timedelta(minutes=30)),
+        models.ProcessExecutionLog(id="3", job_id="b", command="cmd", status="RUNNING", start_time=now - timedelta(minutes=1)),
+    ])
+    db.commit()
+    stats.reconcile(db, ["a", "b"], now=now)
+    assert stats.summary() == {"total_jobs": 2, "running_jobs": 1, "successful_runs": 1, "failed_runs": 1, "timed_out_runs": 0, "missed_runs": 0}
+    assert stats.summary(window_minutes=1440, now=now)["successful_runs"] == 0
+    assert stats.summary(window_minutes=60, now=now)["failed_runs"] == 1
+    assert (stats.last_status("a"), stats.last_status("b")) == ("FAILED", "RUNNING")
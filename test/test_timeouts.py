@@ -0,0 +1,107 @@
+import threading
+import time
+from datetime import datetime, timezone
+
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from helpers import raw_job
+from modules.scheduler import command_runner, log_writer, models, recorder, service, timeouts
+
+_hung_runs = []
+
+def _hang(job_id):
+    token = timeouts.current_cancel_token()
+    _hung_runs.append(job_id)
+    # Ignores the token for a while, like a blocking call, before noticing the cancellation.
+    time.sleep(0.5)
+    token.wait(10)
+
+def _spin(job_id):
+    while True:
+        pass
+
+_holding = threading.Event()
+_released = threading.Event()
+
+def _block():
+    _holding.set()
+    _released.wait(10)
+
+def test_timed_out_runs_free_their_slots_and_are_recorded(file_db):
+    db = file_db
+    service.upsert_bulk_jobs(db, [raw_job("slow"), raw_job("cpu"), raw_job("sh")])
+    _hung_runs.clear()
+    threads = timeouts.TimeoutThreadPoolExecutor(1)
+    processes = timeouts.TimeoutProcessPoolExecutor(1)
+    scheduler = BackgroundScheduler(
+        jobstores={"default": MemoryJobStore()},
+        executors={"default": threads, "process": processes, "command": command_runner.CommandExecutor(1)},
+    )
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    scheduler.add_listener(recorder.ExecutionRecorder(scheduler, writer=writer), recorder.RECORDED_EVENTS)
+    for job_id in ("slow", "cpu"):
+        timeouts.set_job_timeout(job_id, 0.2)
+    scheduler.start()
+    try:
+        now = datetime.now(timezone.utc)
+        scheduler.add_job(_hang, "interval", hours=1, next_run_time=now, id="slow", kwargs={"job_id": "slow"})
+        scheduler.add_job(_spin, "interval", hours=1, next_run_time=now, id="cpu", kwargs={"job_id": "cpu"}, executor="process")
+        scheduler.add_job(
+            command_runner.run_command, "interval", hours=1, next_run_time=now, id="sh", executor="command",
+            kwargs={"shell": "echo started; sleep 30", "timeout_seconds": 0.5, "job_id": "sh"},
+        )
+        deadline = time.monotonic() + 10
+        while db.query(models.ProcessExecutionLog).filter_by(status="TIMEOUT").count() < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            db.expire_all()
+        # The hung thread's slot came back at the deadline, so the next run starts right away.
+        scheduler.get_job("slow").modify(next_run_time=datetime.now(timezone.utc))
+        while db.query(models.ProcessExecutionLog).filter_by(status="TIMEOUT").count() < 4 and time.monotonic() < deadline:
+            time.sleep(0.05)
+            db.expire_all()
+    finally:
+        scheduler.shutdown(wait=False)
+        writer.stop()
+        for job_id in ("slow", "cpu"):
+            timeouts.set_job_timeout(job_id, None)
+
+    timed_out = db.query(models.ProcessExecutionLog).filter_by(status="TIMEOUT").all()
+    assert sorted(log.job_id for log in timed_out) == ["cpu", "sh", "slow", "slow"]
+    logs = {log.job_id: log for log in timed_out}
+    assert logs["sh"].stdout == "started\n" and logs["sh"].exit_code == -9
+    assert "timed out" in logs["slow"].stderr
+    assert _hung_runs == ["slow", "slow"]
+    assert not any(thread.name == "job-cpu" for thread in threading.enumerate())
+
+def test_runs_still_queued_at_shutdown_are_recorded_as_missed(file_db, caplog):
+    db = file_db
+    service.upsert_bulk_jobs(db, [raw_job("busy"), raw_job("queued")])
+    _holding.clear()
+    _released.clear()
+    threads = timeouts.TimeoutThreadPoolExecutor(1)
+    scheduler = BackgroundScheduler(jobstores={"default": MemoryJobStore()}, executors={"default": threads})
+    writer = log_writer.ExecutionLogWriter(flush_interval=0.05)
+    scheduler.add_listener(recorder.ExecutionRecorder(scheduler, writer=writer), recorder.RECORDED_EVENTS)
+    scheduler.start()
+    try:
+        scheduler.add_job(_block, "interval", hours=1, next_run_time=datetime.now(timezone.utc), id="busy")
+        assert _holding.wait(10)
+        scheduler.add_job(_block, "interval", hours=1, next_run_time=datetime.now(timezone.utc), id="queued")
+        deadline = time.monotonic() + 10
+        while not any(row["queued"] for row in threads.queue_stats()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.shutdown(wait=False)
+        _released.set()
+        while db.query(models.ProcessExecutionLog).filter_by(status="RUNNING").count() and time.monotonic() < deadline:
+            time.sleep(0.05)
+            db.expire_all()
+    finally:
+        _released.set()
+        if scheduler.running:
+            scheduler.shutdown(wait=False)
+        writer.stop()
+
+    statuses = dict(db.query(models.ProcessExecutionLog.job_id, models.ProcessExecutionLog.status).all())
+    assert statuses == {"busy": "COMPLETED", "queued": "MISSED"}
+    assert "Shut down with 1 runs still queued" in caplog.text